@@ -2,6 +2,7 @@ from django.contrib import admin
 
 from .models import (
     UserWallet,
+    WalletTransaction,
     Campaign,
     CampaignImage,
     CampaignVideo,
@@ -27,7 +28,9 @@ from .models import (
     weather,
     tag_tracker,
     CampaignFile,
-    Creative
+    Creative,
+    BackgroundJob,
+    DataFileChecksum
 )
 
 
@@ -126,6 +129,25 @@ class CampaignFileAdmin(admin.ModelAdmin):
 admin.site.register(CampaignFile,CampaignFileAdmin)
 admin.site.register(weather)
 admin.site.register(UserWallet)
+
+
+class WalletTransactionAdmin(admin.ModelAdmin):
+    list_display = ("id", "wallet", "kind", "amount", "balance_after", "campaign", "created_at")
+    list_filter = ("kind",)
+    search_fields = ("idempotency_key", "description")
+
+    # The ledger is append-only; entries are written by api.wallet.
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+admin.site.register(WalletTransaction, WalletTransactionAdmin)
 admin.site.register(tag_tracker)
 admin.site.register(UserType, UserTypeAdmin)
 admin.site.register(UserProfile, UserProfileAdmin)
@@ -162,3 +184,15 @@ class CreativeAdmin(admin.ModelAdmin):
 class CityDataAdmin(admin.ModelAdmin):
     list_display = ("city", "state", "country", "tier", "city_population")
     search_fields = ("city", "state", "country", "tier")
+
+
+@admin.register(BackgroundJob)
+class BackgroundJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "kind", "status", "attempts", "run_after", "updated_at")
+    list_filter = ("kind", "status")
+    readonly_fields = ("created_at", "updated_at")
+
+
+@admin.register(DataFileChecksum)
+class DataFileChecksumAdmin(admin.ModelAdmin):
+    list_display = ("name", "checksum", "loaded_at")
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "api"
+
+    def ready(self):
+        # Register the signal receivers that keep derived data in sync.
+        from . import backends, blobs, interests, locations, pacing, reach, rollups, search, taxonomy  # noqa: F401
@@ -15,6 +15,7 @@ from rest_framework_simplejwt.views import TokenRefreshView, TokenVerifyView
 from .models import UserType, UserProfile,UserWallet
 from .serializers import (ChangePasswordSerializer,
                           CustomTokenObtainPairSerializer)
+from .tokens import RoleTokenRefreshSerializer
 
 logger = logging.getLogger(__name__)
 
@@ -194,7 +195,7 @@ class CustomTokenObtainPairView(APIView):
         # Add CORS headers to the request
         request.META['HTTP_ACCESS_CONTROL_ALLOW_ORIGIN'] = '*'
         
-        serializer = CustomTokenObtainPairSerializer(data=request.data)
+        serializer = CustomTokenObtainPairSerializer(data=request.data, context={"request": request})
         if serializer.is_valid():
             try:
                 data = serializer.validated_data
@@ -215,6 +216,9 @@ class CustomTokenObtainPairView(APIView):
 
 
 class CustomTokenRefreshView(TokenRefreshView):
+    # Re-reads the role claims (api.tokens) into the new access token.
+    serializer_class = RoleTokenRefreshSerializer
+
     def post(self, request, *args, **kwargs):
         try:
             # Attempt to refresh the token
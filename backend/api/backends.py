@@ -0,0 +1,49 @@
+"""
+Login by username or email.
+
+EmailOrUsernameBackend resolves the login name against auth_user.username
+or auth_user.email in one query, annotated with the user's PM flag and
+company (the role claims of api.tokens), and checks the password hash
+once. Unknown users still pay for one hash so response times do not reveal
+which accounts exist.
+
+auth_user.email is indexed by the dsp.0001_auth_user_email_index migration.
+"""
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import User
+from django.db.models import Case, OuterRef, Q, Value, When
+
+from .tokens import pm_exists
+
+
+def login_candidates(login):
+    """
+    Users whose username or email is login, annotated with is_pm and company.
+    The username match (usernames are unique) comes first, then email matches by id.
+    """
+    return (
+        User.objects.filter(Q(username=login) | Q(email=login))
+        .select_related("profile")
+        .annotate(is_pm=pm_exists(OuterRef("pk")))
+        .order_by(Case(When(username=login, then=Value(0)), default=Value(1)), "pk")
+    )
+
+
+class EmailOrUsernameBackend(ModelBackend):
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(User.USERNAME_FIELD)
+        if not username or password is None:
+            return None
+
+        # A username match wins over another account that uses it as its email.
+        user = login_candidates(username).first()
+        if user is None:
+            User().set_password(password)
+            return None
+
+        user.is_pm = bool(user.is_pm)
+        user.company = getattr(getattr(user, "profile", None), "company_name", None)
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
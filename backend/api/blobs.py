@@ -0,0 +1,116 @@
+"""
+Reference counting for content-addressed files (see api.storage).
+
+Every row of the models below that points at a StoredBlob holds one
+reference. Saving a new file through the storage takes the reference in
+ContentAddressedStorage._save; assigning an existing name takes it here.
+When the last reference goes away the S3 object, its renditions (see
+api.media) and its StoredBlob row are deleted. Files saved before content addressing have no StoredBlob and are
+left alone.
+
+A save that fails after its blob was registered can leave a row with no
+references; collect_unreferenced removes those once they are old enough
+not to belong to a save still in progress.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.utils import timezone
+
+from .media import rendition_names, rendition_storage
+from .models import CampaignImage, Creative, Keyword, StoredBlob, proximity, proximity_store, tag_tracker, weather
+from .storage import ContentAddressedStorage
+
+# Model -> file field stored with ContentAddressedStorage.
+BLOB_FIELDS = {
+    Creative: "file",
+    CampaignImage: "image",
+    Keyword: "file",
+    tag_tracker: "file",
+    proximity_store: "file",
+    proximity: "file",
+    weather: "file",
+}
+
+
+def _delete_files(name, storage):
+    storage.delete(name)
+    for rendition in rendition_names(name):
+        rendition_storage.delete(rendition)
+
+
+def retain(name):
+    if name:
+        StoredBlob.objects.filter(name=name).update(ref_count=F("ref_count") + 1)
+
+
+def release(name, storage):
+    if not name:
+        return
+    with transaction.atomic():
+        blob = StoredBlob.objects.select_for_update().filter(name=name).first()
+        if blob is None:
+            return
+        if blob.ref_count > 1:
+            StoredBlob.objects.filter(pk=blob.pk).update(ref_count=F("ref_count") - 1)
+            return
+        blob.delete()
+        transaction.on_commit(lambda: _delete_files(name, storage))
+
+
+# Unreferenced blobs younger than this may still be claimed by a save in progress.
+UNREFERENCED_GRACE = timedelta(hours=1)
+
+
+def collect_unreferenced(older_than=UNREFERENCED_GRACE):
+    """Delete blobs nothing references that were created before older_than ago. Returns the number deleted."""
+    cutoff = timezone.now() - older_than
+    deleted = 0
+    for pk in StoredBlob.objects.filter(ref_count=0, created_at__lt=cutoff).values_list("pk", flat=True):
+        with transaction.atomic():
+            blob = StoredBlob.objects.select_for_update().filter(pk=pk, ref_count=0).first()
+            if blob is None:
+                continue
+            storage = ContentAddressedStorage()
+            blob.delete()
+            transaction.on_commit(lambda name=blob.name: _delete_files(name, storage))
+            deleted += 1
+    return deleted
+
+
+def _blob_pre_save(sender, instance, raw=False, **kwargs):
+    instance._blob_before = None
+    field_file = getattr(instance, BLOB_FIELDS[sender])
+    # An uncommitted file is saved through the storage, which takes its reference.
+    instance._blob_claimed = bool(field_file) and not field_file._committed
+    if not raw and instance.pk:
+        instance._blob_before = sender.objects.filter(pk=instance.pk).values_list(BLOB_FIELDS[sender], flat=True).first()
+
+
+def _blob_post_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    field_file = getattr(instance, BLOB_FIELDS[sender])
+    before = getattr(instance, "_blob_before", None)
+    claimed = getattr(instance, "_blob_claimed", False)
+    if field_file.name == before:
+        if claimed:
+            # The same bytes uploaded again: drop the extra reference the storage took.
+            release(before, field_file.storage)
+        return
+    if not claimed:
+        retain(field_file.name)
+    release(before, field_file.storage)
+
+
+def _blob_post_delete(sender, instance, **kwargs):
+    field_file = getattr(instance, BLOB_FIELDS[sender])
+    release(field_file.name, field_file.storage)
+
+
+for _model in BLOB_FIELDS:
+    pre_save.connect(_blob_pre_save, sender=_model, dispatch_uid=f"blob_pre_save_{_model.__name__}")
+    post_save.connect(_blob_post_save, sender=_model, dispatch_uid=f"blob_post_save_{_model.__name__}")
+    post_delete.connect(_blob_post_delete, sender=_model, dispatch_uid=f"blob_post_delete_{_model.__name__}")
@@ -0,0 +1,245 @@
+"""
+Bulk synchronisation of the JSON seed data in data/ into lookup tables.
+
+Each dataset is diffed against the existing rows in one query and the
+resulting inserts, updates and (optionally) deletes are applied with
+bulk_create / bulk_update / a single DELETE inside one transaction.
+Datasets whose file checksum matches the last successful load are skipped.
+"""
+import hashlib
+import json
+import os
+
+from django.conf import settings
+from django.db import transaction
+from django.dispatch import Signal
+
+from .models import (Age, BrandSafety, BuyType, CarrierData, DataFileChecksum, Device, DevicePrice, DistinctInterest,
+                     Environment, Exchange, Impression, Language, Location, Viewability, target_type)
+
+DATA_DIR = os.path.join(settings.BASE_DIR, 'data')
+
+# Sent with sender=<model> after a sync changed rows of that model. Bulk
+# operations bypass post_save/post_delete, so caches listen to this instead.
+data_synced = Signal()
+
+
+def _records(json_data):
+    if isinstance(json_data, dict) and 'data' in json_data:
+        return json_data['data']
+    return json_data
+
+
+def _value_label(value_field):
+    def build(json_data):
+        return [
+            {value_field: item.get('value'), 'label': item.get('label')}
+            for item in _records(json_data)
+        ]
+    return build
+
+
+def _languages(json_data):
+    return [
+        {'language': item.get('value'), 'iso_code': item.get('iso_code'), 'label': item.get('label')}
+        for item in _records(json_data)
+    ]
+
+
+def _impression(json_data):
+    return [{'label': 'Impression Data', 'impression': json_data.get('data', {})}]
+
+
+def _population(value):
+    # location.json uses Indian digit grouping, e.g. "1,09,27,986"
+    digits = str(value or '').replace(',', '').strip()
+    return int(digits) if digits else 0
+
+
+def _locations(json_data):
+    return [
+        {
+            'country': item.get('country', ''),
+            'state': item.get('state', ''),
+            'city': item.get('city', ''),
+            'tier': item.get('tier', ''),
+            'population': _population(item.get('population')),
+        }
+        for item in _records(json_data)
+    ]
+
+
+def _interests(json_data):
+    # interest.json nests the list one level deeper: {"data": [[...]]}
+    return [
+        {
+            'category': item.get('category', ''),
+            'subcategory': item.get('subcategory', ''),
+            'targeting_type': item.get('subcategory', ''),
+        }
+        for item in _records(json_data)[0]
+    ]
+
+
+# name -> (json file, model, key fields, record builder)
+DATASETS = {
+    'age': ('age.json', Age, ('age',), _value_label('age')),
+    'carrier': ('carrier-data.json', CarrierData, ('carrier',), _value_label('carrier')),
+    'environment': ('environment.json', Environment, ('env',), _value_label('env')),
+    'exchange': ('exchange.json', Exchange, ('exchange',), _value_label('exchange')),
+    'language': ('language.json', Language, ('language',), _languages),
+    'impression': ('impression.json', Impression, ('label',), _impression),
+    'device_price': ('device-price.json', DevicePrice, ('price',), _value_label('price')),
+    'device': ('device.json', Device, ('device',), _value_label('device')),
+    'interest_category': ('interest-category.json', DistinctInterest, ('interest',), _value_label('interest')),
+    'brand_safety': ('brand_safety.json', BrandSafety, ('value',), _value_label('value')),
+    'buy_type': ('buy_type.json', BuyType, ('value',), _value_label('value')),
+    'viewability': ('viewability.json', Viewability, ('value',), _value_label('value')),
+    'location': ('location.json', Location, ('country', 'state', 'city'), _locations),
+    'interest': ('interest.json', target_type, ('category', 'subcategory'), _interests),
+}
+
+
+def _normalize(model, field_name, value):
+    """Coerce JSON values to what the column will hold, so diffs compare like with like."""
+    field = model._meta.get_field(field_name)
+    internal_type = field.get_internal_type()
+    if value is None or internal_type == 'JSONField':
+        return value
+    if internal_type in ('CharField', 'TextField'):
+        # e.g. brand_safety.json stores 70 for a CharField holding '70'
+        return str(value)
+    return field.to_python(value)
+
+
+def _repoint(model, duplicates):
+    """Move foreign keys and many-to-many links from duplicate rows to the rows kept for their key."""
+    for relation in model._meta.related_objects:
+        if relation.many_to_many:
+            through = relation.through
+            target = relation.field.m2m_reverse_field_name()
+            source = relation.field.m2m_field_name()
+            for duplicate, kept in duplicates.items():
+                linked = through.objects.filter(**{target: kept}).values(f'{source}_id')
+                # Drop links the kept row already has, then move the rest.
+                through.objects.filter(**{target: duplicate, f'{source}_id__in': linked}).delete()
+                through.objects.filter(**{target: duplicate}).update(**{target: kept})
+        elif relation.one_to_many:
+            for duplicate, kept in duplicates.items():
+                relation.related_model.objects.filter(**{relation.field.name: duplicate}).update(
+                    **{relation.field.name: kept}
+                )
+
+
+def sync_records(model, records, key_fields, prune=False, dry_run=False):
+    """
+    Make the table for model match records, matching rows on key_fields.
+    Returns a dict of created/updated/deleted/unchanged counts.
+    """
+    fields = list(records[0]) if records else list(key_fields)
+    value_fields = [name for name in fields if name not in key_fields]
+
+    incoming = {}
+    for record in records:
+        record = {name: _normalize(model, name, record.get(name)) for name in fields}
+        incoming[tuple(record[name] for name in key_fields)] = record
+
+    existing = {}
+    duplicates = {}  # duplicate pk -> pk of the row kept for its key
+    for obj in model.objects.only('pk', *fields).order_by('pk'):
+        key = tuple(getattr(obj, name) for name in key_fields)
+        if key in existing:
+            duplicates[obj.pk] = existing[key].pk
+        else:
+            existing[key] = obj
+
+    to_create = []
+    to_update = []
+    unchanged = 0
+    for key, record in incoming.items():
+        obj = existing.get(key)
+        if obj is None:
+            to_create.append(model(**record))
+        elif any(getattr(obj, name) != record[name] for name in value_fields):
+            for name in value_fields:
+                setattr(obj, name, record[name])
+            to_update.append(obj)
+        else:
+            unchanged += 1
+    to_delete = []
+    if prune:
+        # Duplicates are merged into the kept row (their links are repointed) before deletion.
+        to_delete = list(duplicates) + [obj.pk for key, obj in existing.items() if key not in incoming]
+
+    result = {
+        'created': len(to_create),
+        'updated': len(to_update),
+        'deleted': len(to_delete),
+        'unchanged': unchanged,
+    }
+    if dry_run:
+        return result
+
+    with transaction.atomic():
+        if to_create:
+            model.objects.bulk_create(to_create, batch_size=1000)
+        if to_update and value_fields:
+            model.objects.bulk_update(to_update, value_fields, batch_size=1000)
+        if to_delete:
+            if duplicates:
+                _repoint(model, duplicates)
+            model.objects.filter(pk__in=to_delete).delete()
+    if to_create or to_update or to_delete:
+        data_synced.send(sender=model)
+    return result
+
+
+def insert_missing(model, records, key_fields, batch_size=1000):
+    """
+    Insert the records whose key is not in the table yet, in one
+    transaction. Duplicate keys within records are collapsed first.
+    Returns a dict of created/skipped counts.
+    """
+    incoming = {}
+    for record in records:
+        record = {name: _normalize(model, name, value) for name, value in record.items()}
+        incoming.setdefault(tuple(record[name] for name in key_fields), record)
+
+    lookup = {f'{key_fields[0]}__in': {key[0] for key in incoming}}
+    existing = set(model.objects.filter(**lookup).values_list(*key_fields))
+    to_create = [model(**record) for key, record in incoming.items() if key not in existing]
+
+    with transaction.atomic():
+        # ignore_conflicts covers rows inserted concurrently since the lookup above.
+        model.objects.bulk_create(to_create, batch_size=batch_size, ignore_conflicts=True)
+    if to_create:
+        data_synced.send(sender=model)
+    return {'created': len(to_create), 'skipped': len(records) - len(to_create)}
+
+
+def file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def sync_dataset(name, prune=False, dry_run=False, force=False):
+    """
+    Sync one dataset from DATASETS. Returns the counts from sync_records,
+    or None when the file is unchanged since the last load. Pruning always
+    diffs the table: rows added outside the file are not in the checksum.
+    """
+    json_file, model, key_fields, build = DATASETS[name]
+    path = os.path.join(DATA_DIR, json_file)
+    checksum = file_checksum(path)
+    if not (force or prune) and DataFileChecksum.objects.filter(name=name, checksum=checksum).exists():
+        return None
+
+    with open(path, 'r') as f:
+        records = build(json.load(f))
+    result = sync_records(model, records, key_fields, prune=prune, dry_run=dry_run)
+    if not dry_run:
+        DataFileChecksum.objects.update_or_create(name=name, defaults={'checksum': checksum})
+    return result
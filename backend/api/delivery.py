@@ -0,0 +1,269 @@
+"""
+Streaming ingestion of uploaded delivery reports.
+
+Reports are read row by row (csv for .csv uploads, openpyxl read-only mode
+for workbooks), only the columns we need are looked at, and per-day totals
+are accumulated on the fly, so memory stays flat regardless of report size.
+The per-day totals are then upserted into CampaignDeliveryStat.
+"""
+import csv
+import io
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.utils import timezone
+from openpyxl import load_workbook
+
+from .models import Campaign, CampaignDeliveryStat
+
+# Accepted header spellings per metric, in order of preference.
+ID_COLUMNS = ('id',)
+DATE_COLUMNS = ('date', 'DATE', 'Date')
+IMPRESSION_COLUMNS = ('impressions', 'Impressions')
+CLICK_COLUMNS = ('clicks', 'Clicks')
+VIEW_COLUMNS = ('views', 'Views')
+SPEND_COLUMNS = ('spends', 'Spends', 'payment', 'payments', 'spend', 'Spend')
+# Reports without a clicks header carry clicks in the fifth column.
+CLICK_COLUMN_POSITION = 4
+
+
+class ReportError(ValueError):
+    """Raised when an uploaded report cannot be read or is missing required data."""
+
+
+def is_csv(uploaded_file):
+    name = (getattr(uploaded_file, 'name', '') or '').lower()
+    content_type = getattr(uploaded_file, 'content_type', '') or ''
+    return name.endswith(('.csv', '.txt')) or content_type in ('text/csv', 'application/csv', 'text/plain')
+
+
+def iter_report_rows(uploaded_file):
+    """Yield the header row and then each data row of the first sheet as tuples."""
+    uploaded_file.seek(0)
+    if is_csv(uploaded_file):
+        text = io.TextIOWrapper(getattr(uploaded_file, 'file', uploaded_file), encoding='utf-8-sig', newline='')
+        try:
+            for row in csv.reader(text):
+                yield tuple(row)
+        finally:
+            # Hand the underlying upload back untouched so it can still be stored.
+            text.detach()
+        return
+
+    try:
+        workbook = load_workbook(uploaded_file, read_only=True, data_only=True)
+    except Exception as e:
+        raise ReportError(f'Failed to read Excel file: {str(e)}')
+    try:
+        yield from workbook.worksheets[0].iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _find_column(header, candidates):
+    for name in candidates:
+        if name in header:
+            return header.index(name)
+    return None
+
+
+def resolve_columns(header):
+    """Map each metric to its column index in the header (None when absent)."""
+    header = [str(cell).strip() if cell is not None else '' for cell in header]
+    columns = {
+        'id': _find_column(header, ID_COLUMNS),
+        'date': _find_column(header, DATE_COLUMNS),
+        'impressions': _find_column(header, IMPRESSION_COLUMNS),
+        'clicks': _find_column(header, CLICK_COLUMNS),
+        'views': _find_column(header, VIEW_COLUMNS),
+        'spend': _find_column(header, SPEND_COLUMNS),
+    }
+    if columns['id'] is None:
+        raise ReportError('Excel file must contain a column named "id".')
+    if columns['clicks'] is None and len(header) > CLICK_COLUMN_POSITION:
+        columns['clicks'] = CLICK_COLUMN_POSITION
+    return columns
+
+
+def _cell(row, index):
+    if index is None or index >= len(row):
+        return None
+    value = row[index]
+    if isinstance(value, str):
+        value = value.strip().replace(',', '')
+        if value == '':
+            return None
+    return value
+
+
+def _number(row, index, column):
+    value = _cell(row, index)
+    if value is None:
+        return Decimal('0')
+    try:
+        number = Decimal(str(value))
+    except InvalidOperation:
+        number = None
+    # NaN and Infinity parse as Decimals but cannot be stored as counts or amounts.
+    if number is None or not number.is_finite():
+        raise ReportError(f'Non-numeric value "{value}" in the {column} column.')
+    return number
+
+
+def _matches_campaign(value, campaign_id):
+    if value is None:
+        return False
+    try:
+        return Decimal(str(value)) == campaign_id
+    except InvalidOperation:
+        return False
+
+
+DATE_FORMATS = ('%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%d-%m-%Y', '%d/%m/%Y', '%m/%d/%Y')
+
+
+def _date(row, index):
+    value = _cell(row, index)
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(str(value), date_format).date()
+        except ValueError:
+            continue
+    raise ReportError(f'Unrecognised date "{value}" in the date column.')
+
+
+METRICS = ('impressions', 'clicks', 'views', 'spend')
+# Campaign columns holding the lifetime total of each metric.
+TOTAL_FIELDS = {'impressions': 'impressions', 'clicks': 'clicks', 'views': 'views', 'spend': 'payment'}
+
+
+def aggregate_report(uploaded_file, campaign_id):
+    """
+    Stream a report and total the rows belonging to campaign_id per day.
+    Returns {'rows': n, 'days': {date or None: {metric: total}}}; rows
+    without a date are grouped under None.
+    """
+    row_count = 0
+    days = {}
+    rows = iter_report_rows(uploaded_file)
+    try:
+        try:
+            header = next(rows)
+        except StopIteration:
+            raise ReportError('The uploaded file is empty.')
+        columns = resolve_columns(header)
+
+        for row in rows:
+            if not _matches_campaign(_cell(row, columns['id']), campaign_id):
+                continue
+            row_count += 1
+            day = days.setdefault(_date(row, columns['date']), dict.fromkeys(METRICS, Decimal('0')))
+            for metric in METRICS:
+                day[metric] += _number(row, columns[metric], metric)
+    finally:
+        rows.close()
+
+    if not row_count:
+        raise ReportError('No rows in Excel file match the provided campaign id.')
+    return {
+        'rows': row_count,
+        'days': {
+            day: {
+                'impressions': int(totals['impressions']),
+                'clicks': int(totals['clicks']),
+                'views': int(totals['views']),
+                'spend': totals['spend'].quantize(Decimal('0.01')),
+            }
+            for day, totals in days.items()
+        },
+    }
+
+
+def _merge_undated(days):
+    """Attribute undated rows to the upload day."""
+    undated = days.pop(None, None)
+    if undated:
+        today = timezone.localdate()
+        day = days.setdefault(today, dict.fromkeys(METRICS, 0))
+        for metric in METRICS:
+            day[metric] += undated[metric]
+    return days
+
+
+def store_delivery(campaign_id, days):
+    """
+    Upsert per-day delivery for a campaign and return its lifetime totals.
+    Call inside a transaction that also writes the totals back, so the
+    campaign row lock covers both.
+
+    Re-uploading a day replaces that day's figures, so uploads are
+    idempotent. A report without any dated rows is a lifetime snapshot and
+    replaces the whole series with a single row for the upload day.
+    Totals are derived incrementally: the campaign's current totals plus
+    the difference between the new and the replaced days.
+    """
+    snapshot = set(days) == {None}
+    days = _merge_undated(dict(days))
+
+    with transaction.atomic():
+        # Serialize concurrent uploads for the same campaign on its row lock.
+        campaign = Campaign.objects.select_for_update().only(*TOTAL_FIELDS.values()).get(pk=campaign_id)
+        stats = CampaignDeliveryStat.objects.filter(campaign=campaign)
+        has_series = stats.exists()
+        if snapshot:
+            stats.delete()
+            replaced = {}
+        else:
+            replaced = {
+                row['date']: row
+                for row in stats.filter(date__in=list(days)).values('date', *METRICS)
+            }
+
+        # MySQL's ON DUPLICATE KEY UPDATE takes no conflict target (it uses the
+        # (campaign, date) unique constraint); other backends need one.
+        conflict_target = {}
+        if connection.features.supports_update_conflicts_with_target:
+            conflict_target['unique_fields'] = ['campaign', 'date']
+        CampaignDeliveryStat.objects.bulk_create(
+            [CampaignDeliveryStat(campaign=campaign, date=day, **totals) for day, totals in days.items()],
+            update_conflicts=True,
+            update_fields=list(METRICS),
+            **conflict_target,
+        )
+
+        if snapshot or not has_series:
+            # First series for this campaign (or a full snapshot): the legacy
+            # totals on Campaign are superseded by the uploaded figures.
+            base = dict.fromkeys(METRICS, 0)
+        else:
+            base = {metric: getattr(campaign, field) or 0 for metric, field in TOTAL_FIELDS.items()}
+            base['spend'] = Decimal(str(base['spend']))
+        totals = {}
+        for metric in METRICS:
+            added = sum(day[metric] for day in days.values())
+            removed = sum(row[metric] for row in replaced.values())
+            totals[metric] = base[metric] + added - removed
+    return totals
+
+
+def delivery_series(campaigns, since):
+    """Daily delivery totals across a campaign queryset since a date."""
+    return (
+        CampaignDeliveryStat.objects.filter(campaign__in=campaigns, date__gte=since)
+        .values('date')
+        .annotate(
+            total_impressions=Sum('impressions'),
+            total_clicks=Sum('clicks'),
+            total_views=Sum('views'),
+            total_spend=Sum('spend'),
+        )
+        .order_by('date')
+    )
@@ -0,0 +1,237 @@
+"""
+Store-location ingestion and lookups for proximity targeting.
+
+proximity and proximity_store uploads (CSV or workbook with latitude and
+longitude columns, optionally name, city and radius) are streamed row by
+row into GeoPoint. Each point is bucketed on a CELL_SIZE degree grid, so a
+radius or bounding-box query only reads the rows of the covering cells
+before the exact distance check.
+"""
+import math
+
+from django.db.models import Count, ExpressionWrapper, F, FloatField
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from .delivery import ReportError, iter_report_rows
+from .models import GeoPoint, Location, proximity, proximity_store
+
+# Source name -> (model, GeoPoint foreign key)
+GEO_SOURCES = {
+    "proximity": (proximity, "proximity"),
+    "proximity_store": (proximity_store, "proximity_store"),
+}
+
+CELL_SIZE = 0.1  # degrees, about 11km of latitude
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+BATCH_SIZE = 5000
+MAX_RADIUS_KM = 100.0
+
+LATITUDE_COLUMNS = ("lat", "latitude")
+LONGITUDE_COLUMNS = ("lng", "lon", "long", "longitude")
+RADIUS_COLUMNS = ("radius", "radius_km", "radius (km)")
+NAME_COLUMNS = ("name", "store", "store_name", "store name")
+CITY_COLUMNS = ("city",)
+
+
+def cell(value):
+    return math.floor(value / CELL_SIZE)
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def _column(header, candidates):
+    for index, name in enumerate(header):
+        if name in candidates:
+            return index
+    return None
+
+
+def _float(row, index):
+    if index is None or index >= len(row) or row[index] in (None, ""):
+        return None
+    return float(str(row[index]).strip())
+
+
+def _text(row, index):
+    if index is None or index >= len(row) or row[index] is None:
+        return ""
+    return str(row[index]).strip()[:254]
+
+
+def iter_points(field_file):
+    """Yield (point kwargs or None for an invalid row) for every data row of an upload."""
+    field_file.open("rb")
+    rows = iter_report_rows(field_file)
+    try:
+        try:
+            header = [str(cell).strip().lower() if cell is not None else "" for cell in next(rows)]
+        except StopIteration:
+            raise ReportError("The uploaded file is empty.")
+        lat_col = _column(header, LATITUDE_COLUMNS)
+        lng_col = _column(header, LONGITUDE_COLUMNS)
+        if lat_col is None or lng_col is None:
+            raise ReportError("The file must have latitude and longitude columns.")
+        radius_col = _column(header, RADIUS_COLUMNS)
+        name_col = _column(header, NAME_COLUMNS)
+        city_col = _column(header, CITY_COLUMNS)
+
+        for row in rows:
+            try:
+                lat, lng, radius = _float(row, lat_col), _float(row, lng_col), _float(row, radius_col)
+            except ValueError:
+                yield None
+                continue
+            if lat is None or lng is None or not (-90 <= lat <= 90 and -180 <= lng <= 180):
+                yield None
+                continue
+            yield {
+                "latitude": lat,
+                "longitude": lng,
+                "radius_km": radius if radius is not None and radius >= 0 else None,
+                "name": _text(row, name_col),
+                "city": _text(row, city_col),
+                "cell_lat": cell(lat),
+                "cell_lng": cell(lng),
+            }
+    finally:
+        rows.close()
+        field_file.close()
+
+
+def ingest_points(source, pk):
+    """
+    Replace the GeoPoint rows of an upload with its parsed contents. Returns (points, invalid rows).
+
+    The new rows are written as the next generation, committing every
+    BATCH_SIZE rows, while lookups keep serving the current one. A single
+    UPDATE then switches the upload to the new generation, and the old rows
+    are deleted afterwards in batches.
+    """
+    model, fk = GEO_SOURCES[source]
+    instance = model.objects.get(pk=pk)
+    generation = instance.point_generation + 1
+    # Leftovers of an interrupted parse.
+    _delete_in_batches(GeoPoint.objects.filter(**{f"{fk}_id": pk, "generation": generation}))
+
+    points = invalid = 0
+    batch = []
+    if instance.file:
+        for values in iter_points(instance.file):
+            if values is None:
+                invalid += 1
+                continue
+            batch.append(GeoPoint(**{fk: instance}, generation=generation, **values))
+            if len(batch) >= BATCH_SIZE:
+                GeoPoint.objects.bulk_create(batch)
+                points += len(batch)
+                batch = []
+    if batch:
+        GeoPoint.objects.bulk_create(batch)
+        points += len(batch)
+
+    model.objects.filter(pk=pk).update(
+        point_generation=generation, point_count=points, invalid_rows=invalid, parsed_at=timezone.now()
+    )
+    _delete_in_batches(GeoPoint.objects.filter(**{f"{fk}_id": pk}).exclude(generation=generation))
+    return points, invalid
+
+
+def _delete_in_batches(queryset):
+    while True:
+        ids = list(queryset.values_list("id", flat=True)[:BATCH_SIZE])
+        if not ids:
+            return
+        GeoPoint.objects.filter(id__in=ids).delete()
+
+
+def _points(source, pk):
+    """The served generation of an upload's points."""
+    model, fk = GEO_SOURCES[source]
+    generation = model.objects.filter(pk=pk).values_list("point_generation", flat=True).first()
+    return GeoPoint.objects.filter(**{f"{fk}_id": pk, "generation": generation or 0})
+
+
+def _cell_range(low, high):
+    return cell(low), cell(high)
+
+
+def _check_bbox(min_lat, max_lat, min_lng, max_lng):
+    if not (-90 <= min_lat <= max_lat <= 90 and -180 <= min_lng <= max_lng <= 180):
+        raise ValueError("Bounding box must satisfy -90 <= min_lat <= max_lat <= 90 and -180 <= min_lng <= max_lng <= 180.")
+
+
+def points_in_bbox(source, pk, min_lat, max_lat, min_lng, max_lng):
+    """Points of an upload inside a latitude/longitude box (no antimeridian wrap)."""
+    _check_bbox(min_lat, max_lat, min_lng, max_lng)
+    return (
+        _points(source, pk)
+        .filter(
+            cell_lat__range=_cell_range(min_lat, max_lat),
+            cell_lng__range=_cell_range(min_lng, max_lng),
+            latitude__range=(min_lat, max_lat),
+            longitude__range=(min_lng, max_lng),
+        )
+        .values("id", "name", "city", "latitude", "longitude", "radius_km")
+    )
+
+
+def points_within(source, pk, lat, lng, radius_km, limit=1000):
+    """
+    Points of an upload within radius_km of (lat, lng), nearest first, with their distance.
+
+    The database orders the covering cells' rows on an equirectangular
+    distance (within a few percent of haversine up to MAX_RADIUS_KM) and
+    returns at most ``limit`` of them; only those are checked and reported
+    with their exact haversine distance.
+    """
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise ValueError("lat must be within [-90, 90] and lng within [-180, 180].")
+    if not 0 <= radius_km <= MAX_RADIUS_KM:
+        raise ValueError(f"radius_km must be between 0 and {MAX_RADIUS_KM:g}.")
+    cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+    dlat = radius_km / KM_PER_DEGREE
+    dlng = radius_km / (KM_PER_DEGREE * cos_lat)
+    # Squared distance in degrees of latitude.
+    north, east = F("latitude") - lat, (F("longitude") - lng) * cos_lat
+    offset = ExpressionWrapper(north * north + east * east, output_field=FloatField())
+    candidates = (
+        points_in_bbox(
+            source, pk, max(lat - dlat, -90), min(lat + dlat, 90), max(lng - dlng, -180), min(lng + dlng, 180)
+        )
+        .alias(approx_distance=offset)
+        # Slack for the approximation; the haversine check below is exact.
+        .filter(approx_distance__lte=(dlat * 1.05) ** 2)
+        .order_by("approx_distance")[:limit]
+    )
+    results = []
+    for point in candidates:
+        distance = haversine_km(lat, lng, point["latitude"], point["longitude"])
+        if distance <= radius_km:
+            point["distance_km"] = round(distance, 3)
+            results.append(point)
+    results.sort(key=lambda point: point["distance_km"])
+    return results
+
+
+def location_counts(source, pk, location_ids=None):
+    """
+    Points per Location, matched on the upload's city column (Location has
+    no coordinates). Locations without points are included with count 0.
+    """
+    counts = dict(
+        _points(source, pk).exclude(city="").annotate(city_key=Lower("city"))
+        .values("city_key").annotate(n=Count("id")).values_list("city_key", "n")
+    )
+    locations = Location.objects.order_by("id")
+    if location_ids:
+        locations = locations.filter(id__in=location_ids)
+    return [
+        {"location_id": location_id, "city": city, "state": state, "count": counts.get(city.lower(), 0)}
+        for location_id, city, state in locations.values_list("id", "city", "state")
+    ]
@@ -0,0 +1,76 @@
+"""
+Cached interest (target_type) taxonomy for the audience picker.
+
+The category -> subcategory tree is built once per version and kept in the
+shared cache and in process memory (see api.versioned_cache), so listing,
+category filters and substring search never touch the database. The version
+is bumped on every target_type write, including bulk loads through
+api.bulk_sync.
+"""
+from .models import target_type
+from .taxonomy import conditional_response
+from .versioned_cache import VersionedCache
+
+INDEX_TIMEOUT = 60 * 60 * 24
+
+
+class InterestIndex:
+    def __init__(self, rows):
+        self.rows = [
+            {"id": row["id"], "category": row["category"], "subcategory": row["subcategory"]}
+            for row in rows
+        ]
+        self.targeting_types = sorted({row["targeting_type"] for row in rows})
+        self.by_category = {}
+        for row in self.rows:
+            self.by_category.setdefault(row["category"], []).append(row)
+        self._haystacks = [
+            f'{row["category"] or ""}\n{row["subcategory"] or ""}'.lower() for row in self.rows
+        ]
+
+    @classmethod
+    def from_db(cls):
+        return cls(list(target_type.objects.order_by("id").values("id", "category", "subcategory", "targeting_type")))
+
+    def filter(self, categories=None, search=None):
+        """Rows in any of categories (all when empty) whose category or subcategory contains search."""
+        if categories:
+            rows = [row for category in categories for row in self.by_category.get(category, [])]
+            rows.sort(key=lambda row: row["id"])
+        else:
+            rows = self.rows
+        if search:
+            needle = search.strip().lower()
+            matches = {row["id"] for row, haystack in zip(self.rows, self._haystacks) if needle in haystack}
+            rows = [row for row in rows if row["id"] in matches]
+        return rows
+
+    def tree(self, rows):
+        tree = {}
+        for row in rows:
+            tree.setdefault(row["category"], []).append({"id": row["id"], "subcategory": row["subcategory"]})
+        return [
+            {"category": category, "count": len(children), "subcategories": children}
+            for category, children in tree.items()
+        ]
+
+    def counts(self):
+        return [{"category": category, "count": len(rows)} for category, rows in self.by_category.items()]
+
+
+_index = VersionedCache("interests", InterestIndex.from_db, shared_timeout=INDEX_TIMEOUT)
+_index.invalidate_on_change(target_type)
+
+
+def get_index():
+    """Return (version, InterestIndex)."""
+    return _index.get()
+
+
+def interest_response(request, respond):
+    """
+    Serve from the cached index; respond(index) builds the response. The
+    ETag only carries the version, as the body is fixed by version and URL.
+    """
+    version, index = get_index()
+    return conditional_response(request, f'"{version}-interest"', lambda: respond(index))
@@ -0,0 +1,292 @@
+"""
+Database-backed background job queue.
+
+Jobs are rows in BackgroundJob. Workers started with
+``python manage.py run_jobs`` claim them with SELECT ... FOR UPDATE SKIP
+LOCKED, so any number of workers can share the table without a broker.
+Failed jobs are retried with exponential backoff up to max_attempts.
+
+Periodic work registers with ``recurring``; each worker poll queues the
+next run of such a job once the previous one has finished, so no cron
+daemon is needed.
+"""
+import logging
+import traceback
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .blobs import collect_unreferenced
+from .geo import GEO_SOURCES, ingest_points
+from .keywords import ingest_keyword_list
+from .media import media_label, process_media
+from .models import BackgroundJob, Campaign, CampaignFile, Keyword
+from .pacing import pace
+from .reports import generate_campaign_file, generate_campaign_files
+
+logger = logging.getLogger(__name__)
+
+RETRY_DELAY = timedelta(seconds=30)
+# Running jobs whose worker has not finished them within this window are requeued.
+STALE_AFTER = timedelta(minutes=15)
+# Finished runs of recurring jobs are kept this long (the latest always is).
+RECURRING_HISTORY = timedelta(days=1)
+
+_handlers = {}
+_recurring = {}
+
+
+def handler(kind, on_failure=None):
+    """Register a function to run jobs of the given kind; on_failure runs once retries are exhausted."""
+    def register(func):
+        _handlers[kind] = (func, on_failure)
+        return func
+    return register
+
+
+def recurring(kind, every):
+    """Register a handler for jobs of the given kind and have workers run one every `every` (a timedelta)."""
+    def register(func):
+        _recurring[kind] = every
+        return handler(kind)(func)
+    return register
+
+
+def enqueue(kind, payload=None, max_attempts=3, run_after=None):
+    return BackgroundJob.objects.create(
+        kind=kind, payload=payload or {}, max_attempts=max_attempts, run_after=run_after or timezone.now()
+    )
+
+
+def schedule_recurring():
+    """
+    Queue the next run of each recurring job kind that has none pending or
+    running, and prune its old finished runs.
+    """
+    now = timezone.now()
+    for kind, every in _recurring.items():
+        jobs = BackgroundJob.objects.filter(kind=kind)
+        if jobs.filter(status__in=(BackgroundJob.Status.PENDING, BackgroundJob.Status.RUNNING)).exists():
+            continue
+        last = jobs.order_by("-id").values_list("pk", "updated_at").first()
+        if last is None:
+            enqueue(kind, max_attempts=1)
+            continue
+        enqueue(kind, max_attempts=1, run_after=max(now, last[1] + every))
+        jobs.filter(
+            status__in=(BackgroundJob.Status.DONE, BackgroundJob.Status.FAILED), updated_at__lt=now - RECURRING_HISTORY
+        ).exclude(pk=last[0]).delete()
+
+
+def requeue_stale():
+    cutoff = timezone.now() - STALE_AFTER
+    return BackgroundJob.objects.filter(
+        status=BackgroundJob.Status.RUNNING, locked_at__lt=cutoff
+    ).update(status=BackgroundJob.Status.PENDING, locked_at=None)
+
+
+def claim_job():
+    """Lock and mark the next due job as running, or return None when the queue is empty."""
+    now = timezone.now()
+    with transaction.atomic():
+        job = (
+            BackgroundJob.objects.select_for_update(skip_locked=True)
+            .filter(status=BackgroundJob.Status.PENDING, run_after__lte=now)
+            .order_by("run_after", "id")
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = BackgroundJob.Status.RUNNING
+        job.attempts += 1
+        job.locked_at = now
+        job.save(update_fields=["status", "attempts", "locked_at", "updated_at"])
+    return job
+
+
+def run_job(job):
+    func, on_failure = _handlers.get(job.kind, (None, None))
+    try:
+        if func is None:
+            raise LookupError(f"No handler registered for job kind '{job.kind}'")
+        func(job.payload)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            job.status = BackgroundJob.Status.PENDING
+            job.run_after = timezone.now() + RETRY_DELAY * (2 ** (job.attempts - 1))
+            logger.warning(f"Job {job} failed, retrying at {job.run_after}")
+        else:
+            job.status = BackgroundJob.Status.FAILED
+            logger.error(f"Job {job} failed permanently: {job.last_error}")
+            if on_failure is not None:
+                on_failure(job.payload)
+    else:
+        job.status = BackgroundJob.Status.DONE
+        job.last_error = ""
+    job.locked_at = None
+    job.save(update_fields=["status", "run_after", "locked_at", "last_error", "updated_at"])
+    return job.status
+
+
+def run_pending(limit=None):
+    """Run due jobs until the queue is empty (or limit jobs have run). Returns the number run."""
+    requeue_stale()
+    schedule_recurring()
+    count = 0
+    while limit is None or count < limit:
+        job = claim_job()
+        if job is None:
+            break
+        run_job(job)
+        count += 1
+    return count
+
+
+CAMPAIGN_FILE = "campaign_file"
+CAMPAIGN_FILE_BATCH = "campaign_file_batch"
+CAMPAIGN_FILE_BATCH_SIZE = 50
+
+
+def _campaign_file_failed(payload):
+    Campaign.objects.filter(pk=payload["campaign_id"]).update(file_status="failed")
+
+
+def _campaign_file_batch_failed(payload):
+    Campaign.objects.filter(pk__in=payload["campaign_ids"], file_status="pending").update(file_status="failed")
+
+
+@handler(CAMPAIGN_FILE, on_failure=_campaign_file_failed)
+def build_campaign_file(payload):
+    campaign = Campaign.objects.for_serializer().filter(pk=payload["campaign_id"]).first()
+    if campaign is not None:
+        generate_campaign_file(campaign)
+
+
+def enqueue_campaign_file(campaign_id):
+    """Queue generation of a campaign's workbook once the current transaction commits."""
+    transaction.on_commit(lambda: enqueue(CAMPAIGN_FILE, {"campaign_id": campaign_id}))
+
+
+@handler(CAMPAIGN_FILE_BATCH, on_failure=_campaign_file_batch_failed)
+def build_campaign_files(payload):
+    generate_campaign_files(payload["campaign_ids"])
+
+
+def queued_campaign_ids():
+    """Ids of campaigns with a pending or running workbook job."""
+    live = BackgroundJob.objects.filter(
+        kind__in=(CAMPAIGN_FILE, CAMPAIGN_FILE_BATCH),
+        status__in=(BackgroundJob.Status.PENDING, BackgroundJob.Status.RUNNING),
+    ).values_list("payload", flat=True)
+    queued = set()
+    for payload in live:
+        if "campaign_id" in payload:
+            queued.add(payload["campaign_id"])
+        queued.update(payload.get("campaign_ids", ()))
+    return queued
+
+
+def enqueue_campaign_files(campaign_ids):
+    """
+    Mark campaigns as pending and queue their workbooks in batches. Returns the jobs created.
+
+    Campaigns that already have a file or a pending or running workbook job
+    are skipped. The campaign rows are locked first, so concurrent callers
+    queue each campaign once.
+    """
+    campaign_ids = sorted(set(campaign_ids))
+    if not campaign_ids:
+        return []
+    with transaction.atomic():
+        locked = list(
+            Campaign.objects.select_for_update().filter(pk__in=campaign_ids).order_by("pk").values_list("pk", flat=True)
+        )
+        queued = queued_campaign_ids()
+        filed = set(CampaignFile.objects.filter(campaign_id__in=locked).values_list("campaign_id", flat=True))
+        campaign_ids = [pk for pk in locked if pk not in queued and pk not in filed]
+        if not campaign_ids:
+            return []
+        Campaign.objects.filter(pk__in=campaign_ids).update(file_status="pending")
+        return BackgroundJob.objects.bulk_create(
+            [
+                BackgroundJob(
+                    kind=CAMPAIGN_FILE_BATCH,
+                    payload={"campaign_ids": campaign_ids[start:start + CAMPAIGN_FILE_BATCH_SIZE]},
+                )
+                for start in range(0, len(campaign_ids), CAMPAIGN_FILE_BATCH_SIZE)
+            ]
+        )
+
+
+MEDIA_PROCESS = "media_process"
+
+
+@handler(MEDIA_PROCESS)
+def build_media_renditions(payload):
+    process_media(payload["model"], payload["pk"])
+
+
+def enqueue_media_processing(instance):
+    """Queue thumbnail and metadata extraction for an uploaded creative, image or video."""
+    label = media_label(instance)
+    if label is not None:
+        transaction.on_commit(lambda: enqueue(MEDIA_PROCESS, {"model": label, "pk": instance.pk}))
+
+
+KEYWORD_LIST = "keyword_list"
+
+
+@handler(KEYWORD_LIST)
+def parse_keyword_list(payload):
+    if Keyword.objects.filter(pk=payload["keyword_id"]).exists():
+        ingest_keyword_list(payload["keyword_id"])
+
+
+def enqueue_keyword_list(keyword):
+    """Queue parsing of a keyword list into KeywordTerm rows once the current transaction commits."""
+    transaction.on_commit(lambda: enqueue(KEYWORD_LIST, {"keyword_id": keyword.pk}))
+
+
+GEO_POINTS = "geo_points"
+
+
+@handler(GEO_POINTS)
+def parse_geo_points(payload):
+    model, fk = GEO_SOURCES[payload["source"]]
+    if model.objects.filter(pk=payload["pk"]).exists():
+        ingest_points(payload["source"], payload["pk"])
+
+
+def enqueue_geo_points(instance):
+    """Queue parsing of a proximity or proximity_store upload into GeoPoint rows."""
+    for source, (model, fk) in GEO_SOURCES.items():
+        if isinstance(instance, model):
+            transaction.on_commit(lambda: enqueue(GEO_POINTS, {"source": source, "pk": instance.pk}))
+            return
+
+
+def enqueue_upload_processing(instance):
+    """Queue whatever post-upload work applies to a newly stored file."""
+    if isinstance(instance, Keyword):
+        enqueue_keyword_list(instance)
+    else:
+        enqueue_geo_points(instance)
+        enqueue_media_processing(instance)
+
+
+PACE_CAMPAIGNS = "pace_campaigns"
+
+
+@recurring(PACE_CAMPAIGNS, every=timedelta(minutes=15))
+def pace_campaigns(payload):
+    pace()
+
+
+COLLECT_BLOBS = "collect_blobs"
+
+
+@recurring(COLLECT_BLOBS, every=timedelta(hours=6))
+def collect_unreferenced_blobs(payload):
+    collect_unreferenced()
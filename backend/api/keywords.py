@@ -0,0 +1,143 @@
+"""
+Keyword list ingestion and queries.
+
+Uploaded keyword files (CSV, plain text or a workbook) and inline
+``keywords`` lists are streamed row by row. Each term is normalized
+(trimmed, lower-cased, whitespace collapsed) and stored once per list in
+KeywordTerm. Memory stays flat: terms are deduplicated per batch and the
+unique constraint drops duplicates across batches, so a 1M-term list never
+sits in memory. A re-parse writes a new generation of terms in committed
+batches and switches to it with one UPDATE, so lookups never see a
+half-written list. Membership, overlap and paging are plain indexed queries.
+"""
+import re
+
+from django.utils import timezone
+
+from .delivery import iter_report_rows
+from .models import Keyword, KeywordTerm
+
+BATCH_SIZE = 5000
+MAX_TERM_LENGTH = 255
+HEADER_NAMES = {"keyword", "keywords", "term", "terms"}
+
+_whitespace = re.compile(r"\s+")
+
+
+def normalize_term(value):
+    if value is None:
+        return None
+    term = _whitespace.sub(" ", str(value)).strip().strip("\"'").strip().lower()
+    if not term or len(term) > MAX_TERM_LENGTH:
+        return None
+    return term
+
+
+def iter_file_terms(field_file):
+    """Yield normalized terms from every cell of an uploaded keyword file, skipping a header row."""
+    field_file.open("rb")
+    rows = iter_report_rows(field_file)
+    try:
+        first = True
+        for row in rows:
+            terms = [normalize_term(cell) for cell in row]
+            if first and terms and terms[0] in HEADER_NAMES:
+                first = False
+                continue
+            first = False
+            yield from (term for term in terms if term)
+    finally:
+        rows.close()
+        field_file.close()
+
+
+def iter_keyword_terms(keyword):
+    if keyword.keywords:
+        values = keyword.keywords if isinstance(keyword.keywords, list) else [keyword.keywords]
+        for value in values:
+            # Inline lists may hold comma-separated strings.
+            for part in str(value).split(","):
+                term = normalize_term(part)
+                if term:
+                    yield term
+    if keyword.file:
+        yield from iter_file_terms(keyword.file)
+
+
+def _insert(keyword_id, generation, batch):
+    KeywordTerm.objects.bulk_create(
+        [KeywordTerm(keyword_id=keyword_id, generation=generation, term=term) for term in batch],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def ingest_keyword_list(keyword_id):
+    """
+    Replace the stored terms of a keyword list with its parsed contents. Returns the term count.
+
+    As api.geo does for points, the new terms are written as the next
+    generation, committing every BATCH_SIZE terms, while lookups keep
+    serving the current one. A single UPDATE then switches the list over and
+    the old terms are deleted afterwards in batches.
+    """
+    keyword = Keyword.objects.get(pk=keyword_id)
+    generation = keyword.term_generation + 1
+    # Leftovers of an interrupted parse.
+    _delete_in_batches(KeywordTerm.objects.filter(keyword_id=keyword_id, generation=generation))
+
+    batch = set()
+    for term in iter_keyword_terms(keyword):
+        batch.add(term)
+        if len(batch) >= BATCH_SIZE:
+            _insert(keyword_id, generation, batch)
+            batch = set()
+    if batch:
+        _insert(keyword_id, generation, batch)
+    term_count = KeywordTerm.objects.filter(keyword_id=keyword_id, generation=generation).count()
+
+    Keyword.objects.filter(pk=keyword_id).update(
+        term_generation=generation, term_count=term_count, parsed_at=timezone.now()
+    )
+    _delete_in_batches(KeywordTerm.objects.filter(keyword_id=keyword_id).exclude(generation=generation))
+    return term_count
+
+
+def _delete_in_batches(queryset):
+    while True:
+        ids = list(queryset.values_list("id", flat=True)[:BATCH_SIZE])
+        if not ids:
+            return
+        KeywordTerm.objects.filter(id__in=ids).delete()
+
+
+def _terms(keyword_id):
+    """The served generation of a list's terms."""
+    generation = Keyword.objects.filter(pk=keyword_id).values_list("term_generation", flat=True).first()
+    return KeywordTerm.objects.filter(keyword_id=keyword_id, generation=generation or 0)
+
+
+def page_terms(keyword_id, after=None, limit=100):
+    """Terms of a list in sorted order, keyset-paged on the term."""
+    queryset = _terms(keyword_id)
+    if after:
+        queryset = queryset.filter(term__gt=after)
+    return list(queryset.order_by("term").values_list("term", flat=True)[:limit])
+
+
+def contains(keyword_id, terms):
+    """The subset of terms (normalized) that are in the list."""
+    normalized = {normalize_term(term) for term in terms} - {None}
+    return set(
+        _terms(keyword_id).filter(term__in=normalized).values_list("term", flat=True)
+    )
+
+
+def overlap(keyword_id, other_id, after=None, limit=100):
+    """Count of terms shared by two lists plus one keyset page of them."""
+    shared = _terms(keyword_id).filter(term__in=_terms(other_id).values("term"))
+    page = shared.filter(term__gt=after) if after else shared
+    return {
+        "count": shared.count(),
+        "terms": list(page.order_by("term").values_list("term", flat=True)[:limit]),
+    }
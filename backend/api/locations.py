@@ -0,0 +1,121 @@
+"""
+In-memory location index for the campaign wizard.
+
+All Location rows are loaded once per version into a country -> state ->
+city tree and a prefix trie over city names, so tree expansion and
+typeahead never touch the database. The version stamp (see
+api.versioned_cache) is bumped whenever a Location row changes.
+"""
+from .models import Location
+from .versioned_cache import VersionedCache
+
+LOCATION_FIELDS = ("id", "country", "state", "city", "tier", "population")
+
+
+class LocationTrie:
+    """
+    Prefix trie over location names. Every node keeps the ids of all
+    locations below it, ordered by population, so a lookup is a walk down
+    the prefix followed by a slice.
+    """
+
+    def __init__(self):
+        self.root = {"children": {}, "ids": []}
+
+    def insert(self, name, location_id):
+        node = self.root
+        for char in name.lower():
+            node = node["children"].setdefault(char, {"children": {}, "ids": []})
+            if not node["ids"] or node["ids"][-1] != location_id:
+                node["ids"].append(location_id)
+
+    def search(self, prefix):
+        node = self.root
+        for char in prefix.lower():
+            node = node["children"].get(char)
+            if node is None:
+                return []
+        return node["ids"]
+
+
+class LocationIndex:
+    def __init__(self, rows):
+        # Most populous first, so typeahead and tree listings rank big cities on top.
+        rows = sorted(rows, key=lambda row: (-row["population"], row["id"]))
+        self.rows = sorted(rows, key=lambda row: row["id"])
+        self.by_id = {row["id"]: row for row in rows}
+        self.trie = LocationTrie()
+        self.tree = {}
+        # (country, state) -> tier -> [locations, population], so tree levels
+        # aggregate per state rather than per location.
+        self.totals = {}
+        for row in rows:
+            names = {row["city"]}
+            # Also match on later words: "mum" finds "Navi Mumbai".
+            names.update(row["city"].split())
+            for name in names:
+                self.trie.insert(name, row["id"])
+            states = self.tree.setdefault(row["country"], {})
+            states.setdefault(row["state"], []).append(row["id"])
+            totals = self.totals.setdefault((row["country"], row["state"]), {})
+            tier_totals = totals.setdefault(row["tier"], [0, 0])
+            tier_totals[0] += 1
+            tier_totals[1] += row["population"]
+
+    @classmethod
+    def from_db(cls):
+        return cls(list(Location.objects.values(*LOCATION_FIELDS)))
+
+    def filter(self, tiers=None):
+        if not tiers:
+            return self.rows
+        return [row for row in self.rows if row["tier"] in tiers]
+
+    def search(self, prefix, tiers=None, limit=20):
+        results = []
+        for location_id in self.trie.search(prefix.strip()):
+            row = self.by_id[location_id]
+            if tiers and row["tier"] not in tiers:
+                continue
+            results.append(row)
+            if len(results) >= limit:
+                break
+        return results
+
+    def children(self, country=None, state=None, tiers=None):
+        """
+        One level of the tree: countries, the states of a country, or the
+        cities of a state. Nodes carry the location count and population
+        below them so the client can expand lazily.
+        """
+        if country is None:
+            nodes = {}
+            for (country_name, state_name) in self.totals:
+                nodes.setdefault(country_name, []).append((country_name, state_name))
+        elif state is None:
+            nodes = {state_name: [(country, state_name)] for state_name in self.tree.get(country, {})}
+        else:
+            return [
+                self.by_id[i] for i in self.tree.get(country, {}).get(state, [])
+                if not tiers or self.by_id[i]["tier"] in tiers
+            ]
+
+        result = []
+        for name, keys in sorted(nodes.items()):
+            count = population = 0
+            for key in keys:
+                for tier, (tier_count, tier_population) in self.totals[key].items():
+                    if not tiers or tier in tiers:
+                        count += tier_count
+                        population += tier_population
+            if count:
+                result.append({"name": name, "count": count, "population": population})
+        return result
+
+
+_index = VersionedCache("locations", LocationIndex.from_db)
+_index.invalidate_on_change(Location)
+
+
+def get_index():
+    return _index.get()[1]
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api.pacing import backfill_billed_spend
+
+
+class Command(BaseCommand):
+    help = 'Marks the spend of campaigns created before wallet billing as already billed'
+
+    def handle(self, *args, **options):
+        count = backfill_billed_spend()
+        self.stdout.write(self.style.SUCCESS(f'Backfilled billed spend of {count} campaign(s)'))
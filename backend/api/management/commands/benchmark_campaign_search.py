@@ -0,0 +1,73 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.models import Campaign, UserProfile
+from api.search import index_campaigns, search_campaigns
+
+WORDS = [
+    "summer", "winter", "sale", "launch", "brand", "promo", "festive", "diwali", "retail", "mobile",
+    "video", "banner", "awareness", "reach", "store", "grocery", "fashion", "auto", "travel", "finance",
+]
+STATUSES = ["Created", "Learning", "Live", "Pause Option", "Completed"]
+QUERIES = ["summer sale", "sale", "diw", "acme", "live, winter launch", "brand promo mobile", "nomatch"]
+
+
+class Command(BaseCommand):
+    help = 'Times campaign search against generated campaigns; everything is rolled back afterwards'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--campaigns', type=int, default=100000, help='Number of campaigns to generate')
+        parser.add_argument('--campaigns-per-user', type=int, default=100, help='Campaigns per generated owner')
+        parser.add_argument('--repeat', type=int, default=20, help='Runs of each query')
+
+    def handle(self, *args, **options):
+        random.seed(0)
+        with transaction.atomic():
+            self._run(options)
+            transaction.set_rollback(True)
+
+    def _run(self, options):
+        count = options['campaigns']
+        owners = max(1, count // options['campaigns_per_user'])
+        started = time.perf_counter()
+        users = User.objects.bulk_create(
+            [User(username=f"bench{i}", email=f"bench{i}@example.com", first_name=f"Owner{i}") for i in range(owners)],
+            batch_size=1000,
+        )
+        UserProfile.objects.bulk_create(
+            [UserProfile(user=user, company_name=random.choice(["Acme", "Globex", "Initech"])) for user in users],
+            batch_size=1000,
+        )
+        Campaign.objects.bulk_create(
+            [
+                Campaign(
+                    user=users[i % owners],
+                    name=" ".join(random.sample(WORDS, 3)) + f" {i}",
+                    status=random.choice(STATUSES),
+                )
+                for i in range(count)
+            ],
+            batch_size=1000,
+        )
+        index_campaigns(Campaign.objects.filter(user__in=users))
+        self.stdout.write(f'Generated and indexed {count} campaigns in {time.perf_counter() - started:.1f}s')
+
+        # Searched as fetch_user_campgain does, over the whole table.
+        campaigns = Campaign.objects.all()
+        for query in QUERIES:
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                page = list(search_campaigns(campaigns, query).values_list("id", flat=True)[:20])
+                timings.append((time.perf_counter() - started) * 1000)
+            total = search_campaigns(campaigns, query).count()
+            timings.sort()
+            self.stdout.write(
+                f'{query!r:24} {total:>7} matches, first page median {statistics.median(timings):.1f}ms, '
+                f'max {timings[-1]:.1f}ms ({len(page)} rows)'
+            )
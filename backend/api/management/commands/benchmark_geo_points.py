@@ -0,0 +1,67 @@
+import io
+import random
+import statistics
+import time
+
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from api.geo import BATCH_SIZE, iter_points, location_counts, points_in_bbox, points_within
+from api.models import GeoPoint, proximity_store
+
+CITIES = [("Delhi", 28.61, 77.21), ("Mumbai", 19.08, 72.88), ("Bengaluru", 12.97, 77.59), ("Kolkata", 22.57, 88.36)]
+
+
+class Command(BaseCommand):
+    help = 'Times store-point parsing and radius/box lookups on generated points; everything is rolled back afterwards'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--points', type=int, default=100000, help='Number of store points to generate')
+        parser.add_argument('--repeat', type=int, default=50, help='Runs of each query')
+
+    def handle(self, *args, **options):
+        random.seed(0)
+        with transaction.atomic():
+            self._run(options)
+            transaction.set_rollback(True)
+
+    def _run(self, options):
+        count = options['points']
+        csv = io.StringIO()
+        csv.write('name,city,latitude,longitude,radius\n')
+        for i in range(count):
+            city, lat, lng = random.choice(CITIES)
+            csv.write(f'Store {i},{city},{lat + random.uniform(-1, 1):.6f},{lng + random.uniform(-1, 1):.6f},2\n')
+        upload = ContentFile(csv.getvalue().encode(), name='stores.csv')
+
+        # Parsed and inserted as api.geo.ingest_points does, without going through file storage.
+        instance = proximity_store.objects.create(uploaded_at=timezone.now())
+        started = time.perf_counter()
+        batch = []
+        for values in iter_points(upload):
+            batch.append(GeoPoint(proximity_store=instance, **values))
+            if len(batch) >= BATCH_SIZE:
+                GeoPoint.objects.bulk_create(batch)
+                batch = []
+        GeoPoint.objects.bulk_create(batch)
+        self.stdout.write(f'Parsed and stored {count} points in {time.perf_counter() - started:.1f}s')
+
+        queries = [
+            ('radius 5km', lambda: points_within('proximity_store', instance.pk, 28.61, 77.21, 5)),
+            ('radius 25km', lambda: points_within('proximity_store', instance.pk, 28.61, 77.21, 25)),
+            ('radius 100km', lambda: points_within('proximity_store', instance.pk, 19.08, 72.88, 100)),
+            ('bbox 1x1 degree', lambda: list(points_in_bbox('proximity_store', instance.pk, 12.5, 13.5, 77, 78)[:1000])),
+            ('location counts', lambda: location_counts('proximity_store', instance.pk)),
+        ]
+        for label, query in queries:
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                rows = query()
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            self.stdout.write(
+                f'{label:18} {len(rows):>5} rows, median {statistics.median(timings):.1f}ms, max {timings[-1]:.1f}ms'
+            )
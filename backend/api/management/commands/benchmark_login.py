@@ -0,0 +1,95 @@
+import statistics
+import threading
+import time
+
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from api.backends import EmailOrUsernameBackend
+from api.models import UserType
+
+PREFIX = "loginbench"
+PASSWORD = "bench-password"
+
+
+def legacy_login(email, password):
+    """The login path before EmailOrUsernameBackend: username lookup, then an email fallback with a second hash."""
+    user = ModelBackend().authenticate(None, username=email, password=password)
+    if user is None:
+        try:
+            user = User.objects.get(email=email)
+        except User.DoesNotExist:
+            return None
+        if not user.check_password(password):
+            return None
+    UserType.objects.filter(user=user).values_list("user_type_pm", flat=True).first()
+    return user
+
+
+def backend_login(email, password):
+    return EmailOrUsernameBackend().authenticate(None, username=email, password=password)
+
+
+class Command(BaseCommand):
+    help = 'Times concurrent email logins through the old and the current login path; generated users are removed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Number of users to generate')
+        parser.add_argument('--logins', type=int, default=200, help='Logins per login path')
+        parser.add_argument('--threads', type=int, default=8, help='Concurrent login threads')
+
+    def handle(self, *args, **options):
+        # Generated outside a transaction so every thread's connection sees the users.
+        password = make_password(PASSWORD)
+        User.objects.bulk_create(
+            [
+                User(username=f"{PREFIX}-{i}", email=f"{PREFIX}{i}@example.com", password=password)
+                for i in range(options['users'])
+            ],
+            batch_size=1000,
+        )
+        users = list(User.objects.filter(username__startswith=f"{PREFIX}-"))
+        UserType.objects.bulk_create([UserType(user=user, user_type_pm=False) for user in users], batch_size=1000)
+        try:
+            emails = [user.email for user in users]
+            for label, login in (('legacy', legacy_login), ('backend', backend_login)):
+                self._run(label, login, emails, options)
+        finally:
+            UserType.objects.filter(user__username__startswith=f"{PREFIX}-").delete()
+            User.objects.filter(username__startswith=f"{PREFIX}-").delete()
+
+    def _run(self, label, login, emails, options):
+        logins, threads = options['logins'], options['threads']
+        timings = []
+        failures = []
+        lock = threading.Lock()
+
+        def worker(offset):
+            try:
+                for i in range(offset, logins, threads):
+                    started = time.perf_counter()
+                    user = login(emails[i % len(emails)], PASSWORD)
+                    elapsed = (time.perf_counter() - started) * 1000
+                    with lock:
+                        timings.append(elapsed)
+                        if user is None:
+                            failures.append(i)
+            finally:
+                connection.close()
+
+        started = time.perf_counter()
+        workers = [threading.Thread(target=worker, args=(offset,)) for offset in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        total = time.perf_counter() - started
+        timings.sort()
+        self.stdout.write(
+            f'{label:8} {logins / total:6.1f} logins/s over {threads} threads, '
+            f'median {statistics.median(timings):.0f}ms, p95 {timings[int(len(timings) * 0.95) - 1]:.0f}ms, '
+            f'{len(failures)} failed'
+        )
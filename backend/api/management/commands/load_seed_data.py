@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.bulk_sync import DATASETS, sync_dataset
+
+
+class Command(BaseCommand):
+    help = 'Loads the JSON seed data in data/ into the lookup tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'datasets',
+            nargs='*',
+            help=f'Datasets to load (default: all). Choices: {", ".join(DATASETS)}',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would change without writing anything',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Sync even when the data file is unchanged since the last load',
+        )
+        parser.add_argument(
+            '--prune',
+            action='store_true',
+            help='Delete rows that are no longer present in the data file and merge duplicate rows',
+        )
+
+    def handle(self, *args, **options):
+        names = options['datasets'] or list(DATASETS)
+        unknown = [name for name in names if name not in DATASETS]
+        if unknown:
+            raise CommandError(f'Unknown dataset(s): {", ".join(unknown)}')
+
+        for name in names:
+            started = time.perf_counter()
+            result = sync_dataset(
+                name,
+                prune=options['prune'],
+                dry_run=options['dry_run'],
+                force=options['force'],
+            )
+            elapsed = time.perf_counter() - started
+            if result is None:
+                self.stdout.write(f'{name}: unchanged since last load, skipped ({elapsed:.2f}s)')
+                continue
+            summary = ', '.join(f'{count} {action}' for action, count in result.items())
+            self.stdout.write(self.style.SUCCESS(f'{name}: {summary} ({elapsed:.2f}s)'))
+        if options['dry_run']:
+            self.stdout.write('Dry run: no changes were written')
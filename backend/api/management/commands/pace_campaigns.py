@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.pacing import pace
+
+
+class Command(BaseCommand):
+    help = 'Debits campaign spend from wallets, completes or pauses campaigns and reports daily pacing'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verbose-pacing',
+            action='store_true',
+            help='Print the pacing of every running campaign',
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        summary = pace()
+        elapsed = time.perf_counter() - started
+        if options['verbose_pacing']:
+            for row in summary['pacing']:
+                self.stdout.write(
+                    f"Campaign {row['campaign_id']}: spent {row['spent_today']} of "
+                    f"{row['daily_budget']} today (pace {row['pace']})"
+                )
+        ahead = sum(1 for row in summary['pacing'] if row['pace'] and row['pace'] > 1)
+        self.stdout.write(self.style.SUCCESS(
+            f"Billed {summary['billed']} campaign(s) "
+            f"({summary['insufficient_funds']} short of funds), "
+            f"completed {len(summary['completed'])}, paused {len(summary['paused'])}, "
+            f"resumed {len(summary['resumed'])}, "
+            f"{ahead} of {len(summary['pacing'])} running ahead of pace, in {elapsed:.2f}s"
+        ))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from api.jobs import MEDIA_PROCESS, enqueue
+from api.media import MEDIA_MODELS
+
+
+class Command(BaseCommand):
+    help = 'Queues thumbnail and metadata extraction for creatives, campaign images and videos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Reprocess objects that already have media metadata',
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        for label, (model, field_name) in MEDIA_MODELS.items():
+            queryset = model.objects.exclude(**{field_name: ''})
+            if not options['all']:
+                queryset = queryset.filter(media__isnull=True)
+            pks = list(queryset.values_list('pk', flat=True))
+            for pk in pks:
+                enqueue(MEDIA_PROCESS, {'model': label, 'pk': pk})
+            total += len(pks)
+            self.stdout.write(f'{label}: queued {len(pks)}')
+        self.stdout.write(self.style.SUCCESS(f'Queued media processing for {total} objects'))
@@ -0,0 +1,16 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the dashboard rollup tables from the campaign table'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding campaign rollups...')
+        started = time.perf_counter()
+        rebuild()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Campaign rollups rebuilt in {elapsed:.2f}s'))
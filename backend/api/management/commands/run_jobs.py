@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.jobs import run_pending
+
+
+class Command(BaseCommand):
+    help = 'Runs queued background jobs (campaign workbook generation and friends)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Drain the queue once and exit instead of polling',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=1.0,
+            help='Seconds to wait between polls when the queue is empty',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('Processing background jobs...')
+        while True:
+            count = run_pending()
+            if count:
+                self.stdout.write(f'Ran {count} job(s)')
+            if options['once']:
+                break
+            time.sleep(options['sleep'])
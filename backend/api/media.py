@@ -0,0 +1,192 @@
+"""
+Post-upload media processing for creatives and campaign images/videos.
+
+Runs as a background job (see api.jobs). It records the file size and
+image dimensions (or video dimensions and duration) and stores WebP
+thumbnails at THUMBNAIL_SIZES next to the original. Videos also get a
+poster frame. The results go in the model's ``media`` JSON field and the
+serializers expose them as URLs, so list views can load small previews.
+
+Renditions are written through plain storage under names derived from the
+original's, so rows sharing a deduplicated file share its renditions, and
+they are deleted together with the original's blob (see api.blobs) rather
+than reference-counted themselves.
+
+Video probing and poster frames need the ffprobe/ffmpeg binaries. Without
+them videos only get their size recorded.
+"""
+import io
+import json
+import os
+import posixpath
+import shutil
+import subprocess
+import tempfile
+
+from django.core.files.base import ContentFile
+from PIL import Image, UnidentifiedImageError
+from storages.backends.s3boto3 import S3Boto3Storage
+
+from .models import CampaignImage, CampaignVideo, Creative
+
+# Model label -> (model, file field)
+MEDIA_MODELS = {
+    "creative": (Creative, "file"),
+    "campaign_image": (CampaignImage, "image"),
+    "campaign_video": (CampaignVideo, "video"),
+}
+
+THUMBNAIL_SIZES = (160, 480)
+WEBP_QUALITY = 80
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".m4v", ".webm", ".avi", ".mkv")
+POSTER_OFFSET = "1"
+FFMPEG_TIMEOUT = 120
+
+# Rendition names are fixed per original, so building them again overwrites.
+rendition_storage = S3Boto3Storage(file_overwrite=True)
+
+
+def media_label(instance):
+    for label, (model, field_name) in MEDIA_MODELS.items():
+        if isinstance(instance, model):
+            return label
+    return None
+
+
+def _rendition_name(name, suffix):
+    directory, filename = posixpath.split(name)
+    stem = os.path.splitext(filename)[0]
+    return posixpath.join(directory, "renditions", f"{stem}-{suffix}")
+
+
+def rendition_names(name):
+    """Every rendition name process_media can write for the original name."""
+    return [_rendition_name(name, f"{size}.webp") for size in THUMBNAIL_SIZES] + [_rendition_name(name, "poster.webp")]
+
+
+def _save_rendition(name, suffix, image):
+    buffer = io.BytesIO()
+    image.save(buffer, "WEBP", quality=WEBP_QUALITY)
+    return rendition_storage.save(_rendition_name(name, suffix), ContentFile(buffer.getvalue()))
+
+
+def _thumbnails(image, name):
+    """Save one WebP per THUMBNAIL_SIZES edge length; returns {size: name}."""
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+    thumbnails = {}
+    for size in THUMBNAIL_SIZES:
+        thumbnail = image.copy()
+        thumbnail.thumbnail((size, size))
+        thumbnails[str(size)] = _save_rendition(name, f"{size}.webp", thumbnail)
+    return thumbnails
+
+
+def _probe_video(path):
+    result = subprocess.run(
+        [
+            "ffprobe", "-v", "error", "-select_streams", "v:0",
+            "-show_entries", "stream=width,height:format=duration", "-of", "json", path,
+        ],
+        capture_output=True, check=True, timeout=FFMPEG_TIMEOUT,
+    )
+    probe = json.loads(result.stdout or b"{}")
+    stream = (probe.get("streams") or [{}])[0]
+    duration = probe.get("format", {}).get("duration")
+    return {
+        "width": stream.get("width"),
+        "height": stream.get("height"),
+        "duration": round(float(duration), 2) if duration else None,
+    }
+
+
+def _poster_frame(path):
+    result = subprocess.run(
+        ["ffmpeg", "-v", "error", "-ss", POSTER_OFFSET, "-i", path, "-frames:v", "1", "-f", "image2pipe", "-vcodec", "png", "-"],
+        capture_output=True, check=True, timeout=FFMPEG_TIMEOUT,
+    )
+    if not result.stdout:
+        # Clips shorter than the offset: take the first frame instead.
+        result = subprocess.run(
+            ["ffmpeg", "-v", "error", "-i", path, "-frames:v", "1", "-f", "image2pipe", "-vcodec", "png", "-"],
+            capture_output=True, check=True, timeout=FFMPEG_TIMEOUT,
+        )
+    return Image.open(io.BytesIO(result.stdout))
+
+
+def _process_video(storage, name):
+    if not (shutil.which("ffprobe") and shutil.which("ffmpeg")):
+        return {"kind": "video"}
+    suffix = os.path.splitext(name)[1]
+    with tempfile.NamedTemporaryFile(suffix=suffix) as local:
+        with storage.open(name, "rb") as remote:
+            shutil.copyfileobj(remote, local)
+        local.flush()
+        media = dict(_probe_video(local.name), kind="video")
+        with _poster_frame(local.name) as poster:
+            media["poster"] = _save_rendition(name, "poster.webp", poster.convert("RGB"))
+            media["thumbnails"] = _thumbnails(poster, name)
+    return media
+
+
+def _process_image(storage, name):
+    """Returns the image metadata and thumbnails, or None when the file is not an image."""
+    with storage.open(name, "rb") as remote:
+        try:
+            with Image.open(remote) as image:
+                image.load()
+                return {
+                    "kind": "image",
+                    "width": image.width,
+                    "height": image.height,
+                    "format": image.format,
+                    "thumbnails": _thumbnails(image, name),
+                }
+        except UnidentifiedImageError:
+            return None
+
+
+def process_media(label, pk):
+    """Extract metadata and build renditions for one object; stores them on its media field."""
+    model, field_name = MEDIA_MODELS[label]
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None:
+        return None
+    field_file = getattr(instance, field_name)
+    if not field_file:
+        return None
+    storage, name = field_file.storage, field_file.name
+
+    # Deduplicated uploads share their file and so its renditions; reuse them when already built.
+    processed = (
+        model.objects.filter(**{field_name: name}, media__isnull=False).exclude(pk=pk)
+        .values_list("media", flat=True).first()
+    )
+    if processed is not None:
+        model.objects.filter(pk=pk).update(media=processed)
+        return processed
+
+    is_video = model is CampaignVideo or name.lower().endswith(VIDEO_EXTENSIONS) or (
+        model is Creative and instance.creative_type == Creative.CreativeType.VIDEO
+    )
+    media = None if is_video else _process_image(storage, name)
+    if media is None and is_video:
+        media = _process_video(storage, name)
+    if media is None:
+        media = {"kind": "file"}
+    media["size"] = storage.size(name)
+
+    model.objects.filter(pk=pk).update(media=media)
+    return media
+
+
+def media_urls(media):
+    """The media field with rendition names turned into URLs, for serializers."""
+    if not media:
+        return None
+    data = dict(media)
+    if data.get("poster"):
+        data["poster"] = rendition_storage.url(data["poster"])
+    if data.get("thumbnails"):
+        data["thumbnails"] = {size: rendition_storage.url(name) for size, name in data["thumbnails"].items()}
+    return data
@@ -3,19 +3,32 @@ from datetime import datetime
 
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Value
+from django.db.models.functions import Coalesce
 from django.db.models.signals import post_save
 from django.dispatch import receiver
+from django.utils import timezone
 from storages.backends.s3boto3 import S3Boto3Storage
 from django.core.validators import FileExtensionValidator
 
+from .storage import ContentAddressedStorage
+
 
 class Location(models.Model):
     country = models.CharField(max_length=254)
     state = models.CharField(max_length=254)
     city = models.CharField(max_length=254)
     tier = models.CharField(max_length=254)
-    population = models.CharField(max_length=254)
+    population = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # Tree expansion (country -> state -> city) and tier filters.
+            models.Index(fields=["country", "state", "city"], name="location_hierarchy_idx"),
+            models.Index(fields=["tier"], name="location_tier_idx"),
+            models.Index(fields=["city"], name="location_city_idx"),
+        ]
 
 class BrandSafety(models.Model):
     value = models.CharField(max_length=254, blank=True, null=True, default="")
@@ -99,6 +112,75 @@ class UserWallet(models.Model):
         db_table = 'api_userwallet'
 
 
+class WalletTransaction(models.Model):
+    """
+    Append-only ledger of wallet balance changes, written by api.wallet in
+    the same transaction as the balance update. Never updated or deleted.
+    """
+    class Kind(models.TextChoices):
+        CREDIT = "credit", "Credit"
+        DEBIT = "debit", "Debit"
+        SPEND = "spend", "Campaign spend"
+
+    wallet = models.ForeignKey(UserWallet, on_delete=models.PROTECT, related_name="transactions")
+    kind = models.CharField(max_length=10, choices=Kind.choices)
+    # Signed: positive for credits, negative for debits and spend.
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    balance_after = models.DecimalField(max_digits=12, decimal_places=2)
+    campaign = models.ForeignKey("Campaign", on_delete=models.SET_NULL, null=True, blank=True, related_name="wallet_transactions")
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    idempotency_key = models.CharField(max_length=100, unique=True, null=True, blank=True)
+    description = models.CharField(max_length=255, blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["wallet", "-created_at"], name="wallettx_wallet_created_idx"),
+            models.Index(fields=["campaign", "kind"], name="wallettx_campaign_kind_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.amount} on wallet #{self.wallet_id}"
+
+
+
+class CampaignQuerySet(models.QuerySet):
+    # Relations rendered by the nested CampaignSerializer.
+    SERIALIZER_PREFETCH = (
+        "images",
+        "video",
+        "keywords",
+        "location",
+        "target_type",
+        "tag_tracker",
+        "creative",
+        "campaign_files",
+        "proximity",
+        "proximity_store",
+        "weather",
+    )
+    # Many-to-many fields rendered as primary key lists by CampaignCreateUpdateSerializer.
+    PK_PREFETCH = (
+        "images",
+        "video",
+        "keywords",
+        "location",
+        "target_type",
+        "tag_tracker",
+        "creative",
+        "proximity",
+        "proximity_store",
+        "weather",
+    )
+
+    def for_serializer(self):
+        """Load everything CampaignSerializer touches in a fixed number of queries."""
+        return self.select_related("user__profile").prefetch_related(*self.SERIALIZER_PREFETCH)
+
+    def for_pk_serializer(self):
+        """Load the relation ids CampaignCreateUpdateSerializer renders."""
+        return self.prefetch_related(*self.PK_PREFETCH)
+
 
 class Campaign(models.Model):
     user = models.ForeignKey(
@@ -151,8 +233,24 @@ class Campaign(models.Model):
     views = models.PositiveIntegerField(default=0)
     vtr = models.DecimalField(max_digits=5, decimal_places=2, default=0.0)
     payment = models.CharField(max_length=50, blank=True, null=True)
+    # Part of payment already debited from the owner's wallet (api.pacing).
+    # NULL for campaigns that predate billing until backfill_billed_spend runs.
+    billed_spend = models.DecimalField(max_digits=12, decimal_places=2, blank=True, null=True)
+    # Status a campaign had when pacing paused it for lack of funds; restored once its spend is billed.
+    pacing_paused_from = models.CharField(max_length=50, blank=True, null=True)
     buy_type = models.CharField(max_length=50, choices=[('CPM', 'CPM'), ('CVC', 'CVC'), ('CPV', 'CPV'),('CPC', 'CPC'), ('OTHER', 'OTHER')], blank=True, null=True)
     unit_rate = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
+    # State of the generated campaign workbook (see api.jobs); null for legacy campaigns.
+    file_status = models.CharField(
+        max_length=20,
+        choices=[
+            ('pending', 'PENDING'),
+            ('ready', 'READY'),
+            ('failed', 'FAILED'),
+        ],
+        blank=True,
+        null=True,
+    )
 
     tag_tracker = models.ManyToManyField(
         "tag_tracker",
@@ -212,6 +310,122 @@ class Campaign(models.Model):
         related_name="campaign_keywords",
     )
 
+    objects = CampaignQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        # One transaction, so api.rollups can lock the row in pre_save and
+        # roll the change up in post_save before the lock is released.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of campaign listings (see CampaignCursorPagination).
+            models.Index(fields=["-updated_at", "-id"], name="campaign_updated_id_idx"),
+            models.Index(fields=["user", "-updated_at", "-id"], name="campaign_user_updated_id_idx"),
+            # Top campaigns by CTR on the dashboard.
+            models.Index(fields=["-ctr"], name="campaign_ctr_idx"),
+            models.Index(fields=["user", "-ctr"], name="campaign_user_ctr_idx"),
+        ]
+
+class CampaignSearchToken(models.Model):
+    """
+    Denormalized search index for campaigns: one row per distinct token of the
+    campaign name, status, owner name/email and company. Maintained by
+    api.search on save.
+    """
+    campaign = models.ForeignKey(Campaign, on_delete=models.CASCADE, related_name="search_tokens")
+    token = models.CharField(max_length=64)
+    weight = models.PositiveSmallIntegerField(default=1)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["campaign", "token"], name="unique_campaign_search_token"),
+        ]
+        indexes = [
+            # Prefix lookups (token LIKE 'abc%') are served from this index.
+            models.Index(fields=["token", "campaign"], name="campaign_search_token_idx"),
+        ]
+
+
+class UserDailyMetrics(models.Model):
+    """
+    Per-user, per-day rollup of campaign metrics, keyed by the day the
+    campaigns were created. Maintained incrementally by api.rollups.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="daily_metrics", blank=True, null=True)
+    date = models.DateField()
+    campaigns = models.IntegerField(default=0)
+    impressions = models.BigIntegerField(default=0)
+    clicks = models.BigIntegerField(default=0)
+    views = models.BigIntegerField(default=0)
+    spend = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    budget = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    ctr_total = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    vtr_total = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            # One row per rollup key; NULL keys compare equal (see api.rollups).
+            models.UniqueConstraint(Coalesce("user", Value(0)), "date", name="unique_user_daily_metrics"),
+        ]
+        indexes = [
+            models.Index(fields=["user", "date"], name="user_daily_metrics_idx"),
+        ]
+
+
+class UserSegmentMetrics(models.Model):
+    """
+    Per-user rollup of campaign metrics by status, objective and buy type,
+    backing the dashboard totals and distributions. Maintained by api.rollups.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="segment_metrics", blank=True, null=True)
+    status = models.CharField(max_length=50, blank=True, null=True)
+    objective = models.CharField(max_length=50, blank=True, null=True)
+    buy_type = models.CharField(max_length=50, blank=True, null=True)
+    campaigns = models.IntegerField(default=0)
+    impressions = models.BigIntegerField(default=0)
+    clicks = models.BigIntegerField(default=0)
+    views = models.BigIntegerField(default=0)
+    spend = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    # Sum of unit_rate * impressions, reported as spend by buy type.
+    rate_spend = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            # One row per rollup key; NULL keys compare equal (see api.rollups).
+            models.UniqueConstraint(
+                Coalesce("user", Value(0)),
+                Coalesce("status", Value("")),
+                Coalesce("objective", Value("")),
+                Coalesce("buy_type", Value("")),
+                name="unique_user_segment_metrics",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["user", "status", "objective", "buy_type"], name="user_segment_metrics_idx"),
+        ]
+
+
+class CampaignDeliveryStat(models.Model):
+    """Delivery of a campaign on one day, upserted from uploaded reports (see api.delivery)."""
+    campaign = models.ForeignKey(Campaign, on_delete=models.CASCADE, related_name="delivery_stats")
+    date = models.DateField()
+    impressions = models.BigIntegerField(default=0)
+    clicks = models.BigIntegerField(default=0)
+    views = models.BigIntegerField(default=0)
+    spend = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["campaign", "date"], name="unique_campaign_delivery_day"),
+        ]
+        indexes = [
+            models.Index(fields=["date", "campaign"], name="delivery_stat_date_idx"),
+        ]
+
+
 class CampaignFile(models.Model):
     file = models.FileField(upload_to="campaigns/files/", storage=S3Boto3Storage())
     created_at = models.DateTimeField(auto_now_add=True)
@@ -220,25 +434,59 @@ class CampaignFile(models.Model):
 
 
 class CampaignImage(models.Model):
-    image = models.FileField(upload_to="campaigns/images/", storage=S3Boto3Storage())
+    image = models.FileField(upload_to="campaigns/images/", storage=ContentAddressedStorage())
     created_at = models.DateTimeField(auto_now_add=True)
+    # Metadata and thumbnail names, filled in by api.media after upload.
+    media = models.JSONField(blank=True, null=True)
 
 class CampaignVideo(models.Model):
     video = models.FileField(upload_to="campaigns/video/", storage=S3Boto3Storage())
     created_at = models.DateTimeField(auto_now_add=True)
+    # Metadata, poster frame and thumbnail names, filled in by api.media after upload.
+    media = models.JSONField(blank=True, null=True)
 
 class Keyword(models.Model):
-    file = models.FileField(upload_to="campaign_keywords/", storage=S3Boto3Storage(), blank=True, null=True)
+    file = models.FileField(upload_to="campaign_keywords/", storage=ContentAddressedStorage(), blank=True, null=True)
     uploaded_at = models.DateTimeField(default=datetime.now, blank=True)
     keywords = models.JSONField(blank=True, null=True)
+    # Set by api.keywords once the list has been parsed into KeywordTerm rows.
+    term_count = models.PositiveIntegerField(default=0)
+    parsed_at = models.DateTimeField(blank=True, null=True)
+    # KeywordTerm generation currently served (api.keywords swaps it after a parse).
+    term_generation = models.PositiveIntegerField(default=0)
+
+
+class KeywordTerm(models.Model):
+    """
+    One normalized, deduplicated term of a keyword list (see api.keywords).
+    Only rows of the list's term_generation are served.
+    """
+    keyword = models.ForeignKey(Keyword, on_delete=models.CASCADE, related_name="terms")
+    term = models.CharField(max_length=255)
+    generation = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["keyword", "generation", "term"], name="unique_keyword_term"),
+        ]
+        indexes = [
+            # Membership and overlap lookups across lists.
+            models.Index(fields=["term", "keyword", "generation"], name="keyword_term_idx"),
+        ]
 
 class tag_tracker(models.Model):
-    file = models.FileField(upload_to="campaigns/tag_tracker/", storage=S3Boto3Storage(), blank=True, null=True)
+    file = models.FileField(upload_to="campaigns/tag_tracker/", storage=ContentAddressedStorage(), blank=True, null=True)
     uploaded_at = models.DateTimeField(default=datetime.now, blank=True)
 
 class proximity_store(models.Model):
-    file = models.FileField(upload_to="proximity_store/", storage=S3Boto3Storage(), blank=True, null=True)
+    file = models.FileField(upload_to="proximity_store/", storage=ContentAddressedStorage(), blank=True, null=True)
     uploaded_at = models.DateTimeField(default=datetime.now, blank=True)
+    # Set by api.geo once the file has been parsed into GeoPoint rows.
+    point_count = models.PositiveIntegerField(default=0)
+    invalid_rows = models.PositiveIntegerField(default=0)
+    parsed_at = models.DateTimeField(blank=True, null=True)
+    # GeoPoint generation currently served (api.geo swaps it after a parse).
+    point_generation = models.PositiveIntegerField(default=0)
 
 class Bidding_detail(models.Model):
     buy_type = models.CharField(max_length=50, choices=[('CPM', 'CPM'), ('CVC', 'CVC'), ('Other', 'Other')], blank=True, null=True)
@@ -246,16 +494,106 @@ class Bidding_detail(models.Model):
 
 
 class proximity(models.Model):
-    file = models.FileField(upload_to="proximity/", storage=S3Boto3Storage() , blank=True, null=True)
+    file = models.FileField(upload_to="proximity/", storage=ContentAddressedStorage(), blank=True, null=True)
     uploaded_at = models.DateTimeField(default=datetime.now, blank=True)
+    # Set by api.geo once the file has been parsed into GeoPoint rows.
+    point_count = models.PositiveIntegerField(default=0)
+    invalid_rows = models.PositiveIntegerField(default=0)
+    parsed_at = models.DateTimeField(blank=True, null=True)
+    # GeoPoint generation currently served (api.geo swaps it after a parse).
+    point_generation = models.PositiveIntegerField(default=0)
 
 
 
 class weather(models.Model):
-    file = models.FileField(upload_to="weather/", storage=S3Boto3Storage(), blank=True, null=True)
+    file = models.FileField(upload_to="weather/", storage=ContentAddressedStorage(), blank=True, null=True)
     uploaded_at = models.DateTimeField(default=datetime.now, blank=True)
 
 
+class GeoPoint(models.Model):
+    """
+    A store location parsed from a proximity or proximity_store upload
+    (see api.geo). cell_lat/cell_lng place the point on a fixed grid so
+    radius and bounding-box lookups scan only the covering cells. Only rows
+    of the upload's point_generation are served.
+    """
+    proximity = models.ForeignKey(proximity, on_delete=models.CASCADE, related_name="points", blank=True, null=True)
+    proximity_store = models.ForeignKey(
+        proximity_store, on_delete=models.CASCADE, related_name="points", blank=True, null=True
+    )
+    name = models.CharField(max_length=255, blank=True, default="")
+    city = models.CharField(max_length=254, blank=True, default="")
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    radius_km = models.FloatField(blank=True, null=True)
+    cell_lat = models.IntegerField()
+    cell_lng = models.IntegerField()
+    generation = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["proximity", "generation", "cell_lat", "cell_lng"], name="geopoint_proximity_cell_idx"),
+            models.Index(
+                fields=["proximity_store", "generation", "cell_lat", "cell_lng"], name="geopoint_store_cell_idx"
+            ),
+            models.Index(fields=["city"], name="geopoint_city_idx"),
+        ]
+
+
+
+class StoredBlob(models.Model):
+    """
+    A file stored once under its SHA-256 by ContentAddressedStorage.
+    ref_count is the number of model rows pointing at it (see api.blobs).
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField(default=0)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} refs)"
+
+
+class DataFileChecksum(models.Model):
+    """Checksum of the last seed data file loaded per dataset (see api.bulk_sync)."""
+    name = models.CharField(max_length=100, unique=True)
+    checksum = models.CharField(max_length=64)
+    loaded_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.checksum[:12]})"
+
+
+class BackgroundJob(models.Model):
+    """A unit of deferred work, executed by the run_jobs management command."""
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        RUNNING = 'running', 'Running'
+        DONE = 'done', 'Done'
+        FAILED = 'failed', 'Failed'
+
+    kind = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "run_after"], name="background_job_queue_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
 
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="profile")
@@ -271,6 +609,12 @@ class target_type(models.Model):
     category = models.CharField(max_length=255, default='', blank=True, null=True)
     subcategory = models.CharField(max_length=255, blank=True, null=True, default='')
 
+    class Meta:
+        constraints = [
+            # Backs the deduplicating bulk import (see api.bulk_sync.insert_missing).
+            models.UniqueConstraint(fields=["category", "subcategory"], name="unique_target_type_category_subcategory"),
+        ]
+
 class CreativeManager(models.Manager):
     def get_pending_creatives(self):
         return self.filter(status=Creative.Status.PENDING)
@@ -305,12 +649,20 @@ class Creative(models.Model):
         help_text="Type of creative content"
     )
     file = models.FileField(
-        storage=S3Boto3Storage(),
+        storage=ContentAddressedStorage(),
         upload_to='creatives/%Y/%m/%d/',
     )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     description = models.TextField(blank=True, null=True)
+    # Metadata and rendition names, filled in by api.media after upload.
+    media = models.JSONField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of creative listings (see CreativeCursorPagination).
+            models.Index(fields=["user", "-created_at", "-id"], name="creative_user_created_id_idx"),
+        ]
     
 
     
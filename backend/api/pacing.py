@@ -0,0 +1,215 @@
+"""
+Campaign spend billing and budget pacing.
+
+Delivery uploads set Campaign.payment, the campaign's lifetime spend.
+debit_spend charges the part not yet billed (payment - billed_spend) to the
+owner's wallet in one batch (api.wallet.apply_batch). The ledger keys
+include the billed level, so a retried run never charges twice, and the
+campaigns are locked while billing, so concurrent runs never bill the same
+spend twice either.
+
+pace then settles campaign status with set-based updates:
+
+* Completed: the end date has passed or the total budget is spent.
+* Pause Option: a running campaign with unbilled spend its owner's wallet
+  cannot cover. The status it had is kept in pacing_paused_from.
+* Resumed: a campaign pacing paused whose spend is billed in full again
+  (e.g. after a wallet top-up) goes back to the status it was paused from.
+
+New campaigns start with billed_spend zero. Campaigns that predate billing
+have it NULL and are not billed until backfill_billed_spend (the
+backfill_billed_spend command, run on deploy) marks their spend so far as
+billed.
+
+For the remaining running campaigns it reports the daily pacing: today's
+spend against the remaining budget spread over the remaining days.
+Status changes go through rollups.update_campaigns and are reindexed for
+search.
+"""
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Cast, Coalesce
+from django.db.models.signals import pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .delivery import DATE_FORMATS
+from .models import Campaign, CampaignDeliveryStat
+from .rollups import MONEY, ZERO, update_campaigns
+from .search import index_campaigns
+from .wallet import apply_batch
+
+RUNNING_STATUSES = ("Learning", "Live")
+OPEN_STATUSES = ("Created", "Learning", "Live", "Pause Option")
+PAUSED = "Pause Option"
+COMPLETED = "Completed"
+
+
+def _spent():
+    return Coalesce(Cast("payment", MONEY), Value(ZERO), output_field=MONEY)
+
+
+def parse_day(value):
+    """The date of a campaign start_time/end_time string, or None."""
+    if not value:
+        return None
+    value = str(value).strip()
+    try:
+        parsed = parse_datetime(value)
+    except ValueError:
+        parsed = None
+    if parsed is not None:
+        return timezone.localtime(parsed).date() if timezone.is_aware(parsed) else parsed.date()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+@receiver(pre_save, sender=Campaign, dispatch_uid="api.pacing.campaign_pre_save")
+def campaign_pre_save(sender, instance, raw=False, **kwargs):
+    if instance._state.adding and instance.billed_spend is None:
+        instance.billed_spend = ZERO
+
+
+def backfill_billed_spend():
+    """
+    Mark the spend of campaigns that predate billing as billed, without a
+    debit. Run once before delivery uploads resume after deploying billing;
+    returns the number updated.
+    """
+    return Campaign.objects.filter(billed_spend__isnull=True).update(billed_spend=_spent())
+
+
+def debit_spend(campaign_ids=None):
+    """
+    Debit unbilled spend of campaigns (all, or the given ids) from their
+    owners' wallets. Returns (billed campaign ids, campaign ids the wallet
+    could not cover).
+    """
+    with transaction.atomic():
+        # Lock the campaigns before reading billed_spend, so a concurrent run
+        # (the worker and a delivery upload) waits and then sees what this one billed.
+        campaigns = (
+            Campaign.objects.select_for_update()
+            .filter(user__isnull=False)
+            .annotate(spent=_spent())
+            .filter(spent__gt=F("billed_spend"))
+            .order_by("pk")
+        )
+        if campaign_ids is not None:
+            campaigns = campaigns.filter(pk__in=campaign_ids)
+
+        entries = [
+            {
+                "user_id": user_id,
+                "amount": spent - billed,
+                "campaign_id": campaign_id,
+                "idempotency_key": f"spend:{campaign_id}:{spent}",
+                "description": f"Spend on campaign #{campaign_id}",
+                "spent": spent,
+            }
+            for campaign_id, user_id, spent, billed in campaigns.values_list("id", "user_id", "spent", "billed_spend")
+        ]
+        if not entries:
+            return [], []
+
+        applied, rejected = apply_batch(entries)
+        short = {entry["campaign_id"] for entry in rejected}
+        # Entries skipped as already applied were billed by an earlier run.
+        billed = [entry for entry in entries if entry["campaign_id"] not in short]
+        Campaign.objects.bulk_update(
+            [Campaign(pk=entry["campaign_id"], billed_spend=entry["spent"]) for entry in billed],
+            ["billed_spend"],
+            batch_size=1000,
+        )
+    return [entry["campaign_id"] for entry in billed], sorted(short)
+
+
+def _pacing(row, today, spent_today):
+    start, end = parse_day(row["start_time"]), parse_day(row["end_time"])
+    budget = row["total_budget"]
+    if not budget or end is None or (start is not None and start > today):
+        return None
+    remaining = max(budget - row["spent"] + spent_today, ZERO)
+    days_left = (end - today).days + 1
+    daily_budget = (remaining / days_left).quantize(Decimal("0.01"))
+    return {
+        "campaign_id": row["id"],
+        "daily_budget": daily_budget,
+        "spent_today": spent_today,
+        "pace": round(float(spent_today / daily_budget), 2) if daily_budget else None,
+    }
+
+
+def pace(campaign_ids=None, today=None):
+    """Bill spend, complete or pause campaigns and compute pacing. Returns a summary."""
+    today = today or timezone.localdate()
+    billed, short = debit_spend(campaign_ids)
+    short = set(short)
+
+    campaigns = Campaign.objects.filter(status__in=OPEN_STATUSES).annotate(spent=_spent())
+    if campaign_ids is not None:
+        campaigns = campaigns.filter(pk__in=campaign_ids)
+    rows = list(campaigns.values(
+        "id", "status", "start_time", "end_time", "total_budget", "spent", "billed_spend", "pacing_paused_from",
+    ))
+
+    completed, running = [], []
+    paused, resumed = defaultdict(list), defaultdict(list)
+    for row in rows:
+        end = parse_day(row["end_time"])
+        budget = row["total_budget"]
+        if (end is not None and end < today) or (budget and row["spent"] >= budget):
+            completed.append(row["id"])
+        elif row["status"] in RUNNING_STATUSES:
+            if row["id"] in short:
+                paused[row["status"]].append(row["id"])
+            else:
+                running.append(row)
+        elif row["pacing_paused_from"] and row["id"] not in short and row["spent"] <= (row["billed_spend"] or ZERO):
+            resumed[row["pacing_paused_from"]].append(row["id"])
+            running.append(row)
+
+    spent_today = dict(
+        CampaignDeliveryStat.objects.filter(campaign_id__in=[row["id"] for row in running], date=today)
+        .values_list("campaign_id", "spend")
+    )
+    pacing = [
+        result for result in (_pacing(row, today, spent_today.get(row["id"], ZERO)) for row in running)
+        if result is not None
+    ]
+
+    with transaction.atomic():
+        changed = update_campaigns(completed, status=COMPLETED, pacing_paused_from=None)
+        for status, ids in paused.items():
+            changed += update_campaigns(ids, status=PAUSED, pacing_paused_from=status)
+        for status, ids in resumed.items():
+            changed += update_campaigns(ids, status=status, pacing_paused_from=None)
+        if changed:
+            index_campaigns(Campaign.objects.filter(pk__in=changed))
+
+    return {
+        "billed": len(billed),
+        "insufficient_funds": len(short),
+        "completed": completed,
+        "paused": sorted(pk for ids in paused.values() for pk in ids),
+        "resumed": sorted(pk for ids in resumed.values() for pk in ids),
+        "pacing": pacing,
+    }
+
+
+def resume_paused(user_id):
+    """Re-pace a user's campaigns paused for lack of funds, e.g. right after a top-up."""
+    campaign_ids = list(
+        Campaign.objects.filter(user_id=user_id, status=PAUSED, pacing_paused_from__isnull=False)
+        .values_list("id", flat=True)
+    )
+    return pace(campaign_ids) if campaign_ids else None
@@ -0,0 +1,22 @@
+from rest_framework.permissions import BasePermission
+
+from .models import UserType
+from .tokens import IS_PM_CLAIM
+
+
+def is_pm_request(request):
+    """Whether the requesting user is a PM, from the token claim when present, else from UserType."""
+    token = request.auth
+    if token is not None and hasattr(token, "get") and token.get(IS_PM_CLAIM) is not None:
+        return bool(token.get(IS_PM_CLAIM))
+    user_id = getattr(request.user, "id", None)
+    if user_id is None:
+        return False
+    return UserType.objects.filter(user_id=user_id, user_type_pm=True).exists()
+
+
+class IsProductManager(BasePermission):
+    message = "Only admin users can access this endpoint"
+
+    def has_permission(self, request, view):
+        return bool(request.user and request.user.is_authenticated and is_pm_request(request))
@@ -57,7 +57,7 @@ class UserAPIView(APIView):
         if pk:
             # Fetch a specific user by primary key (pk)
             try:
-                user = User.objects.get(pk=pk)
+                user = User.objects.select_related("profile").get(pk=pk)
                 serializer = UserSerializer(user)
                 return Response(serializer.data, status=status.HTTP_200_OK)
             except User.DoesNotExist:
@@ -66,7 +66,8 @@ class UserAPIView(APIView):
                 )
         else:
             # Fetch all users and apply pagination
-            users = User.objects.all()
+            # The nested profile comes from the same joined query.
+            users = User.objects.select_related("profile").order_by("id")
             paginator = UserPagination()
             paginated_users = paginator.paginate_queryset(users, request)
             serializer = UserSerializer(paginated_users, many=True)
@@ -0,0 +1,105 @@
+"""
+Audience reach estimation for the campaign wizard.
+
+Location populations and the audience share splits from the Impression
+data are loaded once per version into NumPy arrays, so an estimate is a
+couple of fancy-indexed sums. The version stamp (see api.versioned_cache)
+is bumped whenever a Location or Impression row changes.
+"""
+import math
+
+import numpy as np
+
+from .models import Impression, Location
+from .versioned_cache import VersionedCache
+
+
+class ReachEstimator:
+    """
+    Reach = population of the selected locations (or the national total
+    when none are selected) times, for every targeted dimension, the summed
+    share of the selected segments. Segments within a dimension are
+    disjoint; dimensions are treated as independent.
+    """
+
+    def __init__(self, locations, impression):
+        ids, populations = zip(*locations) if locations else ((), ())
+        self.location_index = {location_id: i for i, location_id in enumerate(ids)}
+        self.populations = np.array(populations, dtype=np.int64)
+        self.total_population = int(impression.get("totalPopulation") or self.populations.sum())
+
+        # dimension -> (label -> index, share vector)
+        self.dimensions = {}
+        for dimension, segments in impression.items():
+            if not isinstance(segments, list):
+                continue
+            labels = {}
+            shares = []
+            for segment in segments:
+                share = _segment_share(segment)
+                if share is None:
+                    continue
+                labels[str(segment["label"]).strip().lower()] = len(shares)
+                shares.append(share)
+            self.dimensions[dimension] = (labels, np.array(shares, dtype=np.float64))
+
+    @classmethod
+    def from_db(cls):
+        impression = {}
+        for obj in Impression.objects.all():
+            impression = obj.impression
+        locations = list(Location.objects.order_by("id").values_list("id", "population"))
+        return cls(locations, impression)
+
+    def estimate(self, location_ids=(), segments=None):
+        """
+        location_ids: selected Location ids; segments: {dimension: [labels]}.
+        Unknown ids and labels are ignored and repeated ids count once.
+        Dimensions without share data are reported in "unweighted" and do not
+        narrow the estimate.
+        """
+        positions = [self.location_index[i] for i in set(location_ids) if i in self.location_index]
+        population = int(self.populations[positions].sum()) if positions else self.total_population
+
+        factor = 1.0
+        shares = {}
+        unweighted = []
+        for dimension, labels in (segments or {}).items():
+            if not labels:
+                continue
+            if dimension not in self.dimensions:
+                unweighted.append(dimension)
+                continue
+            index, vector = self.dimensions[dimension]
+            picked = [index[label] for label in {str(label).strip().lower() for label in labels} if label in index]
+            share = float(vector[picked].sum()) if picked else 0.0
+            shares[dimension] = round(share, 4)
+            factor *= share
+
+        return {
+            "population": population,
+            "reach": int(round(population * factor)),
+            "shares": shares,
+            "unweighted": unweighted,
+        }
+
+
+def _segment_share(segment):
+    """The share (0-1) of a {"label", "percentage"} segment, or None when the entry is malformed."""
+    if not isinstance(segment, dict) or segment.get("label") is None:
+        return None
+    try:
+        percentage = float(segment.get("percentage"))
+    except (TypeError, ValueError):
+        return None
+    if not math.isfinite(percentage) or not 0 <= percentage <= 100:
+        return None
+    return percentage / 100
+
+
+_estimator = VersionedCache("reach", ReachEstimator.from_db)
+_estimator.invalidate_on_change(Location, Impression)
+
+
+def get_estimator():
+    return _estimator.get()[1]
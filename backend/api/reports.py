@@ -0,0 +1,121 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from io import BytesIO
+
+import pandas as pd
+from django.core.files.base import ContentFile, File
+from django.db import transaction
+
+from .models import Campaign, CampaignFile
+from .serializers import CampaignSerializer
+
+
+def serializer_data_to_excel(serializer_data):
+    # If serializer_data is a dict (for a single record), wrap it in a list.
+    if isinstance(serializer_data, dict):
+        data = [serializer_data]
+    else:
+        data = serializer_data  # Assuming it's already a list of dicts
+
+    # Create a DataFrame from the data.
+    df = pd.DataFrame(data)
+    
+    columns_to_remove = ['creative','images', 'keywords', 'proximity_store', 'proximity', 'weather', 'target_type', 'location', 'video', 'tag_tracker','age','carrier_data','environment','exchange','language','impression','device_price','device','created_at','updated_at','carrier','landing_page','reports_url','start_time','end_time','status','day_part','objective','user','campaign_files','total_budget','viewability','brand_safety','buy_type','unit_rate','file_status','billed_spend','pacing_paused_from']
+
+    # Drop these columns if they exist (ignore if they don't)
+    df.drop(columns=columns_to_remove, inplace=True, errors='ignore')
+    df.insert(0, 'date', pd.NaT)
+
+    # Convert column headers to uppercase
+    df.columns = [col.upper() for col in df.columns]
+
+    # Convert DataFrame to an Excel file in memory.
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        df.to_excel(writer, index=False)
+    output.seek(0)
+    return output
+
+
+def generate_campaign_file(campaign):
+    """Build the delivery workbook for a campaign and store it as its CampaignFile."""
+    serializer_data = CampaignSerializer(campaign).data
+    excel_data = serializer_data_to_excel(serializer_data)
+    excel_data.seek(0)
+    file_name = f"campaign_{campaign.id}.xlsx"
+    campaign_file = CampaignFile.objects.filter(campaign=campaign).first()
+    if campaign_file is None:
+        campaign_file = CampaignFile.objects.create(campaign=campaign, file=File(excel_data, name=file_name))
+    else:
+        campaign_file.file = File(excel_data, name=file_name)
+        campaign_file.save()
+    Campaign.objects.filter(pk=campaign.pk).update(file_status='ready')
+    return campaign_file
+
+
+# Workbook generation is CPU bound (pandas/xlsxwriter); uploads are S3 round trips.
+WORKBOOK_PROCESSES = 4
+UPLOAD_THREADS = 8
+
+
+def _workbook_bytes(serializer_data):
+    return serializer_data_to_excel(serializer_data).getvalue()
+
+
+def campaigns_without_files(queryset=None):
+    queryset = Campaign.objects.all() if queryset is None else queryset
+    return queryset.filter(campaign_files__isnull=True)
+
+
+def generate_campaign_files(campaign_ids):
+    """
+    Build and upload workbooks for every campaign in campaign_ids that still
+    has no CampaignFile. Serialization is one prefetched query, workbooks are
+    built across a process pool and uploads run through a bounded thread
+    pool. Campaigns that already have a file are marked ready. Returns the
+    created CampaignFile rows.
+    """
+    _mark_filed_ready(campaign_ids)
+    campaigns = list(campaigns_without_files(Campaign.objects.for_serializer().filter(pk__in=campaign_ids)))
+    if not campaigns:
+        return []
+    # Plain dicts so the payload pickles cleanly into the worker processes.
+    serialized = [dict(data) for data in CampaignSerializer(campaigns, many=True).data]
+
+    if len(serialized) > 1:
+        with ProcessPoolExecutor(max_workers=min(WORKBOOK_PROCESSES, len(serialized))) as pool:
+            workbooks = list(pool.map(_workbook_bytes, serialized))
+    else:
+        workbooks = [_workbook_bytes(serialized[0])]
+
+    file_field = CampaignFile._meta.get_field("file")
+
+    def upload(item):
+        campaign, content = item
+        name = file_field.generate_filename(None, f"campaign_{campaign.id}.xlsx")
+        return file_field.storage.save(name, ContentFile(content), max_length=file_field.max_length)
+
+    with ThreadPoolExecutor(max_workers=UPLOAD_THREADS) as pool:
+        names = list(pool.map(upload, zip(campaigns, workbooks)))
+
+    ids = [campaign.pk for campaign in campaigns]
+    with transaction.atomic():
+        # Another job may have filed some of these meanwhile. Its workbook went
+        # to the same key, so only the duplicate row is skipped.
+        list(Campaign.objects.select_for_update().filter(pk__in=ids).order_by('pk').values_list('pk', flat=True))
+        filed = set(CampaignFile.objects.filter(campaign_id__in=ids).values_list('campaign_id', flat=True))
+        campaign_files = CampaignFile.objects.bulk_create(
+            [
+                CampaignFile(campaign=campaign, file=name)
+                for campaign, name in zip(campaigns, names)
+                if campaign.pk not in filed
+            ]
+        )
+        Campaign.objects.filter(pk__in=ids).update(file_status='ready')
+    return campaign_files
+
+
+def _mark_filed_ready(campaign_ids):
+    """Queued campaigns that have a file by now (e.g. from another job) need no workbook."""
+    Campaign.objects.filter(pk__in=campaign_ids, campaign_files__isnull=False).exclude(
+        file_status='ready'
+    ).update(file_status='ready')
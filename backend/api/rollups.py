@@ -0,0 +1,312 @@
+"""
+Incremental dashboard rollups.
+
+Every change to a campaign's rollup fields is turned into deltas against
+UserDailyMetrics and UserSegmentMetrics, so the dashboard endpoints read a
+handful of pre-aggregated rows instead of scanning Campaign.
+
+Campaign.save runs in a transaction: pre_save reads the old values with the
+row locked and post_save applies the delta before the lock is released, so
+concurrent saves of one campaign roll up one after the other. Rollup rows
+are unique per key; blank segment keys are stored as NULL.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, F, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf, TruncDate
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .models import Campaign, UserDailyMetrics, UserSegmentMetrics
+
+ROLLUP_FIELDS = (
+    "user_id",
+    "created_at",
+    "status",
+    "objective",
+    "buy_type",
+    "impressions",
+    "clicks",
+    "views",
+    "ctr",
+    "vtr",
+    "payment",
+    "total_budget",
+    "unit_rate",
+)
+
+ZERO = Decimal("0")
+MONEY = DecimalField(max_digits=20, decimal_places=2)
+
+
+def _decimal(value):
+    if value in (None, ""):
+        return ZERO
+    try:
+        return Decimal(str(value))
+    except InvalidOperation:
+        return ZERO
+
+
+def campaign_values(campaign):
+    """Snapshot the rollup fields of a campaign instance."""
+    return {field: getattr(campaign, field) for field in ROLLUP_FIELDS}
+
+
+def _contributions(values):
+    """Return {(model, key): measures} for a single campaign snapshot."""
+    impressions = values["impressions"] or 0
+    unit_rate = values["unit_rate"]
+    daily_key = (UserDailyMetrics, (("user_id", values["user_id"]), ("date", values["created_at"].date())))
+    segment_key = (UserSegmentMetrics, (
+        ("user_id", values["user_id"]),
+        ("status", values["status"] or None),
+        ("objective", values["objective"] or None),
+        ("buy_type", values["buy_type"] or None),
+    ))
+    common = {
+        "campaigns": 1,
+        "impressions": impressions,
+        "clicks": values["clicks"] or 0,
+        "views": values["views"] or 0,
+        "spend": _decimal(values["payment"]),
+    }
+    return {
+        daily_key: dict(
+            common,
+            budget=_decimal(values["total_budget"]),
+            ctr_total=_decimal(values["ctr"]),
+            vtr_total=_decimal(values["vtr"]),
+        ),
+        segment_key: dict(
+            common,
+            rate_spend=_decimal(unit_rate) * impressions if unit_rate is not None else ZERO,
+        ),
+    }
+
+
+def _add_change(deltas, before, after):
+    for values, sign in ((before, -1), (after, 1)):
+        if values is None:
+            continue
+        for target, measures in _contributions(values).items():
+            delta = deltas.setdefault(target, {})
+            for field, amount in measures.items():
+                delta[field] = delta.get(field, 0) + sign * amount
+
+
+def record_change(before, after):
+    """
+    Apply the difference between two campaign snapshots (either may be None
+    for a create or delete) to the rollup tables.
+    """
+    deltas = {}
+    _add_change(deltas, before, after)
+    _apply_deltas(deltas)
+
+
+def _apply_deltas(deltas):
+    with transaction.atomic():
+        for (model, key), delta in deltas.items():
+            delta = {field: amount for field, amount in delta.items() if amount}
+            if not delta:
+                continue
+            key = dict(key)
+            changes = {field: F(field) + amount for field, amount in delta.items()}
+            if model.objects.filter(**key).update(**changes):
+                continue
+            try:
+                with transaction.atomic():
+                    model.objects.create(**key, **delta)
+            except IntegrityError:
+                # Created concurrently since the UPDATE above.
+                model.objects.filter(**key).update(**changes)
+
+
+def update_campaign_metrics(campaign_id, **values):
+    """
+    Update campaign columns with a single UPDATE (no model signals) and roll
+    the change up. Returns the number of campaigns updated.
+    """
+    with transaction.atomic():
+        before = Campaign.objects.select_for_update().filter(pk=campaign_id).values(*ROLLUP_FIELDS).first()
+        if before is None:
+            return 0
+        updated = Campaign.objects.filter(pk=campaign_id).update(**values)
+        record_change(before, dict(before, **values))
+    return updated
+
+
+def update_campaigns(campaign_ids, **values):
+    """
+    Set the same columns on many campaigns with one UPDATE and roll the
+    changes up together, one rollup UPDATE per affected row. Returns the ids
+    updated.
+    """
+    with transaction.atomic():
+        befores = list(Campaign.objects.select_for_update().filter(pk__in=campaign_ids).values("id", *ROLLUP_FIELDS))
+        if not befores:
+            return []
+        ids = [before.pop("id") for before in befores]
+        Campaign.objects.filter(pk__in=ids).update(**values)
+        deltas = {}
+        for before in befores:
+            _add_change(deltas, before, dict(before, **values))
+        _apply_deltas(deltas)
+    return ids
+
+
+def rebuild():
+    """Recompute both rollup tables from Campaign with grouped queries."""
+    payment = Coalesce(Cast("payment", MONEY), Value(ZERO), output_field=MONEY)
+    with transaction.atomic():
+        UserDailyMetrics.objects.all().delete()
+        UserSegmentMetrics.objects.all().delete()
+
+        daily = (
+            Campaign.objects.annotate(day=TruncDate("created_at"))
+            .values("user_id", "day")
+            .annotate(
+                n=Count("id"),
+                sum_impressions=Sum("impressions"),
+                sum_clicks=Sum("clicks"),
+                sum_views=Sum("views"),
+                sum_spend=Sum(payment),
+                sum_budget=Sum("total_budget"),
+                sum_ctr=Sum("ctr"),
+                sum_vtr=Sum("vtr"),
+            )
+            .order_by()
+        )
+        UserDailyMetrics.objects.bulk_create(
+            [
+                UserDailyMetrics(
+                    user_id=row["user_id"],
+                    date=row["day"],
+                    campaigns=row["n"],
+                    impressions=row["sum_impressions"] or 0,
+                    clicks=row["sum_clicks"] or 0,
+                    views=row["sum_views"] or 0,
+                    spend=row["sum_spend"] or ZERO,
+                    budget=row["sum_budget"] or ZERO,
+                    ctr_total=row["sum_ctr"] or ZERO,
+                    vtr_total=row["sum_vtr"] or ZERO,
+                )
+                for row in daily
+            ],
+            batch_size=1000,
+        )
+
+        segments = (
+            Campaign.objects.annotate(
+                key_status=NullIf("status", Value("")),
+                key_objective=NullIf("objective", Value("")),
+                key_buy_type=NullIf("buy_type", Value("")),
+            )
+            .values("user_id", "key_status", "key_objective", "key_buy_type")
+            .annotate(
+                n=Count("id"),
+                sum_impressions=Sum("impressions"),
+                sum_clicks=Sum("clicks"),
+                sum_views=Sum("views"),
+                sum_spend=Sum(payment),
+                sum_rate_spend=Sum(F("unit_rate") * F("impressions"), output_field=MONEY),
+            )
+            .order_by()
+        )
+        UserSegmentMetrics.objects.bulk_create(
+            [
+                UserSegmentMetrics(
+                    user_id=row["user_id"],
+                    status=row["key_status"],
+                    objective=row["key_objective"],
+                    buy_type=row["key_buy_type"],
+                    campaigns=row["n"],
+                    impressions=row["sum_impressions"] or 0,
+                    clicks=row["sum_clicks"] or 0,
+                    views=row["sum_views"] or 0,
+                    spend=row["sum_spend"] or ZERO,
+                    rate_spend=row["sum_rate_spend"] or ZERO,
+                )
+                for row in segments
+            ],
+            batch_size=1000,
+        )
+
+
+def summarize_segments(segments):
+    """
+    Reduce a UserSegmentMetrics queryset to every dashboard figure with a
+    single grouped query: totals plus status, objective and buy type
+    breakdowns.
+    """
+    rows = (
+        segments.values("status", "objective", "buy_type")
+        .annotate(
+            n=Sum("campaigns"),
+            sum_impressions=Sum("impressions"),
+            sum_clicks=Sum("clicks"),
+            sum_views=Sum("views"),
+            sum_spend=Sum("spend"),
+            sum_rate_spend=Sum("rate_spend"),
+        )
+        .filter(n__gt=0)
+        .order_by()
+    )
+
+    by_status = {}
+    by_objective = {}
+    by_buy_type = {}
+    totals = {
+        "campaign_count": 0,
+        "total_impressions": 0,
+        "total_clicks": 0,
+        "total_views": 0,
+        "total_spend": ZERO,
+        "total_rate_spend": ZERO,
+    }
+    for row in rows:
+        by_status[row["status"]] = by_status.get(row["status"], 0) + row["n"]
+        by_objective[row["objective"]] = by_objective.get(row["objective"], 0) + row["n"]
+        by_buy_type[row["buy_type"]] = by_buy_type.get(row["buy_type"], ZERO) + (row["sum_rate_spend"] or ZERO)
+        totals["campaign_count"] += row["n"]
+        totals["total_impressions"] += row["sum_impressions"] or 0
+        totals["total_clicks"] += row["sum_clicks"] or 0
+        totals["total_views"] += row["sum_views"] or 0
+        totals["total_spend"] += row["sum_spend"] or ZERO
+        totals["total_rate_spend"] += row["sum_rate_spend"] or ZERO
+
+    return {
+        "totals": totals,
+        "status_distribution": [{"status": key, "count": count} for key, count in by_status.items()],
+        "objective_distribution": [{"objective": key, "count": count} for key, count in by_objective.items()],
+        "spend_by_buy_type": [{"buy_type": key, "total_spend": spend} for key, spend in by_buy_type.items()],
+    }
+
+
+@receiver(pre_save, sender=Campaign)
+def campaign_pre_save(sender, instance, raw=False, **kwargs):
+    instance._rollup_before = None
+    if not raw and instance.pk:
+        # Campaign.save holds a transaction until post_save has applied the delta.
+        instance._rollup_before = (
+            Campaign.objects.select_for_update().filter(pk=instance.pk).values(*ROLLUP_FIELDS).first()
+        )
+
+
+@receiver(post_save, sender=Campaign)
+def campaign_post_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        record_change(getattr(instance, "_rollup_before", None), campaign_values(instance))
+
+
+@receiver(pre_delete, sender=Campaign)
+def campaign_pre_delete(sender, instance, **kwargs):
+    # Deletes run in a transaction; roll up the stored values, not the instance's.
+    instance._rollup_before = Campaign.objects.select_for_update().filter(pk=instance.pk).values(*ROLLUP_FIELDS).first()
+
+
+@receiver(post_delete, sender=Campaign)
+def campaign_post_delete(sender, instance, **kwargs):
+    record_change(getattr(instance, "_rollup_before", None) or campaign_values(instance), None)
@@ -0,0 +1,199 @@
+import re
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import OuterRef, Q, Subquery, Sum
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import Campaign, CampaignSearchToken, UserProfile
+
+TOKEN_RE = re.compile(r"[0-9a-z]+")
+MAX_TOKEN_LENGTH = 64
+MAX_QUERY_WORDS = 10
+
+# Matches on the campaign name rank above matches on its owner or status.
+NAME_WEIGHT = 3
+OWNER_WEIGHT = 2
+STATUS_WEIGHT = 1
+
+
+def tokenize(text):
+    """Split text into lowercase alphanumeric tokens ("a.b@c.com" -> a, b, c, com)."""
+    if not text:
+        return []
+    return [token[:MAX_TOKEN_LENGTH] for token in TOKEN_RE.findall(str(text).lower())]
+
+
+def _add_tokens(tokens, text, weight):
+    for token in tokenize(text):
+        tokens[token] = max(tokens.get(token, 0), weight)
+
+
+def build_owner_tokens(user):
+    """Return the {token: weight} part of the search document contributed by the campaign owner."""
+    tokens = {}
+    if user is None:
+        return tokens
+    for text in (user.username, user.email, user.first_name, user.last_name):
+        _add_tokens(tokens, text, OWNER_WEIGHT)
+    profile = UserProfile.objects.filter(user=user).only("company_name").first()
+    if profile:
+        _add_tokens(tokens, profile.company_name, OWNER_WEIGHT)
+    return tokens
+
+
+def _owner_tokens(user_id):
+    """build_owner_tokens for a user id, read in one query."""
+    tokens = {}
+    row = User.objects.filter(pk=user_id).values_list(
+        "username", "email", "first_name", "last_name", "profile__company_name"
+    ).first()
+    for text in row or ():
+        _add_tokens(tokens, text, OWNER_WEIGHT)
+    return tokens
+
+
+def build_campaign_tokens(name, status, owner_tokens):
+    """Return the {token: weight} search document for a campaign."""
+    tokens = dict(owner_tokens)
+    _add_tokens(tokens, status, STATUS_WEIGHT)
+    _add_tokens(tokens, name, NAME_WEIGHT)
+    return tokens
+
+
+def _token_rows(campaign_id, tokens):
+    return [CampaignSearchToken(campaign_id=campaign_id, token=token, weight=weight) for token, weight in tokens.items()]
+
+
+def index_campaign(campaign):
+    """Bring the search tokens of a single campaign up to date, writing only the tokens that changed."""
+    tokens = build_campaign_tokens(campaign.name, campaign.status, _owner_tokens(campaign.user_id))
+    # Campaign.save holds the campaign row locked, so the document cannot change under us.
+    current = dict(CampaignSearchToken.objects.filter(campaign=campaign).values_list("token", "weight"))
+    stale = [token for token, weight in current.items() if tokens.get(token) != weight]
+    fresh = {token: weight for token, weight in tokens.items() if current.get(token) != weight}
+    if not (stale or fresh):
+        return
+    with transaction.atomic():
+        if stale:
+            CampaignSearchToken.objects.filter(campaign=campaign, token__in=stale).delete()
+        CampaignSearchToken.objects.bulk_create(_token_rows(campaign.pk, fresh))
+
+
+def index_campaigns(queryset, batch_size=1000):
+    """Rebuild the search tokens of every campaign in a queryset, computing owner tokens once per owner."""
+    owner_tokens = {}
+    count = 0
+    with transaction.atomic():
+        CampaignSearchToken.objects.filter(campaign__in=queryset.values("pk")).delete()
+        rows = []
+        for campaign in queryset.select_related("user").only(
+            "id", "name", "status", "user__username", "user__email", "user__first_name", "user__last_name"
+        ).iterator(chunk_size=batch_size):
+            if campaign.user_id not in owner_tokens:
+                owner_tokens[campaign.user_id] = build_owner_tokens(campaign.user)
+            tokens = build_campaign_tokens(campaign.name, campaign.status, owner_tokens[campaign.user_id])
+            rows.extend(_token_rows(campaign.pk, tokens))
+            count += 1
+            if len(rows) >= batch_size:
+                CampaignSearchToken.objects.bulk_create(rows, batch_size=batch_size)
+                rows = []
+        CampaignSearchToken.objects.bulk_create(rows, batch_size=batch_size)
+    return count
+
+
+TOKEN_ALPHABET = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+
+def _prefix(word):
+    """
+    Q for tokens starting with word, as a range (word <= token < successor)
+    rather than LIKE 'word%', so every backend serves it from the token index.
+    Tokens only hold TOKEN_ALPHABET characters, which sort the same way in
+    every collation.
+    """
+    stem = word
+    while stem and stem[-1] == TOKEN_ALPHABET[-1]:
+        stem = stem[:-1]
+    if not stem:
+        return Q(token__gte=word)
+    successor = stem[:-1] + TOKEN_ALPHABET[TOKEN_ALPHABET.index(stem[-1]) + 1]
+    return Q(token__gte=word, token__lt=successor)
+
+
+def _matching(word):
+    return CampaignSearchToken.objects.filter(_prefix(word)).values("campaign")
+
+
+def search_campaigns(queryset, query):
+    """
+    Filter a campaign queryset to those matching any comma-separated term of
+    the query, ordered by match rank. A campaign matches a term when every
+    word of the term prefix-matches one of its tokens.
+    """
+    terms, words = [], []
+    for term in query.split(","):
+        term_words = list(dict.fromkeys(tokenize(term)))[:MAX_QUERY_WORDS - len(words)]
+        if term_words:
+            terms.append(term_words)
+            words.extend(word for word in term_words if word not in words)
+    if not terms:
+        return queryset.none()
+
+    term_filter = Q()
+    for term_words in terms:
+        all_words = Q()
+        for word in term_words:
+            all_words &= Q(pk__in=_matching(word))
+        term_filter |= all_words
+
+    word_filter = Q()
+    for word in words:
+        word_filter |= _prefix(word)
+    matches = CampaignSearchToken.objects.filter(word_filter)
+
+    rank = (
+        matches.filter(campaign=OuterRef("pk"))
+        .values("campaign")
+        .annotate(total=Sum("weight"))
+        .values("total")[:1]
+    )
+    return (
+        queryset.filter(term_filter)
+        .annotate(search_rank=Subquery(rank))
+        .order_by("-search_rank", "-updated_at", "-id")
+    )
+
+
+# User fields that appear in the search document of the user's campaigns.
+OWNER_FIELDS = {"username", "email", "first_name", "last_name"}
+# Campaign fields that feed its search document.
+CAMPAIGN_FIELDS = {"name", "status", "user", "user_id"}
+
+
+@receiver(post_save, sender=Campaign)
+def campaign_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if update_fields is not None and not CAMPAIGN_FIELDS.intersection(update_fields):
+        return
+    index_campaign(instance)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+    if raw or created:
+        return
+    if update_fields is not None and not OWNER_FIELDS.intersection(update_fields):
+        return
+    index_campaigns(Campaign.objects.filter(user=instance))
+
+
+@receiver(post_save, sender=UserProfile)
+def profile_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if update_fields is not None and "company_name" not in update_fields:
+        return
+    index_campaigns(Campaign.objects.filter(user_id=instance.user_id))
@@ -1,10 +1,13 @@
+from decimal import Decimal
+
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
 from rest_framework import serializers
-from rest_framework_simplejwt.tokens import RefreshToken
 from storages.backends.s3boto3 import S3Boto3Storage
+from .media import media_urls
+from .tokens import RoleRefreshToken
 from .models import (Campaign, CampaignImage, Keyword, Location, UserType, CampaignVideo, Creative,
                      proximity, proximity_store, target_type, weather, UserProfile, Bidding_detail,  BrandSafety,
     BuyType,
@@ -28,21 +31,17 @@ class CustomTokenObtainPairSerializer(serializers.Serializer):
         if not username or not password:
             raise serializers.ValidationError("Both username and password are required.")
 
-        user = authenticate(username=username, password=password)
+        # EmailOrUsernameBackend matches username or email and sets is_pm/company in the same query.
+        user = authenticate(self.context.get("request"), username=username, password=password)
         if user is None:
-            try:
-                user = User.objects.get(email=username)
-                if not user.check_password(password):
-                    raise serializers.ValidationError("Invalid credentials")
-            except User.DoesNotExist:
-                raise serializers.ValidationError("Invalid credentials")
-
-        refresh = RefreshToken.for_user(user)
-        try:
-            user_type = UserType.objects.get(user=user)
-            is_pm = user_type.user_type_pm
-        except UserType.DoesNotExist:
-            is_pm = False
+            raise serializers.ValidationError("Invalid credentials")
+
+        is_pm = getattr(user, "is_pm", None)
+        if is_pm is None:
+            is_pm = UserType.objects.filter(user=user, user_type_pm=True).exists()
+            refresh = RoleRefreshToken.for_user(user)
+        else:
+            refresh = RoleRefreshToken.for_user(user, is_pm, getattr(user, "company", None))
 
         return {
             "refresh": str(refresh),
@@ -105,22 +104,9 @@ class ChangePasswordSerializer(serializers.Serializer):
 
 
 class LocationSerializer(serializers.ModelSerializer):
-    population = serializers.SerializerMethodField()
-    
     class Meta:
         model = Location
         fields = ["id", "country", "state", "city", "tier", "population"]
-    
-    def get_population(self, obj):
-        # Convert population string to integer by removing commas and converting to int
-        try:
-            # Remove commas from the population string
-            population_str = obj.population.replace(',', '')
-            # Convert to integer
-            return int(population_str)
-        except (ValueError, AttributeError):
-            # Return 0 if conversion fails
-            return 0
 
 
 class target_typeSerializer(serializers.ModelSerializer):
@@ -128,6 +114,33 @@ class target_typeSerializer(serializers.ModelSerializer):
         model = target_type
         fields = ["id", "category", "subcategory"]
 
+class TargetTypeItemSerializer(serializers.Serializer):
+    category = serializers.CharField(max_length=255, allow_blank=True, default="")
+    subcategory = serializers.CharField(max_length=255)
+    targeting_type = serializers.CharField(max_length=255, required=False, allow_blank=True)
+
+
+class TargetTypeImportSerializer(serializers.Serializer):
+    MAX_ITEMS = 10000
+
+    data = serializers.ListField()
+
+    def validate_data(self, value):
+        # Also accept the nested interest.json shape: {"data": [[...]]}
+        if len(value) == 1 and isinstance(value[0], list):
+            value = value[0]
+        if not value:
+            raise serializers.ValidationError("No target types to import.")
+        if len(value) > self.MAX_ITEMS:
+            raise serializers.ValidationError(f"At most {self.MAX_ITEMS} target types per request.")
+        items = TargetTypeItemSerializer(data=value, many=True)
+        items.is_valid(raise_exception=True)
+        return [
+            dict(item, targeting_type=item.get("targeting_type") or item["subcategory"])
+            for item in items.validated_data
+        ]
+
+
 class BiddingDetailsSerializer(serializers.ModelSerializer):
     class Meta:
         model = Bidding_detail
@@ -135,15 +148,25 @@ class BiddingDetailsSerializer(serializers.ModelSerializer):
 
 
 class CampaignImageSerializer(serializers.ModelSerializer):
+    media = serializers.SerializerMethodField()
+
     class Meta:
         model = CampaignImage
-        fields = ["id", "image", "created_at"]
+        fields = ["id", "image", "created_at", "media"]
+
+    def get_media(self, obj):
+        return media_urls(obj.media)
 
 
 class CampaignVideoSerializer(serializers.ModelSerializer):
+    media = serializers.SerializerMethodField()
+
     class Meta:
         model = CampaignVideo
-        fields = ["id", "video", "created_at"]
+        fields = ["id", "video", "created_at", "media"]
+
+    def get_media(self, obj):
+        return media_urls(obj.media)
 
 
 
@@ -156,7 +179,8 @@ class CampaignFileSerializer(serializers.ModelSerializer):
 class KeywordSerializer(serializers.ModelSerializer):
     class Meta:
         model = Keyword
-        fields = ["id", "file", "keywords"]
+        fields = ["id", "file", "keywords", "term_count", "parsed_at"]
+        read_only_fields = ["term_count", "parsed_at"]
 
     def validate(self, data):
         # Check if both 'file' and 'keywords' are empty
@@ -170,7 +194,8 @@ class KeywordSerializer(serializers.ModelSerializer):
 class ProximityStoreSerializer(serializers.ModelSerializer):
     class Meta:
         model = proximity_store
-        fields = ["id", "file"]
+        fields = ["id", "file", "point_count", "invalid_rows", "parsed_at"]
+        read_only_fields = ["point_count", "invalid_rows", "parsed_at"]
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -180,7 +205,8 @@ class ProximityStoreSerializer(serializers.ModelSerializer):
 class ProximitySerializer(serializers.ModelSerializer):
     class Meta:
         model = proximity
-        fields = ["id", "file"]
+        fields = ["id", "file", "point_count", "invalid_rows", "parsed_at"]
+        read_only_fields = ["point_count", "invalid_rows", "parsed_at"]
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -206,10 +232,14 @@ class tag_trackerSerializer(serializers.ModelSerializer):
         self.fields["file"].required = True
 
 class CreativeSerializer(serializers.ModelSerializer):
-    
+    media = serializers.SerializerMethodField()
+
     class Meta:
         model = Creative
-        fields = ['id', 'name', 'creative_type', 'file', 'description']
+        fields = ['id', 'name', 'creative_type', 'file', 'description', 'media']
+
+    def get_media(self, obj):
+        return media_urls(obj.media)
 
 class CampaignSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
@@ -269,6 +299,7 @@ class CampaignCreateUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Campaign
         fields = "__all__"
+        read_only_fields = ["file_status", "billed_spend", "pacing_paused_from"]
 
     def create(self, validated_data):
         images = validated_data.pop("images", [])
@@ -336,15 +367,9 @@ class UserWalletSerializer(serializers.ModelSerializer):
         fields = ['id', 'user', 'user_id', 'amount', 'created_at', 'updated_at']
 
 class UserWalletUpdateSerializer(serializers.Serializer):
+    # The user and wallet are resolved by api.wallet in the balance UPDATE itself.
     user_id = serializers.IntegerField()
-    amount = serializers.DecimalField(max_digits=10, decimal_places=2)
+    amount = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal("0.01"))
     action = serializers.ChoiceField(choices=['add', 'subtract'])
+    idempotency_key = serializers.CharField(max_length=100, required=False, allow_blank=True)
 
-    def validate(self, data):
-        try:
-            user = User.objects.get(id=data['user_id'])
-            if not UserWallet.objects.filter(user=user).exists():
-                UserWallet.objects.create(user=user)
-        except User.DoesNotExist:
-            raise serializers.ValidationError("User does not exist")
-        return data
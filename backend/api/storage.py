@@ -0,0 +1,68 @@
+"""
+Content-addressed S3 storage.
+
+Files saved through ContentAddressedStorage are hashed (SHA-256) while
+streaming and stored once under blobs/<hash>. Saving bytes that are already
+stored skips the upload and returns the existing name. StoredBlob rows
+track every blob and are reference-counted by api.blobs from the models
+that use this storage; a save through the storage takes the reference for
+the row it is saving.
+"""
+import hashlib
+import os
+import posixpath
+
+from django.db import transaction
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+from storages.backends.s3boto3 import S3Boto3Storage
+
+BLOB_PREFIX = "blobs"
+
+
+def blob_name(sha256, original_name):
+    extension = os.path.splitext(original_name)[1].lower()
+    return posixpath.join(BLOB_PREFIX, sha256[:2], f"{sha256}{extension}")
+
+
+def hash_content(content):
+    """Stream content through SHA-256; returns (hexdigest, size) and rewinds it."""
+    digest = hashlib.sha256()
+    size = 0
+    content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+        size += len(chunk)
+    content.seek(0)
+    return digest.hexdigest(), size
+
+
+@deconstructible
+class ContentAddressedStorage(S3Boto3Storage):
+    def get_available_name(self, name, max_length=None):
+        # The final name is derived from the content in _save.
+        return name
+
+    def _save(self, name, content):
+        """
+        Store content under its blob name and take one reference to the
+        blob for the model row being saved (see api.blobs). The lookup and
+        the increment happen under one row lock, so a concurrent release
+        cannot delete a blob this save is reusing.
+        """
+        from .models import StoredBlob
+
+        sha256, size = hash_content(content)
+        with transaction.atomic():
+            existing = StoredBlob.objects.select_for_update().filter(sha256=sha256).values_list("pk", "name").first()
+            if existing is not None:
+                StoredBlob.objects.filter(pk=existing[0]).update(ref_count=F("ref_count") + 1)
+                return existing[1]
+
+        name = super()._save(blob_name(sha256, name), content)
+        with transaction.atomic():
+            blob, created = StoredBlob.objects.select_for_update().get_or_create(
+                sha256=sha256, defaults={"name": name, "size": size}
+            )
+            StoredBlob.objects.filter(pk=blob.pk).update(ref_count=F("ref_count") + 1)
+        return blob.name
@@ -0,0 +1,96 @@
+"""
+Cached targeting taxonomies for the campaign wizard.
+
+Every lookup table is built once per version and kept both in the shared
+Django cache and in process memory (see api.versioned_cache). The version
+is bumped whenever a taxonomy row is saved or deleted, so every worker picks
+up the change on its next request.
+"""
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import (Age, BrandSafety, BuyType, CarrierData, Device, DevicePrice, DistinctInterest, Environment,
+                     Exchange, Impression, Language, Viewability)
+from .versioned_cache import VersionedCache
+
+BUNDLE_TIMEOUT = 60 * 60 * 24
+
+
+def _value_label(queryset, value_field, cast=None):
+    data = []
+    for obj in queryset:
+        value = getattr(obj, value_field)
+        data.append({"id": obj.id, "value": cast(value) if cast else value, "label": obj.label})
+    return data
+
+
+def _languages():
+    return [
+        {"id": obj.id, "value": obj.language, "iso_code": obj.iso_code, "label": obj.label}
+        for obj in Language.objects.all()
+    ]
+
+
+def _impression():
+    data = []
+    for obj in Impression.objects.all():
+        data = obj.impression
+    return data
+
+
+# Bundle key -> (model, builder). Keys match the standalone lookup endpoints.
+TAXONOMIES = {
+    "age": (Age, lambda: _value_label(Age.objects.all(), "age")),
+    "brandSafety": (BrandSafety, lambda: _value_label(BrandSafety.objects.all(), "value", int)),
+    "viewability": (Viewability, lambda: _value_label(Viewability.objects.all(), "value", int)),
+    "buyType": (BuyType, lambda: _value_label(BuyType.objects.all(), "value")),
+    "devicePrice": (DevicePrice, lambda: _value_label(DevicePrice.objects.all(), "price")),
+    "device": (Device, lambda: _value_label(Device.objects.all(), "device")),
+    "distinctInterest": (DistinctInterest, lambda: _value_label(DistinctInterest.objects.all(), "interest")),
+    "carrierData": (CarrierData, lambda: _value_label(CarrierData.objects.all(), "carrier")),
+    "environment": (Environment, lambda: _value_label(Environment.objects.all(), "env")),
+    "exchange": (Exchange, lambda: _value_label(Exchange.objects.all(), "exchange")),
+    "language": (Language, _languages),
+    "impression": (Impression, _impression),
+}
+
+
+def _build_bundle():
+    return {name: build() for name, (model, build) in TAXONOMIES.items()}
+
+
+_bundle = VersionedCache("taxonomy", _build_bundle, shared_timeout=BUNDLE_TIMEOUT)
+_bundle.invalidate_on_change(*(model for model, build in TAXONOMIES.values()))
+
+
+def get_bundle():
+    """Return (version, bundle) where bundle maps each taxonomy name to its data."""
+    return _bundle.get()
+
+
+def conditional_response(request, etag, respond):
+    """
+    Return 304 when the client already holds the current ETag, otherwise the
+    Response built by respond(). Clients must revalidate on every use.
+    """
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in parse_etags(if_none_match)):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = respond()
+    response["ETag"] = etag
+    response["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def taxonomy_response(request, name, respond):
+    """Serve a single taxonomy from the cache; respond(data) builds the endpoint's response."""
+    version, bundle = get_bundle()
+    return conditional_response(request, f'"{version}-{name}"', lambda: respond(bundle[name]))
+
+
+def bundle_response(request, respond):
+    """Serve every taxonomy in one response; respond(bundle) builds it."""
+    version, bundle = get_bundle()
+    return conditional_response(request, f'"{version}"', lambda: respond(bundle))
@@ -0,0 +1,1060 @@
+import base64
+import hashlib
+import io
+import tempfile
+import tracemalloc
+from datetime import date, timedelta
+from decimal import Decimal
+from threading import Barrier, Thread
+from unittest import mock
+from urllib.parse import urlencode
+
+import boto3
+import requests
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile, File
+from django.db import IntegrityError, connection, transaction
+from django.db.models import QuerySet
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from moto import mock_aws
+from PIL import Image
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient
+
+from .backends import EmailOrUsernameBackend
+from .blobs import collect_unreferenced
+from .bulk_sync import sync_dataset
+from .delivery import ReportError, aggregate_report
+from .geo import cell, points_within
+from .jobs import CAMPAIGN_FILE_BATCH, PACE_CAMPAIGNS, enqueue, enqueue_campaign_files, schedule_recurring
+from .keywords import contains, ingest_keyword_list, overlap, page_terms
+from .locations import LocationIndex
+from .media import process_media, rendition_names
+from .models import (Age, BackgroundJob, Campaign, CampaignFile, CampaignQuerySet, Creative, GeoPoint, Keyword, KeywordTerm, Location,
+                     StoredBlob, UserDailyMetrics, UserProfile, UserSegmentMetrics, UserType, UserWallet,
+                     WalletTransaction, proximity_store)
+from .pacing import backfill_billed_spend, debit_spend, pace, resume_paused
+from .reach import ReachEstimator
+from .reports import generate_campaign_files
+from .rollups import rebuild, summarize_segments, update_campaign_metrics
+from .search import campaign_saved, index_campaign, search_campaigns
+from .serializers import CampaignSerializer
+from .storage import ContentAddressedStorage
+from .permissions import is_pm_request
+from .tokens import COMPANY_CLAIM, IS_PM_CLAIM, RoleRefreshToken, RoleTokenRefreshSerializer, load_role_claims
+from .uploads import UploadError, abort_upload, complete_upload, start_upload
+from .versioned_cache import VersionedCache
+from .wallet import InsufficientFunds, credit, debit
+
+
+class CampaignSerializerQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user("owner", "owner@example.com", "secret")
+        UserProfile.objects.create(user=user, company_name="Acme")
+        location = Location.objects.create(country="India", state="Delhi", city="Delhi", tier="1")
+        for index in range(5):
+            campaign = Campaign.objects.create(user=user, name=f"Campaign {index}", status="Live")
+            campaign.location.add(location)
+
+    def test_for_serializer_query_count_does_not_grow_with_campaigns(self):
+        # One query for campaigns with user and profile, one per prefetched relation.
+        expected = 1 + len(CampaignQuerySet.SERIALIZER_PREFETCH)
+        with self.assertNumQueries(expected):
+            data = CampaignSerializer(Campaign.objects.for_serializer().order_by("id"), many=True).data
+        self.assertEqual(len(data), 5)
+        self.assertEqual(data[0]["user"]["profile"]["company_name"], "Acme")
+        self.assertEqual(len(data[0]["location"]), 1)
+
+
+class SummarizeSegmentsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("owner", "owner@example.com", "secret")
+        UserSegmentMetrics.objects.bulk_create([
+            UserSegmentMetrics(
+                user=cls.user, status="Live", objective="Banner", buy_type="CPM",
+                campaigns=2, impressions=1000, clicks=10, spend=Decimal("50.00"), rate_spend=Decimal("40.00"),
+            ),
+            UserSegmentMetrics(
+                user=cls.user, status="Completed", objective="Video", buy_type="CPM",
+                campaigns=1, impressions=500, clicks=5, views=100, spend=Decimal("25.00"), rate_spend=Decimal("20.00"),
+            ),
+            UserSegmentMetrics(user=cls.user, status="Draft", objective="Banner", buy_type="CPC", campaigns=0),
+        ])
+
+    def test_summary_is_one_query(self):
+        with self.assertNumQueries(1):
+            summary = summarize_segments(UserSegmentMetrics.objects.filter(user=self.user))
+        self.assertEqual(summary["totals"]["campaign_count"], 3)
+        self.assertEqual(summary["totals"]["total_impressions"], 1500)
+        self.assertEqual(summary["totals"]["total_spend"], Decimal("75.00"))
+
+
+class UsersWithWalletQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.pm = User.objects.create_user("pm", "pm@example.com", "secret")
+        UserType.objects.create(user=cls.pm, user_type_pm=True)
+        for index in range(5):
+            user = User.objects.create_user(f"user{index}", f"user{index}@example.com", "secret")
+            UserProfile.objects.create(user=user, company_name=f"Company {index}")
+            UserWallet.objects.update_or_create(user=user, defaults={"amount": Decimal(index * 10)})
+        User.objects.create_user("nowallet", "nowallet@example.com", "secret")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.pm)
+
+    def test_list_is_one_query_after_the_permission_check(self):
+        # The PM check reads UserType, then one joined query lists the users.
+        with self.assertNumQueries(2):
+            response = self.client.get("/users-wallet/")
+        self.assertEqual(response.status_code, 200)
+        rows = {row["email"]: row for row in response.json()["data"]}
+        self.assertNotIn("pm@example.com", rows)
+        self.assertEqual(rows["user3@example.com"]["company_name"], "Company 3")
+        self.assertEqual(rows["user3@example.com"]["wallet_amount"], 30.0)
+        self.assertEqual(rows["nowallet@example.com"]["wallet_amount"], 0.0)
+
+    def test_paginated_list(self):
+        with self.assertNumQueries(3):
+            response = self.client.get("/users-wallet/", {"page": 1, "page_size": 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["count"], 6)
+
+
+class WalletConcurrencyTests(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("owner", "owner@example.com", "secret")
+
+    def set_balance(self, amount):
+        UserWallet.objects.update_or_create(user=self.user, defaults={"amount": Decimal(amount)})
+
+    def run_in_parallel(self, *calls):
+        """Run calls in their own threads (and connections), released together. Returns the exceptions raised."""
+        barrier = Barrier(len(calls))
+        errors = []
+
+        def run(call):
+            try:
+                barrier.wait()
+                call()
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [Thread(target=run, args=(call,)) for call in calls]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return errors
+
+    def test_parallel_credits_and_debits_are_all_applied(self):
+        self.set_balance("100.00")
+        calls = [lambda: credit(self.user.pk, "10.00") for _ in range(5)]
+        calls += [lambda: debit(self.user.pk, "5.00") for _ in range(5)]
+
+        self.assertEqual(self.run_in_parallel(*calls), [])
+        wallet = UserWallet.objects.get(user=self.user)
+        self.assertEqual(wallet.amount, Decimal("125.00"))
+        self.assertEqual(wallet.transactions.count(), 10)
+        self.assertEqual(wallet.transactions.latest("id").balance_after, Decimal("125.00"))
+
+    def test_parallel_debits_never_overdraw(self):
+        self.set_balance("20.00")
+        errors = self.run_in_parallel(*[lambda: debit(self.user.pk, "10.00") for _ in range(5)])
+
+        self.assertEqual(len(errors), 3)
+        self.assertTrue(all(isinstance(e, InsufficientFunds) for e in errors))
+        self.assertEqual(UserWallet.objects.get(user=self.user).amount, Decimal("0.00"))
+
+    def test_parallel_retries_with_one_idempotency_key_apply_once(self):
+        self.set_balance("0.00")
+        errors = self.run_in_parallel(*[lambda: credit(self.user.pk, "10.00", idempotency_key="top-up-1") for _ in range(5)])
+
+        self.assertEqual(errors, [])
+        self.assertEqual(UserWallet.objects.get(user=self.user).amount, Decimal("10.00"))
+
+
+class S3TestCase(TestCase):
+    """Runs against a moto-mocked S3 bucket."""
+
+    def setUp(self):
+        mock = mock_aws()
+        mock.start()
+        self.addCleanup(mock.stop)
+        self.s3 = boto3.client("s3", region_name=settings.AWS_S3_REGION_NAME)
+        self.s3.create_bucket(Bucket=settings.AWS_STORAGE_BUCKET_NAME)
+
+    def object_exists(self, name):
+        storage = ContentAddressedStorage()
+        return storage.exists(name)
+
+
+class BlobReferenceTests(S3TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user("owner", "owner@example.com", "secret")
+
+    def create_creative(self, content, user=None):
+        return Creative.objects.create(
+            user=user or self.user, name="Banner", creative_type="banner", file=ContentFile(content, name="banner.png")
+        )
+
+    def test_same_bytes_are_stored_once_and_counted_per_row(self):
+        first = self.create_creative(b"banner bytes")
+        second = self.create_creative(b"banner bytes")
+
+        self.assertEqual(first.file.name, second.file.name)
+        blob = StoredBlob.objects.get()
+        self.assertEqual(blob.ref_count, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(StoredBlob.objects.get().ref_count, 1)
+        self.assertTrue(self.object_exists(blob.name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(StoredBlob.objects.exists())
+        self.assertFalse(self.object_exists(blob.name))
+
+    def test_reused_blob_is_referenced_before_the_row_is_saved(self):
+        self.create_creative(b"banner bytes")
+        storage = ContentAddressedStorage()
+
+        # The storage takes the reference itself, so a release between storing and saving the row cannot delete it.
+        name = storage.save("creatives/banner.png", ContentFile(b"banner bytes"))
+        self.assertEqual(StoredBlob.objects.get(name=name).ref_count, 2)
+
+    def test_saving_the_same_bytes_again_keeps_one_reference(self):
+        creative = self.create_creative(b"banner bytes")
+        creative.file = ContentFile(b"banner bytes", name="again.png")
+        creative.save()
+        self.assertEqual(StoredBlob.objects.get().ref_count, 1)
+
+    def test_replacing_the_file_moves_the_reference(self):
+        creative = self.create_creative(b"old bytes")
+        old_name = creative.file.name
+        creative.file = ContentFile(b"new bytes", name="new.png")
+        with self.captureOnCommitCallbacks(execute=True):
+            creative.save()
+
+        self.assertFalse(StoredBlob.objects.filter(name=old_name).exists())
+        self.assertEqual(StoredBlob.objects.get(name=creative.file.name).ref_count, 1)
+
+    def test_collect_unreferenced_removes_only_old_orphans(self):
+        storage = ContentAddressedStorage()
+        for content in (b"old orphan", b"new orphan"):
+            name = storage.save("orphan.bin", ContentFile(content))
+            StoredBlob.objects.filter(name=name).update(ref_count=0)
+        old = StoredBlob.objects.get(sha256=hashlib.sha256(b"old orphan").hexdigest())
+        StoredBlob.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=1))
+        self.create_creative(b"referenced")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(collect_unreferenced(), 1)
+        self.assertFalse(StoredBlob.objects.filter(pk=old.pk).exists())
+        self.assertFalse(self.object_exists(old.name))
+        self.assertEqual(StoredBlob.objects.count(), 2)
+
+    def test_existing_blob_is_offered_only_to_users_who_hold_it(self):
+        content = b"banner bytes"
+        sha256 = hashlib.sha256(content).hexdigest()
+        self.create_creative(content)
+        other = User.objects.create_user("other", "other@example.com", "secret")
+
+        own = start_upload(self.user, "creative", "banner.png", len(content), "image/png", sha256=sha256)
+        self.assertTrue(own["existing"])
+        foreign = start_upload(other, "creative", "banner.png", len(content), "image/png", sha256=sha256)
+        self.assertNotIn("existing", foreign)
+        self.assertIn("post", foreign)
+
+    def test_existing_blob_released_before_completion_is_rejected(self):
+        content = b"banner bytes"
+        creative = self.create_creative(content)
+        response = start_upload(
+            self.user, "creative", "banner.png", len(content), sha256=hashlib.sha256(content).hexdigest()
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            creative.delete()
+
+        with self.assertRaises(UploadError):
+            complete_upload(self.user, response["token"], name="Banner", creative_type="banner")
+
+
+class MediaRenditionTests(S3TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user("owner", "owner@example.com", "secret")
+        buffer = io.BytesIO()
+        Image.new("RGB", (800, 600), "red").save(buffer, "PNG")
+        self.png = buffer.getvalue()
+
+    def create_creative(self):
+        return Creative.objects.create(
+            user=self.user, name="Banner", creative_type="banner", file=ContentFile(self.png, name="banner.png")
+        )
+
+    def test_renditions_are_shared_and_deleted_with_the_original(self):
+        first, second = self.create_creative(), self.create_creative()
+        media = process_media("creative", first.pk)
+        self.assertEqual((media["width"], media["height"]), (800, 600))
+        thumbnails = sorted(media["thumbnails"].values())
+        self.assertEqual(thumbnails, sorted(rendition_names(first.file.name)[:-1]))
+
+        # Renditions are not blobs of their own, and building them again reuses the names.
+        self.assertEqual(list(StoredBlob.objects.values_list("name", "ref_count")), [(first.file.name, 2)])
+        self.assertEqual(process_media("creative", second.pk), media)
+        self.assertTrue(all(self.object_exists(name) for name in thumbnails))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(all(self.object_exists(name) for name in thumbnails))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(StoredBlob.objects.exists())
+        self.assertFalse(any(self.object_exists(name) for name in thumbnails))
+
+
+class RollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("owner", "owner@example.com", "secret")
+
+    def rollups(self):
+        fields = ("user_id", "status", "objective", "buy_type", "campaigns", "impressions", "spend", "rate_spend")
+        daily = ("user_id", "date", "campaigns", "impressions", "clicks", "spend", "budget")
+        return (
+            sorted(UserSegmentMetrics.objects.filter(campaigns__gt=0).values_list(*fields), key=str),
+            sorted(UserDailyMetrics.objects.filter(campaigns__gt=0).values_list(*daily), key=str),
+        )
+
+    def test_incremental_rollups_match_a_rebuild(self):
+        first = Campaign.objects.create(user=self.user, status="Live", objective="Banner", impressions=100, payment="10")
+        second = Campaign.objects.create(user=self.user, status="Live", objective="", impressions=50, unit_rate=2)
+        third = Campaign.objects.create(user=self.user, status="Created")
+        first.status = "Completed"
+        first.impressions = 300
+        first.save()
+        # Deleting a stale instance rolls back what the row holds, not what the instance says.
+        second.buy_type = "CPM"
+        second.save()
+        update_campaign_metrics(second.pk, status="Completed")
+        second.delete()
+        third.delete()
+
+        incremental = self.rollups()
+        rebuild()
+        self.assertEqual(incremental, self.rollups())
+
+    def test_rollup_keys_are_unique_with_null_parts(self):
+        UserSegmentMetrics.objects.create(user=self.user, status="Live")
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            UserSegmentMetrics.objects.create(user=self.user, status="Live")
+
+    def test_concurrently_created_rollup_row_gets_the_delta(self):
+        Campaign.objects.create(user=self.user, status="Live", impressions=10)
+        row = UserSegmentMetrics.objects.get()
+        # The row another transaction inserted after this one's UPDATE found nothing.
+        original_update = QuerySet.update
+        calls = []
+
+        def update(queryset, **kwargs):
+            calls.append(kwargs)
+            return 0 if len(calls) == 1 else original_update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, "update", update):
+            Campaign.objects.create(user=self.user, status="Live", impressions=5)
+
+        row.refresh_from_db()
+        self.assertEqual((row.campaigns, row.impressions), (2, 15))
+        self.assertEqual(UserSegmentMetrics.objects.count(), 1)
+
+
+class PacingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("owner", "owner@example.com", "secret")
+
+    def set_balance(self, amount):
+        UserWallet.objects.update_or_create(user=self.user, defaults={"amount": Decimal(amount)})
+
+    def balance(self):
+        return UserWallet.objects.get(user=self.user).amount
+
+    def campaign(self, **fields):
+        return Campaign.objects.create(user=self.user, **dict({"status": "Live"}, **fields))
+
+    def test_unbilled_spend_is_debited_once(self):
+        self.set_balance("100.00")
+        campaign = self.campaign()
+        update_campaign_metrics(campaign.pk, payment="30")
+
+        self.assertEqual(debit_spend(), ([campaign.pk], []))
+        self.assertEqual(debit_spend(), ([], []))
+        self.assertEqual(self.balance(), Decimal("70.00"))
+        campaign.refresh_from_db()
+        self.assertEqual(campaign.billed_spend, Decimal("30.00"))
+
+        update_campaign_metrics(campaign.pk, payment="45")
+        debit_spend()
+        self.assertEqual(self.balance(), Decimal("55.00"))
+        self.assertEqual(WalletTransaction.objects.filter(kind=WalletTransaction.Kind.SPEND).count(), 2)
+
+    def test_spend_from_before_billing_is_backfilled_not_charged(self):
+        self.set_balance("100.00")
+        campaign = self.campaign()
+        Campaign.objects.filter(pk=campaign.pk).update(billed_spend=None, payment="500")
+
+        # Spend reported before the backfill ran is left for it, not charged.
+        update_campaign_metrics(campaign.pk, payment="520")
+        self.assertEqual(debit_spend(), ([], []))
+        self.assertEqual(backfill_billed_spend(), 1)
+        update_campaign_metrics(campaign.pk, payment="530")
+        debit_spend()
+
+        self.assertEqual(self.balance(), Decimal("90.00"))
+
+    def test_uncovered_spend_pauses_and_a_top_up_resumes(self):
+        self.set_balance("5.00")
+        campaign = self.campaign(status="Learning")
+        update_campaign_metrics(campaign.pk, payment="20")
+
+        summary = pace()
+        self.assertEqual(summary["paused"], [campaign.pk])
+        campaign.refresh_from_db()
+        self.assertEqual((campaign.status, campaign.pacing_paused_from), ("Pause Option", "Learning"))
+
+        credit(self.user.pk, "50.00")
+        summary = resume_paused(self.user.pk)
+        self.assertEqual(summary["resumed"], [campaign.pk])
+        campaign.refresh_from_db()
+        self.assertEqual((campaign.status, campaign.pacing_paused_from), ("Learning", None))
+        self.assertEqual(self.balance(), Decimal("35.00"))
+
+    def test_manually_paused_campaigns_are_not_resumed(self):
+        self.set_balance("100.00")
+        campaign = self.campaign(status="Pause Option")
+        pace()
+        campaign.refresh_from_db()
+        self.assertEqual(campaign.status, "Pause Option")
+
+    def test_empty_wallet_without_unbilled_spend_keeps_running(self):
+        self.set_balance("0.00")
+        campaign = self.campaign()
+        self.assertEqual(pace()["paused"], [])
+        campaign.refresh_from_db()
+        self.assertEqual(campaign.status, "Live")
+
+    def test_ended_or_spent_campaigns_complete(self):
+        self.set_balance("100.00")
+        ended = self.campaign(end_time="2026-01-31")
+        spent = self.campaign(total_budget=Decimal("10.00"))
+        update_campaign_metrics(spent.pk, payment="10")
+        running = self.campaign(start_time="2026-03-01", end_time="2026-03-10", total_budget=Decimal("100.00"))
+
+        summary = pace(today=date(2026, 3, 1))
+        self.assertEqual(sorted(summary["completed"]), sorted([ended.pk, spent.pk]))
+        self.assertEqual([row["campaign_id"] for row in summary["pacing"]], [running.pk])
+        self.assertEqual(summary["pacing"][0]["daily_budget"], Decimal("10.00"))
+
+
+class RecurringJobTests(TestCase):
+    def test_next_run_is_queued_after_the_interval_and_old_runs_pruned(self):
+        finished = timezone.now() - timedelta(days=2)
+        for _ in range(3):
+            job = enqueue(PACE_CAMPAIGNS)
+            BackgroundJob.objects.filter(pk=job.pk).update(status=BackgroundJob.Status.DONE, updated_at=finished)
+
+        schedule_recurring()
+        schedule_recurring()
+
+        jobs = BackgroundJob.objects.filter(kind=PACE_CAMPAIGNS)
+        self.assertEqual(jobs.filter(status=BackgroundJob.Status.DONE).count(), 1)
+        pending = jobs.get(status=BackgroundJob.Status.PENDING)
+        self.assertGreaterEqual(pending.run_after, timezone.now() - timedelta(seconds=5))
+
+
+class CampaignSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("owner", "owner@example.com", "secret", first_name="Priya")
+        UserProfile.objects.create(user=cls.user, company_name="Acme")
+        cls.summer_sale = Campaign.objects.create(user=cls.user, name="Summer Sale", status="Live")
+        cls.winter_sale = Campaign.objects.create(user=cls.user, name="Winter Sale", status="Live")
+        cls.summer_launch = Campaign.objects.create(user=cls.user, name="Summer Launch", status="Created")
+
+    def search(self, query):
+        return list(search_campaigns(Campaign.objects.all(), query).values_list("pk", flat=True))
+
+    def test_words_of_a_term_must_all_match(self):
+        self.assertEqual(self.search("summer sale"), [self.summer_sale.pk])
+        self.assertEqual(self.search("sum sal"), [self.summer_sale.pk])
+
+    def test_terms_are_alternatives(self):
+        self.assertEqual(
+            sorted(self.search("summer sale, launch")), sorted([self.summer_sale.pk, self.summer_launch.pk])
+        )
+
+    def test_prefixes_ending_in_the_last_token_character(self):
+        campaign = Campaign.objects.create(user=self.user, name="Zz Top 9z", status="Live")
+        for query in ("z", "zz", "9", "9z"):
+            self.assertEqual(self.search(query), [campaign.pk], query)
+
+    def test_owner_and_status_tokens_match(self):
+        self.assertEqual(len(self.search("acme")), 3)
+        self.assertEqual(self.search("priya created"), [self.summer_launch.pk])
+
+    def test_name_matches_rank_first(self):
+        other = User.objects.create_user("summer", "summer@example.com", "secret")
+        by_owner = Campaign.objects.create(user=other, name="Autumn", status="Live")
+        results = self.search("summer")
+        self.assertEqual(results[-1], by_owner.pk)
+
+    def test_metric_only_saves_do_not_touch_the_index(self):
+        campaign = Campaign.objects.get(pk=self.summer_sale.pk)
+        campaign.impressions = 10
+        with self.assertNumQueries(0):
+            campaign_saved(Campaign, campaign, update_fields={"impressions"})
+
+    def test_unchanged_document_is_not_rewritten(self):
+        campaign = Campaign.objects.get(pk=self.summer_sale.pk)
+        # Owner tokens, then the current tokens; nothing to delete or insert.
+        with self.assertNumQueries(2):
+            index_campaign(campaign)
+
+    def test_rename_replaces_only_changed_tokens(self):
+        campaign = Campaign.objects.get(pk=self.summer_sale.pk)
+        campaign.name = "Summer Clearance"
+        campaign.save()
+        self.assertEqual(self.search("clearance"), [campaign.pk])
+        self.assertEqual(self.search("summer sale"), [])
+
+
+class KeywordListTests(S3TestCase):
+    TERMS = 200_000
+
+    def create_list(self, name, lines):
+        content = ContentFile("\n".join(["keyword", *lines]).encode(), name=name)
+        return Keyword.objects.create(file=content, uploaded_at=timezone.now())
+
+    def test_large_list_is_ingested_with_bounded_memory(self):
+        # Every tenth term appears again in another case and spacing.
+        lines = [f"term {i}" for i in range(self.TERMS)]
+        lines += [f"  TERM   {i} " for i in range(0, self.TERMS, 10)]
+        keyword = self.create_list("large.csv", lines)
+        del lines
+        other = Keyword.objects.create(keywords=["Term 5, term 199999", "other"], uploaded_at=timezone.now())
+        ingest_keyword_list(other.id)
+
+        tracemalloc.start()
+        try:
+            term_count = ingest_keyword_list(keyword.id)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        self.assertEqual(term_count, self.TERMS)
+        # Batches are bounded, so the peak does not grow with the list.
+        self.assertLess(peak, 16 * 1024 * 1024)
+        keyword.refresh_from_db()
+        self.assertEqual(keyword.term_count, self.TERMS)
+        self.assertEqual(contains(keyword.id, ["TERM 5", "term  42", "term 200000"]), {"term 5", "term 42"})
+        self.assertEqual(overlap(keyword.id, other.id), {"count": 2, "terms": ["term 199999", "term 5"]})
+        self.assertEqual(page_terms(keyword.id, after="term 19999", limit=2), ["term 199990", "term 199991"])
+
+    def test_reparse_switches_generation_and_drops_old_terms(self):
+        keyword = Keyword.objects.create(keywords=["alpha", "beta"], uploaded_at=timezone.now())
+        ingest_keyword_list(keyword.id)
+        Keyword.objects.filter(pk=keyword.id).update(keywords=["beta", "gamma"])
+
+        self.assertEqual(ingest_keyword_list(keyword.id), 2)
+
+        self.assertEqual(page_terms(keyword.id), ["beta", "gamma"])
+        self.assertEqual(contains(keyword.id, ["alpha", "gamma"]), {"gamma"})
+        self.assertEqual(set(KeywordTerm.objects.filter(keyword=keyword).values_list("generation", flat=True)), {2})
+
+
+class GeoPointTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("owner", "owner@example.com", "secret")
+        cls.store = proximity_store.objects.create(uploaded_at=timezone.now())
+        # One point every ~1.1km going north from (28.0, 77.0).
+        GeoPoint.objects.bulk_create(
+            GeoPoint(
+                proximity_store=cls.store, name=f"Store {i}", latitude=28.0 + i * 0.01, longitude=77.0,
+                cell_lat=cell(28.0 + i * 0.01), cell_lng=cell(77.0),
+            )
+            for i in range(100)
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_radius_search_returns_the_nearest_points_up_to_the_limit(self):
+        points = points_within("proximity_store", self.store.pk, 28.5, 77.0, 5, limit=3)
+
+        self.assertEqual([point["name"] for point in points], ["Store 50", "Store 49", "Store 51"])
+        self.assertEqual(points[0]["distance_km"], 0)
+
+    def test_radius_search_excludes_points_outside_the_radius(self):
+        points = points_within("proximity_store", self.store.pk, 28.5, 77.0, 5)
+
+        self.assertEqual(sorted(point["name"] for point in points), [f"Store {i}" for i in range(46, 55)])
+
+    def test_non_finite_or_oversized_parameters_are_rejected(self):
+        url = f"/api/proximityStore/{self.store.pk}/points/"
+        for params in (
+            {"lat": "inf", "lng": "77", "radius_km": "5"},
+            {"lat": "28", "lng": "77", "radius_km": "inf"},
+            {"lat": "nan", "lng": "77", "radius_km": "5"},
+            {"lat": "28", "lng": "77", "radius_km": "5000"},
+            {"min_lat": "-inf", "max_lat": "29", "min_lng": "76", "max_lng": "78"},
+        ):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(url, params).status_code, 400)
+
+        response = self.client.get(url, {"lat": "28.5", "lng": "77", "radius_km": "2"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["data"]), 3)
+
+
+class ReachEstimatorTests(TestCase):
+    def estimator(self, impression):
+        return ReachEstimator([(1, 1000), (2, 500)], impression)
+
+    def test_repeated_location_ids_count_once(self):
+        estimate = self.estimator({}).estimate([1, 1, 2])
+
+        self.assertEqual(estimate["population"], 1500)
+
+    def test_malformed_segments_are_skipped(self):
+        estimator = self.estimator({
+            "age": [
+                {"label": "18-24", "percentage": 40},
+                {"label": "25-34"},
+                {"label": "35-44", "percentage": "n/a"},
+                {"label": "45+", "percentage": "NaN"},
+                {"percentage": 10},
+                "55+",
+            ],
+        })
+
+        estimate = estimator.estimate([1], {"age": ["18-24", "25-34", "35-44"]})
+
+        self.assertEqual(estimate["shares"], {"age": 0.4})
+        self.assertEqual(estimate["reach"], 400)
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class VersionedCacheTests(TestCase):
+    def test_value_is_rebuilt_after_a_watched_model_changes(self):
+        build = mock.Mock(side_effect=["first", "second"])
+        versioned = VersionedCache("test", build)
+        versioned.invalidate_on_change(Location)
+
+        version, value = versioned.get()
+        self.assertEqual(versioned.get(), (version, "first"))
+        Location.objects.create(country="India", state="Delhi", city="Delhi", tier="1")
+
+        self.assertEqual(versioned.get()[1], "second")
+        self.assertEqual(build.call_count, 2)
+
+    def test_shared_value_is_built_once_across_processes(self):
+        build = mock.Mock(return_value={"rows": 3})
+        VersionedCache("test", build, shared_timeout=60).get()
+
+        # A second worker's instance finds the value in the shared cache.
+        version, value = VersionedCache("test", build, shared_timeout=60).get()
+
+        self.assertEqual(value, {"rows": 3})
+        self.assertEqual(build.call_count, 1)
+
+
+class LocationIndexTests(TestCase):
+    ROWS = [
+        {"id": 1, "country": "India", "state": "Maharashtra", "city": "Mumbai", "tier": "1", "population": 12000000},
+        {"id": 2, "country": "India", "state": "Maharashtra", "city": "Navi Mumbai", "tier": "2", "population": 1100000},
+        {"id": 3, "country": "India", "state": "Maharashtra", "city": "Mumbra", "tier": "3", "population": 900000},
+        {"id": 4, "country": "India", "state": "Delhi", "city": "New Delhi", "tier": "1", "population": 250000},
+        {"id": 5, "country": "India", "state": "Delhi", "city": "Delhi", "tier": "1", "population": 11000000},
+    ]
+
+    def test_prefix_search_ranks_by_population_and_matches_later_words(self):
+        index = LocationIndex(self.ROWS)
+
+        self.assertEqual([row["id"] for row in index.search("mum")], [1, 2, 3])
+        self.assertEqual([row["id"] for row in index.search(" DEL ")], [5, 4])
+        self.assertEqual([row["id"] for row in index.search("new d")], [4])
+        self.assertEqual([row["id"] for row in index.search("mum", tiers={"2", "3"}, limit=1)], [2])
+        self.assertEqual(index.search("xyz"), [])
+
+    def test_tree_levels_aggregate_counts_and_population(self):
+        index = LocationIndex(self.ROWS)
+
+        self.assertEqual(index.children(), [{"name": "India", "count": 5, "population": 25250000}])
+        self.assertEqual(index.children("India", tiers={"1"}), [
+            {"name": "Delhi", "count": 2, "population": 11250000},
+            {"name": "Maharashtra", "count": 1, "population": 12000000},
+        ])
+        self.assertEqual([row["id"] for row in index.children("India", "Delhi")], [5, 4])
+
+    def test_search_over_a_large_index(self):
+        rows = [
+            {"id": i, "country": "India", "state": f"State {i % 30}", "city": f"City{i:05d} Nagar",
+             "tier": str(i % 3 + 1), "population": i}
+            for i in range(1, 50001)
+        ]
+        index = LocationIndex(rows)
+
+        self.assertEqual([row["id"] for row in index.search("city4999")], list(range(49999, 49989, -1)))
+        self.assertEqual(len(index.search("nagar", limit=100)), 100)
+        self.assertEqual(index.search("nagar", limit=1)[0]["id"], 50000)
+        self.assertEqual(sum(node["count"] for node in index.children("India")), 50000)
+
+
+class DirectUploadTests(S3TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user("owner", "owner@example.com", "secret")
+        self.bucket = settings.AWS_STORAGE_BUCKET_NAME
+
+    def start(self, content, filename="banner.png", sha256=True):
+        digest = hashlib.sha256(content).hexdigest() if sha256 else None
+        return start_upload(self.user, "creative", filename, len(content), "image/png", sha256=digest)
+
+    def complete(self, response, parts=None):
+        return complete_upload(self.user, response["token"], parts, name="Banner", creative_type="banner")
+
+    def reporting_checksums(self):
+        """
+        S3 returns ChecksumSHA256 from head_object for checksummed objects,
+        but moto does not, so report the checksum of the stored bytes.
+        """
+        client = Creative._meta.get_field("file").storage.bucket.meta.client
+        head_object = client.head_object
+
+        def head_with_checksum(**kwargs):
+            head = head_object(**kwargs)
+            body = self.s3.get_object(Bucket=kwargs["Bucket"], Key=kwargs["Key"])["Body"].read()
+            head["ChecksumSHA256"] = base64.b64encode(hashlib.sha256(body).digest()).decode()
+            return head
+
+        return mock.patch.object(client, "head_object", side_effect=head_with_checksum)
+
+    def post(self, response, content):
+        post = response["post"]
+        result = requests.post(post["url"], data=post["fields"], files={"file": ("banner.png", content)})
+        self.assertLess(result.status_code, 300, result.text)
+
+    def test_hashed_upload_is_checksummed_and_registered_as_a_blob(self):
+        content = b"banner bytes"
+        response = self.start(content)
+
+        fields = response["post"]["fields"]
+        self.assertEqual(fields["key"], response["key"])
+        self.assertEqual(fields["x-amz-checksum-algorithm"], "SHA256")
+        self.assertEqual(fields["x-amz-checksum-sha256"], base64.b64encode(hashlib.sha256(content).digest()).decode())
+        self.s3.put_object(Bucket=self.bucket, Key=response["key"], Body=content, ChecksumAlgorithm="SHA256")
+
+        with self.reporting_checksums():
+            creative = self.complete(response)
+
+        self.assertEqual(creative.file.name, response["key"])
+        self.assertEqual(creative.user, self.user)
+        blob = StoredBlob.objects.get()
+        self.assertEqual((blob.name, blob.size, blob.ref_count), (response["key"], len(content), 1))
+
+    def test_object_with_other_bytes_is_rejected(self):
+        response = self.start(b"banner bytes")
+        self.s3.put_object(Bucket=self.bucket, Key=response["key"], Body=b"other bytes!", ChecksumAlgorithm="SHA256")
+
+        with self.reporting_checksums(), self.assertRaisesMessage(UploadError, "checksum"):
+            self.complete(response)
+        self.assertFalse(Creative.objects.exists())
+
+    def test_unhashed_upload_through_the_presigned_post(self):
+        content = b"plain bytes"
+        response = self.start(content, sha256=False)
+        self.assertNotIn("x-amz-checksum-sha256", response["post"]["fields"])
+        self.post(response, content)
+
+        creative = self.complete(response)
+
+        self.assertEqual(creative.file.read(), content)
+        self.assertFalse(StoredBlob.objects.exists())
+
+    def test_missing_object_is_rejected(self):
+        with self.assertRaisesMessage(UploadError, "not found"):
+            self.complete(self.start(b"never sent", sha256=False))
+
+    @mock.patch("api.uploads.MULTIPART_THRESHOLD", 1024)
+    @mock.patch("api.uploads.MIN_PART_SIZE", 5 * 1024 * 1024)
+    def test_multipart_upload_is_assembled_from_its_parts(self):
+        content = b"x" * (5 * 1024 * 1024) + b"tail"
+        response = self.start(content, filename="video.png")
+        self.assertEqual(len(response["parts"]), 2)
+
+        parts = []
+        for part in response["parts"]:
+            start = (part["part_number"] - 1) * response["part_size"]
+            result = requests.put(part["url"], data=content[start:start + response["part_size"]])
+            self.assertEqual(result.status_code, 200, result.text)
+            parts.append({"part_number": part["part_number"], "etag": result.headers["ETag"]})
+
+        creative = self.complete(response, parts)
+
+        self.assertEqual(creative.file.size, len(content))
+
+    @mock.patch("api.uploads.MULTIPART_THRESHOLD", 1024)
+    def test_aborted_multipart_upload_is_discarded(self):
+        response = self.start(b"x" * 2048, sha256=False)
+        self.assertEqual(len(self.s3.list_multipart_uploads(Bucket=self.bucket).get("Uploads", [])), 1)
+
+        abort_upload(self.user, response["token"])
+
+        self.assertEqual(self.s3.list_multipart_uploads(Bucket=self.bucket).get("Uploads", []), [])
+        with self.assertRaises(UploadError):
+            self.complete(response, [{"part_number": 1, "etag": "missing"}])
+
+
+class DeliveryReportTests(TestCase):
+    ROWS = 200_000
+
+    def report(self, lines):
+        return ContentFile("\n".join(["id,date,impressions,clicks,views,spends", *lines]).encode(), name="report.csv")
+
+    def test_non_finite_numbers_are_rejected(self):
+        for value in ("NaN", "Infinity", "-inf", "sNaN"):
+            with self.subTest(value=value), self.assertRaisesMessage(ReportError, "spend column"):
+                aggregate_report(self.report([f"7,2024-01-01,10,1,5,{value}"]), 7)
+
+    def test_large_report_is_aggregated_with_bounded_memory(self):
+        with tempfile.TemporaryFile() as handle:
+            handle.write(b"id,date,impressions,clicks,views,spends\n")
+            for i in range(self.ROWS):
+                # Every other row belongs to another campaign; 10 days of data.
+                handle.write(f"{7 if i % 2 else 8},2024-01-{i % 10 + 1:02d},10,1,\"1,000\",0.25\n".encode())
+            report = File(handle, name="report.csv")
+
+            tracemalloc.start()
+            try:
+                result = aggregate_report(report, 7)
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+
+        self.assertEqual(result["rows"], self.ROWS // 2)
+        self.assertEqual(len(result["days"]), 5)
+        per_day = self.ROWS // 10
+        self.assertEqual(result["days"][date(2024, 1, 2)], {
+            "impressions": 10 * per_day, "clicks": per_day, "views": 1000 * per_day, "spend": Decimal(per_day) / 4,
+        })
+        # Rows are streamed, so the peak does not grow with the report.
+        self.assertLess(peak, 1024 * 1024)
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class EmailOrUsernameBackendTests(TestCase):
+    def authenticate(self, login, password="secret"):
+        return EmailOrUsernameBackend().authenticate(None, username=login, password=password)
+
+    def test_username_match_wins_over_an_earlier_email_match(self):
+        User.objects.create_user("someone", "shared@example.com", "other")
+        owner = User.objects.create_user("shared@example.com", "owner@example.com", "secret")
+
+        self.assertEqual(self.authenticate("shared@example.com"), owner)
+
+    def test_email_login_resolves_in_one_query_with_role_claims(self):
+        user = User.objects.create_user("owner", "owner@example.com", "secret")
+        UserType.objects.create(user=user, user_type_pm=True)
+        UserProfile.objects.create(user=user, company_name="Acme")
+
+        with self.assertNumQueries(1):
+            authenticated = self.authenticate("owner@example.com")
+        self.assertEqual(authenticated, user)
+        self.assertEqual((authenticated.is_pm, authenticated.company), (True, "Acme"))
+        self.assertIsNone(self.authenticate("owner@example.com", "wrong"))
+        self.assertIsNone(self.authenticate("nobody@example.com"))
+
+    def test_email_is_indexed(self):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, User._meta.db_table)
+        self.assertEqual(constraints["auth_user_email_idx"]["columns"], ["email"])
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class RoleClaimTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("owner", "owner@example.com", "secret")
+        UserProfile.objects.create(user=self.user, company_name="Acme")
+
+    def test_any_pm_row_makes_the_user_a_pm(self):
+        UserType.objects.create(user=self.user, user_type_pm=False)
+        self.assertFalse(load_role_claims(self.user.pk)[IS_PM_CLAIM])
+
+        UserType.objects.create(user=self.user, user_type_pm=True)
+        UserType.objects.create(user=self.user, user_type_pm=False)
+        self.assertEqual(load_role_claims(self.user.pk), {IS_PM_CLAIM: True, COMPANY_CLAIM: "Acme"})
+        self.assertTrue(is_pm_request(mock.Mock(auth=None, user=self.user)))
+        self.assertTrue(EmailOrUsernameBackend().authenticate(None, username="owner", password="secret").is_pm)
+
+    def test_refresh_signs_the_current_claims(self):
+        refresh = RoleRefreshToken.for_user(self.user, is_pm=False, company="Old")
+        UserType.objects.create(user=self.user, user_type_pm=True)
+
+        serializer = RoleTokenRefreshSerializer(data={"refresh": str(refresh)})
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        access = RoleRefreshToken.access_token_class(serializer.validated_data["access"])
+        self.assertEqual((access[IS_PM_CLAIM], access[COMPANY_CLAIM]), (True, "Acme"))
+
+        self.user.is_active = False
+        self.user.save()
+        serializer = RoleTokenRefreshSerializer(data={"refresh": str(RoleRefreshToken.for_user(self.user, False, None))})
+        with self.assertRaises(AuthenticationFailed):
+            serializer.is_valid()
+
+
+class SyncDatasetTests(TestCase):
+    def test_prune_runs_even_when_the_file_is_unchanged(self):
+        self.assertIsNotNone(sync_dataset("age"))
+        self.assertIsNone(sync_dataset("age"))
+        Age.objects.create(age="not-in-file", label="Not in file")
+
+        result = sync_dataset("age", prune=True)
+
+        self.assertEqual(result["deleted"], 1)
+        self.assertFalse(Age.objects.filter(age="not-in-file").exists())
+
+
+class CampaignCursorPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("owner", "owner@example.com", "secret")
+        Campaign.objects.bulk_create(Campaign(user=cls.user, name=f"Campaign {i}", status="Live") for i in range(7))
+        # Five campaigns share one updated_at, more than a page of ties.
+        now = timezone.now()
+        ids = list(Campaign.objects.order_by("id").values_list("id", flat=True))
+        Campaign.objects.filter(id__in=ids[:5]).update(updated_at=now)
+        Campaign.objects.filter(id__in=ids[5:]).update(updated_at=now + timedelta(minutes=1))
+        cls.expected = ids[5:][::-1] + ids[:5][::-1]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def ids(self, page):
+        return [campaign["id"] for campaign in page["results"]["data"]]
+
+    def test_pages_through_ties_without_repeating_or_skipping(self):
+        page = self.get("/api/fetch_user_campgain/", pagination="cursor", page_size=3)
+        pages = [self.ids(page)]
+        while page["next"]:
+            page = self.get(page["next"])
+            pages.append(self.ids(page))
+
+        self.assertEqual(pages, [self.expected[:3], self.expected[3:6], self.expected[6:]])
+
+        previous = self.get(page["previous"])
+        self.assertEqual(self.ids(previous), self.expected[3:6])
+        self.assertEqual(self.ids(self.get(previous["previous"])), self.expected[:3])
+
+    def test_tampered_cursor_is_rejected(self):
+        positions = ('["x"]', '["not a date", "1"]')
+        cursors = ["not-base64"] + [base64.b64encode(urlencode({"p": p}).encode()).decode() for p in positions]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self.client.get("/api/fetch_user_campgain/", {"cursor": cursor}).status_code, 404)
+
+
+class DashboardQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner", "owner@example.com", "secret")
+        cls.pm = User.objects.create_user("pm", "pm@example.com", "secret")
+        other = User.objects.create_user("other", "other@example.com", "secret")
+        for index in range(6):
+            Campaign.objects.create(
+                user=cls.owner if index % 3 else other, name=f"Campaign {index}", status="Live",
+                objective="Banner" if index % 2 else "Video", buy_type="CPM",
+                impressions=1000 * (index + 1), clicks=10 * (index + 1), ctr=Decimal(index),
+            )
+
+    def get(self, url, user, is_pm):
+        client = APIClient()
+        # The role claim travels in the access token, so the views need no UserType lookup.
+        client.force_authenticate(user, token={IS_PM_CLAIM: is_pm})
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.json()["data"]
+
+    def test_tiles_are_one_query(self):
+        with self.assertNumQueries(1):
+            owner = self.get("/dashboard/tiles/", self.owner, False)
+        with self.assertNumQueries(1):
+            everyone = self.get("/dashboard/tiles/", self.pm, True)
+
+        self.assertEqual((owner["campaign_count"], owner["total_impressions"]), (4, 16000))
+        self.assertEqual((everyone["campaign_count"], everyone["total_impressions"]), (6, 21000))
+
+    def test_charts_are_two_queries(self):
+        # One grouped query over the rollup rows, one for the top campaigns by CTR.
+        with self.assertNumQueries(2):
+            owner = self.get("/dashboard/charts/", self.owner, False)
+        with self.assertNumQueries(2):
+            everyone = self.get("/dashboard/charts/", self.pm, True)
+
+        self.assertEqual(owner["campaign_performance_summary"]["total_clicks"], 160)
+        self.assertEqual([row["name"] for row in owner["top_campaigns_by_ctr"]][:2], ["Campaign 5", "Campaign 4"])
+        self.assertEqual(len(everyone["top_campaigns_by_ctr"]), 5)
+        self.assertEqual(everyone["campaign_performance_summary"]["total_impressions"], 21000)
+
+
+class CampaignFileQueueTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("owner", "owner@example.com", "secret")
+        cls.filed = Campaign.objects.create(user=cls.user, name="Filed", status="Live", file_status="pending")
+        CampaignFile.objects.create(campaign=cls.filed, file="campaigns/files/campaign_filed.xlsx")
+        cls.missing = Campaign.objects.create(user=cls.user, name="Missing", status="Live")
+
+    def test_each_campaign_is_queued_once(self):
+        jobs = enqueue_campaign_files([self.missing.pk, self.missing.pk, self.filed.pk])
+
+        self.assertEqual([job.payload for job in jobs], [{"campaign_ids": [self.missing.pk]}])
+        self.assertEqual(enqueue_campaign_files([self.missing.pk]), [])
+        self.missing.refresh_from_db()
+        self.assertEqual(self.missing.file_status, "pending")
+
+    def test_file_list_does_not_queue_campaigns_twice(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        for _ in range(2):
+            response = client.get(f"/get-csv/{self.missing.pk}")
+            self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(
+            list(BackgroundJob.objects.filter(kind=CAMPAIGN_FILE_BATCH).values_list("payload", flat=True)),
+            [{"campaign_ids": [self.missing.pk]}],
+        )
+        self.assertEqual({row["status"] for row in response.json()}, {"exists", "queued"})
+
+    def test_campaigns_filed_meanwhile_are_marked_ready(self):
+        self.assertEqual(generate_campaign_files([self.filed.pk]), [])
+
+        self.filed.refresh_from_db()
+        self.assertEqual(self.filed.file_status, "ready")
@@ -0,0 +1,99 @@
+"""
+Role claims in JWTs.
+
+Access tokens carry the user's PM flag and company as signed claims.
+Permission checks (api.permissions) and the dashboard endpoints read them
+from the token and skip the UserType query. Login sets the claims from the
+authenticated user. Every refresh reads them again (one query), so a role
+change shows up within one access-token lifetime.
+
+TokenUserAuthentication builds request.user from the token alone, without
+the auth_user lookup. Use it on read-only endpoints that only need the
+user's id and role. It is not a model instance: filter on
+``user_id=request.user.id``, not ``user=request.user``.
+"""
+from django.contrib.auth.models import User
+from django.db.models import Exists, OuterRef
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTTokenUserAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import UserType
+
+IS_PM_CLAIM = "is_pm"
+COMPANY_CLAIM = "company"
+
+
+def role_claims(is_pm, company):
+    return {IS_PM_CLAIM: bool(is_pm), COMPANY_CLAIM: company}
+
+
+def pm_exists(user):
+    """True when any of the user's UserType rows is a PM; user is an id or an OuterRef."""
+    return Exists(UserType.objects.filter(user=user, user_type_pm=True))
+
+
+def load_role_claims(user_id):
+    """Role claims of an active user, read in one query; None for inactive or deleted users."""
+    row = (
+        User.objects.filter(pk=user_id, is_active=True)
+        .annotate(is_pm=pm_exists(OuterRef("pk")))
+        .values_list("is_pm", "profile__company_name")
+        .first()
+    )
+    return None if row is None else role_claims(*row)
+
+
+class RoleRefreshToken(RefreshToken):
+    @classmethod
+    def for_user(cls, user, is_pm=None, company=None):
+        """Token pair for user with role claims; the access token copies them."""
+        token = super().for_user(user)
+        if is_pm is None:
+            claims = load_role_claims(user.pk) or role_claims(False, None)
+        else:
+            claims = role_claims(is_pm, company)
+        token.payload.update(claims)
+        return token
+
+
+class RoleTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = RoleRefreshToken
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        access = self.token_class.access_token_class(data["access"])
+        claims = load_role_claims(access[api_settings.USER_ID_CLAIM])
+        if claims is None:
+            raise AuthenticationFailed("User is inactive or deleted.")
+
+        # The new tokens copy the claims of the old refresh token; sign them again with the current ones.
+        access.payload.update(claims)
+        data["access"] = str(access)
+        if "refresh" in data:
+            refresh = self.token_class(data["refresh"])
+            refresh.payload.update(claims)
+            data["refresh"] = str(refresh)
+        return data
+
+
+class RoleTokenUser(TokenUser):
+    @property
+    def is_pm(self):
+        """The PM claim, or None for tokens issued before it existed."""
+        value = self.token.get(IS_PM_CLAIM)
+        return None if value is None else bool(value)
+
+    @property
+    def company(self):
+        return self.token.get(COMPANY_CLAIM)
+
+
+class TokenUserAuthentication(JWTTokenUserAuthentication):
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            return super().get_user(validated_token)
+        return RoleTokenUser(validated_token)
@@ -0,0 +1,282 @@
+"""
+Direct-to-S3 uploads.
+
+The browser asks for a presigned upload, sends the bytes straight to S3 and
+then calls back to record the object on the model, so upload bodies never
+pass through the app servers. Small files use a presigned POST; files above
+MULTIPART_THRESHOLD get one presigned URL per part of a multipart upload.
+
+The upload is described by a signed token handed out with the presigned
+request, so the completion call cannot attach an arbitrary key.
+
+For content-addressed targets the client sends the file's SHA-256. The
+presigned POST then carries x-amz-checksum-sha256, so S3 rejects any body
+that does not match, and the object is keyed under its blob name. On
+completion the stored checksum is checked again and the object is
+registered as a StoredBlob, so the same user's later uploads of those bytes
+are skipped.
+"""
+import base64
+import math
+import posixpath
+import re
+import os
+import uuid
+
+from botocore.exceptions import ClientError
+from django.conf import settings
+from django.core import signing
+from django.db import transaction
+from django.utils.text import get_valid_filename
+
+from .jobs import enqueue_upload_processing
+from .models import (Campaign, CampaignImage, CampaignVideo, Creative, Keyword, StoredBlob, proximity, proximity_store,
+                     tag_tracker, weather)
+from .storage import ContentAddressedStorage, blob_name
+
+# Upload target -> (model, file field). Objects are keyed under the field's upload_to.
+UPLOAD_TARGETS = {
+    "creative": (Creative, "file"),
+    "campaign_image": (CampaignImage, "image"),
+    "campaign_video": (CampaignVideo, "video"),
+    "keyword": (Keyword, "file"),
+    "tag_tracker": (tag_tracker, "file"),
+    "proximity_store": (proximity_store, "file"),
+    "proximity": (proximity, "file"),
+    "weather": (weather, "file"),
+}
+
+# Content-addressed upload target -> Campaign field its rows are attached through.
+CAMPAIGN_FIELDS = {
+    "campaign_image": "images",
+    "keyword": "keywords",
+    "tag_tracker": "tag_tracker",
+    "proximity_store": "proximity_store",
+    "proximity": "proximity",
+    "weather": "weather",
+}
+
+MAX_UPLOAD_SIZE = getattr(settings, "DIRECT_UPLOAD_MAX_SIZE", 5 * 1024 ** 3)
+MULTIPART_THRESHOLD = 64 * 1024 * 1024
+MIN_PART_SIZE = 16 * 1024 * 1024
+MAX_PARTS = 10000
+URL_EXPIRY = 60 * 60
+TOKEN_SALT = "api.uploads"
+
+_sha256_re = re.compile(r"^[0-9a-f]{64}$")
+
+
+class UploadError(ValueError):
+    """Raised when an upload request or completion is invalid."""
+
+
+def _field(target):
+    try:
+        model, field_name = UPLOAD_TARGETS[target]
+    except KeyError:
+        raise UploadError(f"Unknown upload target '{target}'.")
+    return model, model._meta.get_field(field_name)
+
+
+def _client(field):
+    return field.storage.bucket.meta.client
+
+
+def _key(storage, name):
+    """The S3 object key of a storage name: the storage's location prefix plus the name."""
+    return posixpath.join(storage.location, name) if storage.location else name
+
+
+def _checksum(sha256):
+    """The base64 SHA-256 S3 reports for a hex digest."""
+    return base64.b64encode(bytes.fromhex(sha256)).decode()
+
+
+def _part_size(size):
+    return max(MIN_PART_SIZE, math.ceil(size / MAX_PARTS))
+
+
+def _holds_blob(user, name):
+    """Whether one of the user's creatives or campaigns already references the blob."""
+    if Creative.objects.filter(user=user, file=name).exists():
+        return True
+    for target, campaign_field in CAMPAIGN_FIELDS.items():
+        model, field = _field(target)
+        campaigns = Campaign._meta.get_field(campaign_field).related_query_name()
+        if model.objects.filter(**{field.name: name, f"{campaigns}__user": user}).exists():
+            return True
+    return False
+
+
+def start_upload(user, target, filename, size, content_type="", sha256=None):
+    """
+    Reserve a key under the target's upload_to and presign the upload.
+    Returns a dict with the token for complete_upload plus either a presigned
+    POST ("post") or the multipart part URLs ("parts", "part_size").
+
+    When the client sends the file's SHA-256 and the user already has a
+    file with those bytes in content-addressed storage, nothing needs
+    uploading: the response has "existing": true and the token points at
+    the stored blob.
+    """
+    model, field = _field(target)
+    if not filename:
+        raise UploadError("filename is required.")
+    if size <= 0 or size > MAX_UPLOAD_SIZE:
+        raise UploadError(f"size must be between 1 and {MAX_UPLOAD_SIZE} bytes.")
+
+    if not isinstance(field.storage, ContentAddressedStorage):
+        sha256 = None
+    if sha256:
+        sha256 = sha256.lower()
+        if not _sha256_re.match(sha256):
+            raise UploadError("sha256 must be a hex SHA-256 digest.")
+        blob = StoredBlob.objects.filter(sha256=sha256, size=size).first()
+        # Knowing a hash is not proof of having the bytes: only reuse blobs the user already holds.
+        if blob is not None and _holds_blob(user, blob.name):
+            token = {"user": user.pk, "target": target, "name": blob.name, "size": size, "existing": True}
+            return {"key": blob.name, "existing": True, "token": signing.dumps(token, salt=TOKEN_SALT)}
+
+    # Hashed small files go straight to their blob name, verified by S3 on upload.
+    verified = bool(sha256) and size <= MULTIPART_THRESHOLD
+    if verified:
+        name = blob_name(sha256, filename)
+    else:
+        name = field.generate_filename(None, f"{uuid.uuid4().hex}/{get_valid_filename(os.path.basename(filename))}")
+    storage = field.storage
+    key = _key(storage, name)
+    client = _client(field)
+    token = {"user": user.pk, "target": target, "name": name, "size": size}
+    response = {"key": name}
+
+    if size <= MULTIPART_THRESHOLD:
+        fields = {"Content-Type": content_type} if content_type else {}
+        if verified:
+            fields["x-amz-checksum-algorithm"] = "SHA256"
+            fields["x-amz-checksum-sha256"] = _checksum(sha256)
+            token["sha256"] = sha256
+        conditions = [["content-length-range", size, size]]
+        conditions += [{form_field: value} for form_field, value in fields.items()]
+        response["post"] = client.generate_presigned_post(
+            Bucket=storage.bucket_name, Key=key, Fields=fields, Conditions=conditions, ExpiresIn=URL_EXPIRY
+        )
+    else:
+        extra = {"ContentType": content_type} if content_type else {}
+        upload_id = client.create_multipart_upload(Bucket=storage.bucket_name, Key=key, **extra)["UploadId"]
+        part_size = _part_size(size)
+        response["part_size"] = part_size
+        response["parts"] = [
+            {
+                "part_number": number,
+                "url": client.generate_presigned_url(
+                    "upload_part",
+                    Params={"Bucket": storage.bucket_name, "Key": key, "UploadId": upload_id, "PartNumber": number},
+                    ExpiresIn=URL_EXPIRY,
+                ),
+            }
+            for number in range(1, math.ceil(size / part_size) + 1)
+        ]
+        token["upload_id"] = upload_id
+
+    response["token"] = signing.dumps(token, salt=TOKEN_SALT)
+    return response
+
+
+def _load_token(user, token):
+    try:
+        data = signing.loads(token, salt=TOKEN_SALT, max_age=URL_EXPIRY * 2)
+    except signing.BadSignature:
+        raise UploadError("Invalid or expired upload token.")
+    if data["user"] != user.pk:
+        raise UploadError("Upload token belongs to another user.")
+    return data
+
+
+def upload_token_target(user, token):
+    """The upload target a token was issued for."""
+    return _load_token(user, token)["target"]
+
+
+def complete_upload(user, token, parts=None, **fields):
+    """
+    Finish an upload (assembling multipart parts when needed), check the
+    object landed with the announced size and create the model row.
+    Extra fields (e.g. a creative's name) are set on the new instance.
+    """
+    data = _load_token(user, token)
+    model, field = _field(data["target"])
+    if data.get("existing"):
+        with transaction.atomic():
+            # Locked until the new row holds its reference, so a concurrent release cannot delete the blob.
+            if not StoredBlob.objects.select_for_update().filter(name=data["name"]).exists():
+                raise UploadError("The stored file is no longer available; upload it again.")
+            return _create_instance(user, model, field, data["name"], fields)
+
+    storage = field.storage
+    key = _key(storage, data["name"])
+    client = _client(field)
+
+    if "upload_id" in data:
+        if not parts:
+            raise UploadError("parts are required to complete a multipart upload.")
+        try:
+            parts = sorted(
+                ({"PartNumber": int(part["part_number"]), "ETag": part["etag"]} for part in parts),
+                key=lambda part: part["PartNumber"],
+            )
+            client.complete_multipart_upload(
+                Bucket=storage.bucket_name, Key=key, UploadId=data["upload_id"], MultipartUpload={"Parts": parts}
+            )
+        except (KeyError, TypeError, ValueError, ClientError) as e:
+            raise UploadError(f"Could not complete the multipart upload: {e}")
+
+    try:
+        head = client.head_object(Bucket=storage.bucket_name, Key=key, ChecksumMode="ENABLED")
+    except ClientError:
+        raise UploadError("The uploaded object was not found.")
+    if head["ContentLength"] != data["size"]:
+        raise UploadError("The uploaded object does not match the announced size.")
+
+    if not data.get("sha256"):
+        return _create_instance(user, model, field, data["name"], fields)
+    if head.get("ChecksumSHA256") != _checksum(data["sha256"]):
+        raise UploadError("The uploaded object does not match the announced checksum.")
+    with transaction.atomic():
+        name = _register_blob(storage, data["sha256"], data["name"], data["size"])
+        return _create_instance(user, model, field, name, fields)
+
+
+def _register_blob(storage, sha256, name, size):
+    """
+    Record a verified upload as a StoredBlob and lock it until the caller's
+    transaction commits; returns the blob's name.
+    """
+    blob, created = StoredBlob.objects.select_for_update().get_or_create(
+        sha256=sha256, defaults={"name": name, "size": size}
+    )
+    if blob.name != name:
+        # Same bytes already stored under another name (e.g. another extension).
+        transaction.on_commit(lambda: storage.delete(name))
+    return blob.name
+
+
+def _create_instance(user, model, field, name, fields):
+    instance = model(**fields)
+    if model is Creative:
+        instance.user = user
+    setattr(instance, field.name, name)
+    instance.full_clean(exclude=[field.name])
+    instance.save()
+    enqueue_upload_processing(instance)
+    return instance
+
+
+def abort_upload(user, token):
+    """Abort a multipart upload so S3 discards its parts."""
+    data = _load_token(user, token)
+    if "upload_id" not in data:
+        return
+    model, field = _field(data["target"])
+    _client(field).abort_multipart_upload(
+        Bucket=field.storage.bucket_name, Key=_key(field.storage, data["name"]), UploadId=data["upload_id"]
+    )
@@ -0,0 +1,71 @@
+"""
+Process-local caches of data derived from lookup tables.
+
+Each cache keeps one built value per version. The version stamp lives in the
+shared Django cache and is replaced whenever a watched model changes (saves,
+deletes and bulk loads through api.bulk_sync), so every worker rebuilds on
+its next request. Used by api.taxonomy, api.interests, api.locations and
+api.reach.
+"""
+import uuid
+
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+
+from .bulk_sync import data_synced
+
+
+class VersionedCache:
+    """
+    build() is called at most once per version and process. With
+    shared_timeout the built value is also stored in the shared cache, so
+    only the first worker of a version pays for the build; leave it unset for
+    values that are cheap to rebuild or cannot be pickled.
+    """
+
+    def __init__(self, name, build, shared_timeout=None):
+        self.name = name
+        self.build = build
+        self.shared_timeout = shared_timeout
+        self.version_key = f"{name}:version"
+        self._version = None
+        self._value = None
+
+    def version(self):
+        version = cache.get(self.version_key)
+        if version is None:
+            cache.add(self.version_key, uuid.uuid4().hex, timeout=None)
+            version = cache.get(self.version_key)
+        return version
+
+    def invalidate(self):
+        cache.set(self.version_key, uuid.uuid4().hex, timeout=None)
+
+    def get(self):
+        """Return (version, value)."""
+        version = self.version()
+        if self._version == version:
+            return version, self._value
+
+        if self.shared_timeout is not None:
+            value_key = f"{self.name}:value:{version}"
+            value = cache.get(value_key)
+            if value is None:
+                value = self.build()
+                cache.set(value_key, value, timeout=self.shared_timeout)
+        else:
+            value = self.build()
+
+        self._version = version
+        self._value = value
+        return version, value
+
+    def invalidate_on_change(self, *models):
+        for model in models:
+            label = f"{self.name}_{model.__name__}"
+            post_save.connect(self._changed, sender=model, dispatch_uid=f"{label}_save")
+            post_delete.connect(self._changed, sender=model, dispatch_uid=f"{label}_delete")
+            data_synced.connect(self._changed, sender=model, dispatch_uid=f"{label}_sync")
+
+    def _changed(self, sender, **kwargs):
+        self.invalidate()
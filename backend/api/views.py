@@ -1,41 +1,57 @@
+import json
 import logging
+import math
+import time
 from decimal import Decimal, ROUND_HALF_UP
 from django.shortcuts import get_object_or_404
 from rest_framework import status, viewsets
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.decorators import action, api_view, authentication_classes, permission_classes
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination, PageNumberPagination
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-import pandas as pd
 from rest_framework.views import APIView
-from django.http import HttpResponse
-from django.db.models import Sum, Count, Avg
+from django.db import transaction
+from django.db.models import F, Q, Sum
 from django.db.models.functions import TruncMonth
 from datetime import datetime, timedelta
 
-from .models import (Campaign, Keyword, Location, proximity, CampaignVideo,
-                     proximity_store, target_type, weather, UserType, Age, CarrierData,
-    Environment,
-    Exchange,
-    Language,
-    Impression,
-    DevicePrice,
-    Device,
-    DistinctInterest,Bidding_detail, BrandSafety,
-    BuyType,
-    Viewability,tag_tracker,CampaignFile, CampaignImage, UserWallet)
+from .models import (Campaign, Keyword, proximity, CampaignVideo,
+                     proximity_store, target_type, weather,
+    Bidding_detail,
+    tag_tracker,CampaignFile, CampaignImage, UserWallet,
+    UserDailyMetrics, UserSegmentMetrics)
 from .serializers import (CampaignCreateUpdateSerializer,
                           UserWalletUpdateSerializer,
                           CampaignImageSerializer, CampaignSerializer,
-                          KeywordSerializer, LocationSerializer,
+                          KeywordSerializer,
                           ProximitySerializer, ProximityStoreSerializer,
-                          WeatherSerializer, target_typeSerializer,BiddingDetailsSerializer,CampaignVideoSerializer,tag_trackerSerializer)
+                          WeatherSerializer, TargetTypeImportSerializer,BiddingDetailsSerializer,CampaignVideoSerializer,tag_trackerSerializer)
 
-from django.core.files.base import File
+from django.core.exceptions import ValidationError
 from rest_framework import viewsets, status
 from rest_framework.parsers import MultiPartParser, FormParser
 from .models import Creative
 from .serializers import CreativeSerializer
+from .delivery import ReportError, aggregate_report, delivery_series, store_delivery
+from .bulk_sync import insert_missing
+from .interests import interest_response
+from .geo import location_counts, points_in_bbox, points_within
+from .jobs import (enqueue_campaign_file, enqueue_campaign_files, enqueue_geo_points, enqueue_keyword_list,
+                   enqueue_media_processing)
+from .keywords import contains as list_contains, overlap as list_overlap, page_terms
+from .locations import get_index as get_location_index
+from .pacing import pace, resume_paused
+from .permissions import IsProductManager, is_pm_request
+from .profile import UserPagination
+from .reach import get_estimator
+from .reports import campaigns_without_files
+from .rollups import summarize_segments, update_campaign_metrics
+from .search import search_campaigns
+from .tokens import TokenUserAuthentication
+from .wallet import IdempotencyConflict, InsufficientFunds, WalletError, credit as wallet_credit, debit as wallet_debit
+from .uploads import UploadError, abort_upload, complete_upload, start_upload, upload_token_target
+from . import taxonomy
 
 
 logger = logging.getLogger(__name__)
@@ -59,14 +75,21 @@ def error_response(message, status_code=status.HTTP_400_BAD_REQUEST):
     )
 
 @api_view(['POST'])
-def login_page(request):
-    payload = request.data
-    audience_list = payload['data'][0]
-    for item in audience_list:
-        category = item.get("category")
-        subcategory = item.get("subcategory")
-        target_type.objects.create(category=category,subcategory=subcategory)
-    return Response({"message": "Target type created successfully"}, status=status.HTTP_200_OK)
+@permission_classes([IsProductManager])
+def target_type_import(request):
+    """
+    Bulk import of interest target types, deduplicated on (category,
+    subcategory). Accepts {"data": [...]} or the interest.json shape
+    {"data": [[...]]}; re-running an import only adds what is missing.
+    """
+    serializer = TargetTypeImportSerializer(data=request.data)
+    if not serializer.is_valid():
+        return error_response(serializer.errors)
+
+    started = time.perf_counter()
+    result = insert_missing(target_type, serializer.validated_data['data'], ('category', 'subcategory'))
+    result['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    return success_response("Target types imported successfully", result)
 
 
 @api_view(['GET'])
@@ -79,13 +102,13 @@ from django.contrib.auth.models import User
 class CampaignViewSet(viewsets.ViewSet):
     def list(self, request):
         """List all campaigns with related data."""
-        queryset = Campaign.objects.all()
+        queryset = Campaign.objects.for_serializer()
         serializer = CampaignSerializer(queryset, many=True)
         return success_response("Campaign List", serializer.data)
 
     def retrieve(self, request, pk=None):
         """Retrieve a campaign by ID."""
-        campaign = get_object_or_404(Campaign, pk=pk)
+        campaign = get_object_or_404(Campaign.objects.for_serializer(), pk=pk)
         serializer = CampaignSerializer(campaign)
         return success_response("Campaign List", serializer.data)
 
@@ -104,33 +127,20 @@ class CampaignViewSet(viewsets.ViewSet):
                 else:
                     user = request.user
 
-            campaign = serializer.save(user=user)
-            try:
-                serializer_data = CampaignSerializer(campaign).data
-                excel_data = serializer_data_to_excel(serializer_data)
-                excel_data.seek(0) 
-                file_name = f"campaign_{campaign.id}.xlsx"
-                django_file = File(excel_data, name=file_name)
-                campaign_file = CampaignFile.objects.create(
-                    campaign=campaign,
-                    file=django_file
-                )
-                response_data = serializer.data
-                response_data['file_url'] = campaign_file.file.url
-                return success_response(
-                    "Campaign Successfully created with file", 
-                    response_data
-                )
-            except Exception as e:
-                logger.error(f"Error creating campaign file: {str(e)}")
-                # Delete the campaign if file creation fails
-                campaign.delete()
-                return error_response("Failed to create campaign file")
+            campaign = serializer.save(user=user, file_status='pending')
+            # The delivery workbook is generated by the job worker (see api.jobs).
+            enqueue_campaign_file(campaign.id)
+            response_data = serializer.data
+            response_data['file_url'] = None
+            return success_response(
+                "Campaign Successfully created", 
+                response_data
+            )
         return error_response(serializer.errors)
 
     def update(self, request, pk=None):
         """Update an existing campaign."""
-        campaign = get_object_or_404(Campaign, pk=pk)
+        campaign = get_object_or_404(Campaign.objects.for_pk_serializer(), pk=pk)
         serializer = CampaignCreateUpdateSerializer(
             campaign, data=request.data, partial=False
         )
@@ -141,7 +151,7 @@ class CampaignViewSet(viewsets.ViewSet):
 
     def partial_update(self, request, pk=None):
         """Partially update a campaign."""
-        campaign = get_object_or_404(Campaign, pk=pk)
+        campaign = get_object_or_404(Campaign.objects.for_pk_serializer(), pk=pk)
         serializer = CampaignCreateUpdateSerializer(
             campaign, data=request.data, partial=True
         )
@@ -160,21 +170,77 @@ class CampaignImageViewSet(viewsets.ModelViewSet):
     queryset = CampaignImage.objects.all()
     serializer_class = CampaignImageSerializer
 
+    def perform_create(self, serializer):
+        enqueue_media_processing(serializer.save())
+
 class CampaignVideoViewSet(viewsets.ModelViewSet):
     queryset = CampaignVideo.objects.all()
     serializer_class = CampaignVideoSerializer
 
+    def perform_create(self, serializer):
+        enqueue_media_processing(serializer.save())
+
 class BiddingDetailsViewSet(viewsets.ModelViewSet):
     queryset = Bidding_detail.objects.all()
     serializer_class = BiddingDetailsSerializer
 
-class ProximityStoreViewSet(viewsets.ModelViewSet):
+class GeoPointsMixin:
+    """Parses uploads into GeoPoint rows and serves radius, bounding-box and per-Location lookups (see api.geo)."""
+    geo_source = None
+
+    def perform_create(self, serializer):
+        enqueue_geo_points(serializer.save())
+
+    def perform_update(self, serializer):
+        enqueue_geo_points(serializer.save())
+
+    @action(detail=True, methods=["get"])
+    def points(self, request, pk=None):
+        """?lat=&lng=&radius_km= for a radius search, or ?min_lat=&max_lat=&min_lng=&max_lng= for a box."""
+        instance = self.get_object()
+        params = request.query_params
+
+        def number(name):
+            value = float(params[name])
+            if not math.isfinite(value):
+                raise ValueError(f"{name} must be a finite number.")
+            return value
+
+        try:
+            if "radius_km" in params:
+                data = points_within(
+                    self.geo_source, instance.pk, number("lat"), number("lng"), number("radius_km"),
+                )
+            else:
+                data = list(points_in_bbox(
+                    self.geo_source, instance.pk,
+                    number("min_lat"), number("max_lat"), number("min_lng"), number("max_lng"),
+                )[:1000])
+        except KeyError:
+            return error_response("Pass lat, lng and radius_km, or min_lat, max_lat, min_lng and max_lng")
+        except ValueError as e:
+            return error_response(f"Invalid coordinates: {e}")
+        return success_response("Points fetched", data)
+
+    @action(detail=True, methods=["get"], url_path="location-counts")
+    def location_counts(self, request, pk=None):
+        """Points per Location (?location=1,2 to restrict), matched on the upload's city column."""
+        instance = self.get_object()
+        try:
+            location_ids = [int(value) for value in _query_list(request, "location")]
+        except ValueError:
+            return error_response("location must be a list of integer ids")
+        return success_response("Location counts fetched", location_counts(self.geo_source, instance.pk, location_ids))
+
+class ProximityStoreViewSet(GeoPointsMixin, viewsets.ModelViewSet):
     queryset = proximity_store.objects.all()
     serializer_class = ProximityStoreSerializer
+    geo_source = "proximity_store"
 
-class ProximityViewSet(viewsets.ModelViewSet):
+class ProximityViewSet(GeoPointsMixin, viewsets.ModelViewSet):
     queryset = proximity.objects.all()
     serializer_class = ProximitySerializer
+    geo_source = "proximity"
 
 class WeatherViewSet(viewsets.ModelViewSet):
     queryset = weather.objects.all()
@@ -188,199 +254,283 @@ class KeywordViewSet(viewsets.ModelViewSet):
     queryset = Keyword.objects.all()
     serializer_class = KeywordSerializer
 
+    def perform_create(self, serializer):
+        enqueue_keyword_list(serializer.save())
+
+    def perform_update(self, serializer):
+        enqueue_keyword_list(serializer.save())
+
+    def _page_params(self, request):
+        return request.query_params.get("after"), min(int(request.query_params.get("limit", 100)), 1000)
+
+    @action(detail=True, methods=["get"])
+    def terms(self, request, pk=None):
+        """Parsed terms in sorted order; pass the last term back as ?after= for the next page."""
+        keyword = self.get_object()
+        try:
+            after, limit = self._page_params(request)
+        except ValueError:
+            return error_response("limit must be an integer")
+        terms = page_terms(keyword.pk, after, limit)
+        return success_response("Keyword terms fetched", {
+            "term_count": keyword.term_count,
+            "terms": terms,
+            "next": terms[-1] if len(terms) == limit else None,
+        })
+
+    @action(detail=True, methods=["post"])
+    def contains(self, request, pk=None):
+        """Which of the posted terms are in the list."""
+        keyword = self.get_object()
+        terms = request.data.get("terms") or []
+        if not isinstance(terms, list):
+            return error_response("terms must be a list")
+        return success_response("Keyword membership checked", sorted(list_contains(keyword.pk, terms)))
+
+    @action(detail=True, methods=["get"])
+    def overlap(self, request, pk=None):
+        """Terms shared with the list given as ?with=<id>, keyset-paged like terms."""
+        keyword = self.get_object()
+        try:
+            other = get_object_or_404(Keyword, pk=int(request.query_params.get("with", "")))
+            after, limit = self._page_params(request)
+        except ValueError:
+            return error_response("with and limit must be integers")
+        result = list_overlap(keyword.pk, other.pk, after, limit)
+        result["next"] = result["terms"][-1] if len(result["terms"]) == limit else None
+        return success_response("Keyword overlap fetched", result)
+
 class CampaignPagination(PageNumberPagination):
     page_size = 10  # Set default page size
     page_size_query_param = "page_size"  # Allow the user to specify the page size
     max_page_size = 100
 
+
+class CampaignCursorPagination(CursorPagination):
+    """
+    Keyset pagination over (updated_at, id) with opaque cursors.
+    Skips the COUNT(*) and OFFSET scans of CampaignPagination, so deep pages
+    cost the same as the first one.
+
+    DRF's CursorPagination keys only on the first ordering field and skips
+    ties with an offset; here the cursor holds every ordering field, so rows
+    sharing an updated_at are neither repeated nor skipped. A campaign saved
+    while a client pages moves to the front and is not seen again.
+    """
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = ("-updated_at", "-id")
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor.reverse)
+        position = None
+        if cursor and cursor.position is not None:
+            try:
+                position = json.loads(cursor.position)
+            except ValueError:
+                raise NotFound(self.invalid_cursor_message)
+            if not isinstance(position, list) or len(position) != len(self.ordering):
+                raise NotFound(self.invalid_cursor_message)
+
+        ordering = [_flip(field) for field in self.ordering] if reverse else list(self.ordering)
+        queryset = queryset.order_by(*ordering)
+        try:
+            if position is not None:
+                queryset = queryset.filter(_after(ordering, position))
+            results = list(queryset[:self.page_size + 1])
+        except (ValidationError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()
+        # Coming back from a later page there is always a next one, and vice versa.
+        self.has_next = has_more if not reverse else True
+        self.has_previous = has_more if reverse else position is not None
+        return self.page
+
+    def _position(self, instance):
+        return json.dumps([str(getattr(instance, field.lstrip("-"))) for field in self.ordering])
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=self._position(self.page[-1])))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=self._position(self.page[0])))
+
+
+def _flip(field):
+    return field[1:] if field.startswith("-") else f"-{field}"
+
+
+def _after(ordering, position):
+    """Rows after position in ordering: (a, b) > (x, y) is a > x OR (a = x AND b > y)."""
+    condition = Q()
+    equal = {}
+    for field, value in zip(ordering, position):
+        name = field.lstrip("-")
+        lookup = "lt" if field.startswith("-") else "gt"
+        condition |= Q(**equal, **{f"{name}__{lookup}": value})
+        equal[name] = value
+    return condition
+
+
+class CreativeCursorPagination(CampaignCursorPagination):
+    ordering = ("-created_at", "-id")
+
+
+def get_list_paginator(request, cursor_pagination_class):
+    """
+    Pick the paginator for a listing endpoint. Clients opt into keyset
+    pagination (and out of the total count) with ?pagination=cursor or by
+    following a cursor link; page numbers stay the default.
+    """
+    params = request.query_params
+    if params.get("pagination") == "cursor" or "cursor" in params:
+        return cursor_pagination_class()
+    return CampaignPagination()
+
+def _lookup_response(data):
+    return success_response("Data succcessfully fetched", data)
+
 @api_view(["GET"])
 def age_api(request):
-    age_queryset = Age.objects.all()
-    data = []
-    for age in age_queryset:
-        data.append({"id": age.id,"value": age.age , "label" : age.label})
-    return success_response("Data succcessfully fetched", data)
+    return taxonomy.taxonomy_response(request, "age", _lookup_response)
 
 @api_view(["GET"])
 def brandSafety_api(request):
-    age_queryset = BrandSafety.objects.all()
-    data = []
-    for age in age_queryset:
-        data.append({"id": age.id, "value": int(age.value) , "label" : age.label})
-    return success_response("Data succcessfully fetched", data)
+    return taxonomy.taxonomy_response(request, "brandSafety", _lookup_response)
 
 @api_view(["GET"])
 def Viewability_api(request):
-    age_queryset = Viewability.objects.all()
-    data = []
-    for age in age_queryset:
-        data.append({"id": age.id, "value": int(age.value) , "label" : age.label})
-    return success_response("Data succcessfully fetched", data)
+    return taxonomy.taxonomy_response(request, "viewability", _lookup_response)
 
 @api_view(["GET"])
 def BuyType_api(request):
-    age_queryset = BuyType.objects.all()
-    data = []
-    for age in age_queryset:
-        data.append({"id": age.id, "value": age.value , "label" : age.label})
-    return success_response("Data succcessfully fetched", data)
+    return taxonomy.taxonomy_response(request, "buyType", _lookup_response)
 
 @api_view(["GET"])
 def DevicePrice_api(request):
-    age_queryset = DevicePrice.objects.all()
-    data = []
-    for age in age_queryset:
-        data.append({"id": age.id,"value": age.price, "label" : age.label})
-    return success_response("Data succcessfully fetched", data)
+    return taxonomy.taxonomy_response(request, "devicePrice", _lookup_response)
 
 @api_view(["GET"])
 def Device_api(request):
-    age_queryset = Device.objects.all()
-    data = []
-    for age in age_queryset:
-        data.append({"id": age.id, "value": age.device,  "label" : age.label})
-    return success_response("Data succcessfully fetched", data)
+    return taxonomy.taxonomy_response(request, "device", _lookup_response)
 
 @api_view(["GET"])
 def DistinctInterest_api(request):
-    age_queryset = DistinctInterest.objects.all()
-    data = []
-    for age in age_queryset:
-        data.append({"id": age.id,"value": age.interest,  "label" : age.label})
-    return success_response("Data succcessfully fetched", data)
+    return taxonomy.taxonomy_response(request, "distinctInterest", _lookup_response)
 
 @api_view(["GET"])
 def CarrierData_api(request):
-    age_queryset = CarrierData.objects.all()
-    data = []
-    for age in age_queryset:
-        data.append({"id": age.id,"value": age.carrier,  "label" : age.label})
-    return success_response("Data succcessfully fetched", data)
+    return taxonomy.taxonomy_response(request, "carrierData", _lookup_response)
 
 @api_view(["GET"])
 def Environment_api(request):
-    age_queryset = Environment.objects.all()
-    data = []
-    for age in age_queryset:
-        data.append({"id": age.id,"value": age.env, "label" : age.label})
-    return success_response("Data succcessfully fetched", data)
+    return taxonomy.taxonomy_response(request, "environment", _lookup_response)
 
 @api_view(["GET"])
 def Exchange_api(request):
-    age_queryset = Exchange.objects.all()
-    data = []
-    for age in age_queryset:
-        data.append({"id": age.id,"value": age.exchange, "label" : age.label})
-    return success_response("Data succcessfully fetched", data)
+    return taxonomy.taxonomy_response(request, "exchange", _lookup_response)
 
 @api_view(["GET"])
 def Language_api(request):
-    age_queryset = Language.objects.all()
-    data = []
-    for age in age_queryset:
-        data.append({"id": age.id,"value": age.language , "iso_code" : age.iso_code ,  "label" : age.label})
-    return success_response("Data succcessfully fetched", data)
+    return taxonomy.taxonomy_response(request, "language", _lookup_response)
 
 @api_view(["GET"])
 def Impression_api(request):
-    age_queryset = Impression.objects.all()
-    data = []
-    for age in age_queryset:
-        data = age.impression
-    return Response(data)
-
-import io
-import pandas as pd
-from rest_framework.views import APIView
-from rest_framework.response import Response
-from rest_framework import status
-from django.http import HttpResponse
+    return taxonomy.taxonomy_response(request, "impression", Response)
 
-from .models import Campaign
-from .serializers import CampaignSerializer
+REACH_DIMENSIONS = ("age", "device", "environment", "carrier")
 
-from io import BytesIO
 
-def serializer_data_to_excel(serializer_data):
-    # If serializer_data is a dict (for a single record), wrap it in a list.
-    if isinstance(serializer_data, dict):
-        data = [serializer_data]
-    else:
-        data = serializer_data  # Assuming it's already a list of dicts
+def _query_list(request, name):
+    """Accept both ?age=a&age=b and ?age=a,b."""
+    values = []
+    for value in request.query_params.getlist(name):
+        values.extend(part for part in value.split(",") if part.strip())
+    return values
 
-    # Create a DataFrame from the data.
-    df = pd.DataFrame(data)
-    
-    columns_to_remove = ['creative','images', 'keywords', 'proximity_store', 'proximity', 'weather', 'target_type', 'location', 'video', 'tag_tracker','age','carrier_data','environment','exchange','language','impression','device_price','device','created_at','updated_at','carrier','landing_page','reports_url','start_time','end_time','status','day_part','objective','user','campaign_files','total_budget','viewability','brand_safety','buy_type','unit_rate']
 
-    # Drop these columns if they exist (ignore if they don't)
-    df.drop(columns=columns_to_remove, inplace=True, errors='ignore')
-    df.insert(0, 'date', pd.NaT)
-
-    # Convert column headers to uppercase
-    df.columns = [col.upper() for col in df.columns]
+@api_view(["GET"])
+def reach_estimate(request):
+    """
+    Estimated reachable audience for a wizard selection, e.g.
+    /reach-estimate/?location=1,2&age=25-34&environment=app
+    """
+    try:
+        location_ids = [int(value) for value in _query_list(request, "location")]
+    except ValueError:
+        return error_response("location must be a list of integer ids")
+    segments = {dimension: _query_list(request, dimension) for dimension in REACH_DIMENSIONS}
+    return success_response("Reach estimated", get_estimator().estimate(location_ids, segments))
 
-    # Convert DataFrame to an Excel file in memory.
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        df.to_excel(writer, index=False)
-    output.seek(0)
-    return output
+@api_view(["GET"])
+def taxonomies_api(request):
+    """All targeting lookups in one round trip, keyed like the standalone endpoints."""
+    return taxonomy.bundle_response(request, _lookup_response)
 
 class FileGetView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request, *args, **kwargs):
-        # Query all Campaign objects for the current user
-        campaigns = Campaign.objects.all()
-        
-        # Prepare a list to hold the response data
-        response_data = []
-
-        # Process each campaign individually.
-        for campaign in campaigns:
-            # Check if a CampaignFile already exists for this campaign.
-            campaign_file_qs = CampaignFile.objects.filter(campaign=campaign)
-            if campaign_file_qs.exists():
-                # If a file exists, get it (you can choose to get the first or handle multiple)
-                campaign_file = campaign_file_qs.first()
-                response_data.append({
-                    'campaign_id': campaign.id,
-                    'file_url': campaign_file.file.url,  # You can return the URL or any file data
-                    'status': 'exists'
-                })
-            else:
-                serializer = CampaignSerializer(campaign)
-                serializer_data = serializer.data
-
-                excel_data = serializer_data_to_excel(serializer_data)
-                excel_data.seek(0)
-
-                file_name = f"campaign_{campaign.id}.xlsx"
-                django_file = File(excel_data, name=file_name)
-                
-                campaign_file = CampaignFile.objects.create(campaign=campaign, file=django_file)
-                
-                response_data.append({
-                    'campaign_id': campaign.id,
-                    'file_url': campaign_file.file.url,
-                    'status': 'created'
-                })
-        
+        """
+        List the workbook of every campaign. Campaigns without one are queued
+        for batch generation by the job worker and reported as 'queued'.
+        """
+        file_storage = CampaignFile._meta.get_field('file').storage
+
+        # One query for the existing files (first file per campaign wins).
+        existing = {}
+        for campaign_id, file_name in CampaignFile.objects.order_by('id').values_list('campaign_id', 'file'):
+            existing.setdefault(campaign_id, file_name)
+
+        # One query for the campaigns still missing a file. Those without a live
+        # job are queued, including pending ones whose job was lost or failed.
+        missing = list(campaigns_without_files().values_list('id', flat=True))
+        enqueue_campaign_files(missing)
+
+        response_data = [
+            {
+                'campaign_id': campaign_id,
+                'file_url': file_storage.url(file_name),
+                'status': 'exists'
+            }
+            for campaign_id, file_name in existing.items()
+        ]
+        response_data += [
+            {
+                'campaign_id': campaign_id,
+                'file_url': None,
+                'status': 'queued'
+            }
+            for campaign_id in missing
+        ]
         return Response(response_data, status=status.HTTP_200_OK)
     
     def post(self, request, *args, **kwargs):
         """
-        POST: Upload an Excel file (.xlsx) to update a particular Campaign record.
+        POST: Upload an Excel (.xlsx) or CSV report to update a particular Campaign record.
         The campaign id should be provided in the URL (e.g. /campaign/<int:campaign_id>/upload/).
         
         The Excel file (Sheet1) is expected to contain columns like:
           id, name, total_budget, viewability, brand_safety, impressions,
           clicks, ctr, views, vtr, buy_type, unit_rate
           
-        For the campaign specified, the view aggregates the columns:
-          - viewability, impressions, clicks, ctr, views, and vtr
-        and then updates the Campaign model with these totals.
+        For the campaign specified, the view streams the report row by row
+        (see api.delivery), totals impressions, clicks, views and spend, and
+        then updates the Campaign model with these totals.
         """
         # 1. Get the campaign id from the URL
         campaign_id = self.kwargs.get('campaign_id')
@@ -401,110 +551,54 @@ class FileGetView(APIView):
             return Response({'error': 'No file was uploaded.'},
                             status=status.HTTP_400_BAD_REQUEST)
         
-        # 4. Read the Excel file (from sheet 1)
+        # 4. Stream the report (CSV or first Excel sheet) and total the rows for this campaign per day
         try:
-            df = pd.read_excel(excel_file, sheet_name=0)
-        except Exception as e:
-            return Response({'error': f'Failed to read Excel file: {str(e)}'},
+            report = aggregate_report(excel_file, campaign_id)
+        except ReportError as e:
+            return Response({'error': str(e)},
                             status=status.HTTP_400_BAD_REQUEST)
-        
-        
 
-        # 5. Verify that the Excel file contains a column for the campaign ID.
-        if 'id' not in df.columns:
-            return Response({'error': 'Excel file must contain a column named "id".'},
-                            status=status.HTTP_400_BAD_REQUEST)
-        
-        # Filter the DataFrame to include only rows for the provided campaign ID.
-        df = df[df['id'] == campaign_id]
-        print(df)
-        if df.empty:
-            return Response({'error': 'No rows in Excel file match the provided campaign id.'},
-                            status=status.HTTP_400_BAD_REQUEST)
-        
-        # Print column names to debug
-        print("Excel columns:", df.columns.tolist())
-        
-        # Map column names - adjust these based on your actual Excel column names
-        # The exact mapping will depend on your actual Excel column structure
-        impressions_col = 'impressions'
-        if impressions_col not in df.columns:
-            # Try alternate column names that might contain impression data
-            if 'Impressions' in df.columns:
-                impressions_col = 'Impressions'
-            # Add more alternatives if needed
-        
-        clicks_col = 'clicks'
-        if clicks_col not in df.columns:
-            if 'Clicks' in df.columns:
-                clicks_col = 'Clicks'
-            # Try numerical column index if column has no header
-            elif len(df.columns) > 4:  # Adjust based on your data structure
-                clicks_col = df.columns[4]
-        
-        views_col = 'views'
-        if views_col not in df.columns:
-            if 'Views' in df.columns:
-                views_col = 'Views'
-            # Try numerical column index if needed
+        with transaction.atomic():
+            # 5. Upsert the daily series and derive the campaign's lifetime totals from it
+            totals = store_delivery(campaign_id, report['days'])
+            total_impressions = totals['impressions']
+            total_clicks = totals['clicks']
+            total_views = totals['views']
+            total_spends = totals['spend']
+
+            # Calculate CTR and VTR correctly
+            total_ctr = Decimal('0.00')
+            total_vtr = Decimal('0.00')
         
-        spends_col = 'spends'
-        if spends_col not in df.columns:
-            if 'Spends' in df.columns:
-                spends_col = 'Spends'
-            elif 'payment' in df.columns:
-                spends_col = 'payment'
-            elif 'payments' in df.columns:
-                spends_col = 'payments'    
-            elif 'spend' in df.columns:
-                spends_col = 'spend'    
-            elif 'Spend' in df.columns:
-                spends_col = 'Spend'
-
-        # Get totals using the mapped column names
-        total_impressions = df[impressions_col].sum() if impressions_col in df.columns else 0
-        total_clicks = df[clicks_col].sum() if clicks_col in df.columns else 0
-        total_views = df[views_col].sum() if views_col in df.columns else 0
-        total_spends = round(df[spends_col].sum(), 2) if spends_col in df.columns else 0
-        print(f"Using columns: {impressions_col}, {clicks_col}, {views_col}")
-        print(total_impressions)
-        print(total_clicks)
-        print(total_views)
-        total_impressions = int(total_impressions)
-        total_clicks = int(total_clicks)
-        total_views = int(total_views)
-
-        # Calculate CTR and VTR correctly
-        total_ctr = Decimal('0.00')
-        total_vtr = Decimal('0.00')
+            if total_impressions > 0:
+                # CTR = (Total Clicks / Total Impressions) * 100
+                total_ctr = (Decimal(total_clicks) / Decimal(total_impressions)) * Decimal('100.0')
+                # VTR = (Total Views / Total Impressions) * 100
+                total_vtr = (Decimal(total_views) / Decimal(total_impressions)) * Decimal('100.0')
         
-        if total_impressions > 0:
-            # CTR = (Total Clicks / Total Impressions) * 100
-            total_ctr = (Decimal(total_clicks) / Decimal(total_impressions)) * Decimal('100.0')
-            # VTR = (Total Views / Total Impressions) * 100
-            total_vtr = (Decimal(total_views) / Decimal(total_impressions)) * Decimal('100.0')
-        
-        # Format decimal fields to 2 decimal places
-        total_ctr = total_ctr.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-        total_vtr = total_vtr.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-        # 7. Update the Campaign record with the aggregated totals.
-        campaign= Campaign.objects.filter(id=campaign_id).update(
-            impressions=total_impressions,
-            clicks=total_clicks,
-            ctr=total_ctr,
-            views=total_views,
-            vtr=total_vtr,
-            payment=total_spends,
-        )
-        
-        # Get the campaign object for use with the CampaignFile
-        campaign_obj = Campaign.objects.get(id=campaign_id)
+            # Format decimal fields to 2 decimal places
+            total_ctr = total_ctr.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+            total_vtr = total_vtr.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+            # 6. Update the Campaign record with the aggregated totals.
+            update_campaign_metrics(
+                campaign_id,
+                impressions=total_impressions,
+                clicks=total_clicks,
+                ctr=total_ctr,
+                views=total_views,
+                vtr=total_vtr,
+                payment=total_spends,
+            )
+            # 7. Debit the new spend from the owner's wallet; completes or pauses the campaign if due
+            pace([campaign_id])
         
+        # Store the uploaded report as the campaign's file
+        excel_file.seek(0)
         campaign_file, created = CampaignFile.objects.update_or_create(
-            campaign=campaign_obj,
+            campaign=campaign,
             defaults={'file': excel_file},
         )
-        processed_count = len(df)  # Number of rows aggregated
+        processed_count = report['rows']  # Number of rows aggregated
         
         return Response(
             {'message': f'Successfully processed {processed_count} Excel rows and updated Campaign {campaign_id}.'},
@@ -512,34 +606,22 @@ class FileGetView(APIView):
         )
     
     
-from django.db.models import Q
 @api_view(["GET"])
+@authentication_classes([TokenUserAuthentication])
 @permission_classes([IsAuthenticated])
 def fetch_user_campgain(request):
 
     query_param = request.query_params.get("query", None)
 
-    user_type_pm_values = UserType.objects.filter(user=request.user).values_list('user_type_pm', flat=True)
-
     if query_param:
-        query_values = [value.strip() for value in query_param.split(",")]
-        query = Q()
-        for value in query_values:
-            query |= (
-            Q(name__icontains=value) |
-            Q(status__icontains=value) |
-            Q(user__username__icontains=value) |
-            Q(user__email__icontains=value) |
-            Q(user__first_name__icontains=value) |
-            Q(user__last_name__icontains=value)
-        )
-        queryset = Campaign.objects.filter(query).order_by("-updated_at")
-    elif user_type_pm_values.first() is True:
+        queryset = search_campaigns(Campaign.objects.all(), query_param)
+    elif is_pm_request(request):
         queryset = Campaign.objects.all().order_by("-updated_at")
     else:
-        queryset = Campaign.objects.filter(user=request.user).order_by("-updated_at")
+        queryset = Campaign.objects.filter(user_id=request.user.id).order_by("-updated_at")
+    queryset = queryset.for_serializer()
 
-    paginator = CampaignPagination()
+    paginator = get_list_paginator(request, CampaignCursorPagination)
     paginated_queryset = paginator.paginate_queryset(queryset, request)
     serializer = CampaignSerializer(paginated_queryset, many=True)
     return paginator.get_paginated_response(
@@ -553,51 +635,84 @@ def fetch_user_campgain(request):
 
 @api_view(["GET"])
 def location(request):
-    queryset = Location.objects.all()
-    serializer = LocationSerializer(queryset, many=True)
-    return success_response("Data succcessfully fetched", serializer.data)
+    """
+    All locations, optionally narrowed by ?tier=Tier-I,Tier-II. With ?q=
+    it becomes a ranked prefix typeahead over city names (?limit=, max 100).
+    Served from the in-memory location index.
+    """
+    index = get_location_index()
+    tiers = set(_query_list(request, "tier"))
+    query = request.query_params.get("q")
+    if query is None:
+        return success_response("Data succcessfully fetched", index.filter(tiers))
+
+    try:
+        limit = min(int(request.query_params.get("limit", 20)), 100)
+    except ValueError:
+        return error_response("limit must be an integer")
+    return success_response("Data succcessfully fetched", index.search(query, tiers, limit))
+
+
+@api_view(["GET"])
+def location_tree(request):
+    """
+    One level of the country -> state -> city tree per call:
+    no params lists countries, ?country= its states, ?country=&state= its
+    cities. ?tier= filters every level.
+    """
+    country = request.query_params.get("country")
+    state = request.query_params.get("state")
+    if state is not None and country is None:
+        return error_response("state requires country")
+    tiers = set(_query_list(request, "tier"))
+    return success_response("Data succcessfully fetched", get_location_index().children(country, state, tiers))
 
 
 @api_view(["GET"])
 def target_type_view(request):
+    """
+    Interest taxonomy, served from the cached index in api.interests.
+
+    ?query=unique lists the distinct targeting types; ?query=a,b keeps the
+    given categories; ?search= matches a substring of the category or
+    subcategory. ?view=tree nests the result by category with counts and
+    ?view=counts returns only the per-category counts.
+    """
     query_param = request.query_params.get("query", None)
+    search = request.query_params.get("search")
+    view = request.query_params.get("view")
 
-    if query_param == "unique":
-        # Get distinct values of 'targeting_type'
-        queryset = target_type.objects.values("targeting_type").distinct()
-        return Response(
-            {
-                "message": "Unique targeting types fetched successfully",
-                "data": list(queryset),
-            }
-        )
-    elif query_param:
-        query_values = [value.strip() for value in query_param.split(",")]
-
-        # Filter the queryset for each value in the query_values list
-        queryset = target_type.objects.filter(category__in=query_values)
-        if queryset.exists():
-            serializer = target_typeSerializer(queryset, many=True)
+    def respond(index):
+        if query_param == "unique":
             return Response(
                 {
-                    "message": "Data successfully fetched for the given targeting_type",
-                    "data": serializer.data,
+                    "message": "Unique targeting types fetched successfully",
+                    "data": [{"targeting_type": value} for value in index.targeting_types],
                 }
             )
-        else:
+        if view == "counts":
+            return Response({"message": "Data successfully fetched", "data": index.counts()})
+
+        categories = [value.strip() for value in query_param.split(",")] if query_param else None
+        rows = index.filter(categories, search)
+        data = index.tree(rows) if view == "tree" else rows
+        if query_param and not rows:
             return Response(
                 {
                     "message": f"No results found for targeting_type: {query_param}",
                     "data": [],
                 }
             )
-    else:
-        # Default behavior: return all target_type objects if no query parameter
-        queryset = target_type.objects.all()
-        serializer = target_typeSerializer(queryset, many=True)
-        return Response(
-            {"message": "Data successfully fetched", "data": serializer.data}
-        )
+        if query_param:
+            return Response(
+                {
+                    "message": "Data successfully fetched for the given targeting_type",
+                    "data": data,
+                }
+            )
+        return Response({"message": "Data successfully fetched", "data": data})
+
+    return interest_response(request, respond)
 
 
 @api_view(["GET"])
@@ -649,7 +764,7 @@ class CreativeViewSet(viewsets.ModelViewSet):
             serializer = self.get_serializer(data=data)
             if serializer.is_valid():
                 creative = serializer.save(user=request.user)
-                # Process the creative synchronously for now
+                enqueue_media_processing(creative)
                 return success_response(
                     "Creative uploaded successfully", 
                     serializer.data, 
@@ -663,7 +778,7 @@ class CreativeViewSet(viewsets.ModelViewSet):
         """List all creatives with pagination."""
         
         queryset = self.get_queryset()
-        paginator = CampaignPagination()
+        paginator = get_list_paginator(request, CreativeCursorPagination)
         paginated_queryset = paginator.paginate_queryset(queryset, request)
         serializer = self.get_serializer(paginated_queryset, many=True)
         return paginator.get_paginated_response(
@@ -674,33 +789,109 @@ class CreativeViewSet(viewsets.ModelViewSet):
             }
         )
 
+UPLOAD_SERIALIZERS = {
+    "creative": CreativeSerializer,
+    "campaign_image": CampaignImageSerializer,
+    "campaign_video": CampaignVideoSerializer,
+    "keyword": KeywordSerializer,
+    "tag_tracker": tag_trackerSerializer,
+    "proximity_store": ProximityStoreSerializer,
+    "proximity": ProximitySerializer,
+    "weather": WeatherSerializer,
+}
+CREATIVE_UPLOAD_FIELDS = ("name", "creative_type", "description")
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def upload_start(request):
+    """
+    Presign a direct upload to S3. Body: target (see api.uploads.UPLOAD_TARGETS),
+    filename, size in bytes and optionally content_type and the file's sha256,
+    which lets already-stored files skip the upload.
+    """
+    try:
+        size = int(request.data.get('size', 0))
+    except (TypeError, ValueError):
+        return error_response("size must be an integer")
+    try:
+        data = start_upload(
+            request.user,
+            request.data.get('target'),
+            request.data.get('filename'),
+            size,
+            request.data.get('content_type', ''),
+            request.data.get('sha256'),
+        )
+    except UploadError as e:
+        return error_response(str(e))
+    return success_response("Upload started", data, status.HTTP_201_CREATED)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def upload_complete(request):
+    """
+    Record a finished direct upload. Body: token from upload_start, parts
+    ([{part_number, etag}]) for multipart uploads and, for creatives, name,
+    creative_type and description.
+    """
+    token = request.data.get('token', '')
+    fields = {}
+    try:
+        target = upload_token_target(request.user, token)
+        if target == "creative":
+            fields = {name: request.data.get(name) for name in CREATIVE_UPLOAD_FIELDS if request.data.get(name) is not None}
+            if not fields.get('name'):
+                return error_response("Creative name is required", status.HTTP_400_BAD_REQUEST)
+        instance = complete_upload(request.user, token, request.data.get('parts'), **fields)
+    except UploadError as e:
+        return error_response(str(e))
+    except ValidationError as e:
+        return error_response(e.message_dict)
+    serializer = UPLOAD_SERIALIZERS[target](instance, context={"request": request})
+    return success_response("Upload completed", serializer.data, status.HTTP_201_CREATED)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def upload_abort(request):
+    """Abandon a multipart upload so its parts are discarded."""
+    try:
+        abort_upload(request.user, request.data.get('token', ''))
+    except UploadError as e:
+        return error_response(str(e))
+    return success_response("Upload aborted")
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_campaign_performance(request):
     # Get last 6 months of data
     six_months_ago = datetime.now() - timedelta(days=180)
     
-    # Get performance data grouped by month
-    performance_data = Campaign.objects.filter(
+    # Get performance data grouped by month from the daily rollup
+    performance_data = UserDailyMetrics.objects.filter(
         user=request.user,
-        created_at__gte=six_months_ago
+        date__gte=six_months_ago.date()
     ).annotate(
-        month=TruncMonth('created_at')
+        month=TruncMonth('date')
     ).values('month').annotate(
-        impressions=Sum('impressions'),
-        clicks=Sum('clicks'),
-        views=Sum('views'),
-        spend=Sum('total_budget')
-    ).order_by('month')
+        total_impressions=Sum('impressions'),
+        total_clicks=Sum('clicks'),
+        total_views=Sum('views'),
+        spend=Sum('budget'),
+        campaign_count=Sum('campaigns')
+    ).filter(campaign_count__gt=0).order_by('month')
 
     # Format the data for the frontend
     formatted_data = []
     for item in performance_data:
         formatted_data.append({
             'month': item['month'].strftime('%b'),
-            'impressions': item['impressions'] or 0,
-            'clicks': item['clicks'] or 0,
-            'views': item['views'] or 0,
+            'impressions': item['total_impressions'] or 0,
+            'clicks': item['total_clicks'] or 0,
+            'views': item['total_views'] or 0,
             'spend': float(item['spend'] or 0)
         })
 
@@ -710,11 +901,11 @@ def get_campaign_performance(request):
 @permission_classes([IsAuthenticated])
 def get_campaign_status_distribution(request):
     # Get status distribution
-    status_data = Campaign.objects.filter(
+    status_data = UserSegmentMetrics.objects.filter(
         user=request.user
     ).values('status').annotate(
-        value=Count('id')
-    ).values('status', 'value')
+        value=Sum('campaigns')
+    ).filter(value__gt=0).values('status', 'value')
 
     # Format the data for the frontend
     formatted_data = []
@@ -730,11 +921,11 @@ def get_campaign_status_distribution(request):
 @permission_classes([IsAuthenticated])
 def get_campaign_type_distribution(request):
     # Get campaign type distribution
-    type_data = Campaign.objects.filter(
+    type_data = UserSegmentMetrics.objects.filter(
         user=request.user
     ).values('objective').annotate(
-        value=Count('id')
-    ).values('objective', 'value')
+        value=Sum('campaigns')
+    ).filter(value__gt=0).values('objective', 'value')
 
     # Format the data for the frontend
     formatted_data = []
@@ -753,121 +944,107 @@ def get_campaign_metrics(request):
     # Get last 6 months of data
     six_months_ago = datetime.now() - timedelta(days=180)
     
-    # Get metrics data grouped by month
-    metrics_data = Campaign.objects.filter(
+    # Get metrics data grouped by month from the daily rollup
+    metrics_data = UserDailyMetrics.objects.filter(
         user=request.user,
-        created_at__gte=six_months_ago
+        date__gte=six_months_ago.date()
     ).annotate(
-        month=TruncMonth('created_at')
+        month=TruncMonth('date')
     ).values('month').annotate(
-        impressions=Sum('impressions'),
-        clicks=Sum('clicks'),
-        views=Sum('views'),
-        ctr=Avg('ctr'),
-        vtr=Avg('vtr')
-    ).order_by('month')
-
-    # Format the data for the frontend
+        total_impressions=Sum('impressions'),
+        total_clicks=Sum('clicks'),
+        total_views=Sum('views'),
+        ctr_sum=Sum('ctr_total'),
+        vtr_sum=Sum('vtr_total'),
+        campaign_count=Sum('campaigns')
+    ).filter(campaign_count__gt=0).order_by('month')
+
+    # Format the data for the frontend; CTR/VTR are averaged per campaign
     formatted_data = []
     for item in metrics_data:
+        count = item['campaign_count']
         formatted_data.append({
             'month': item['month'].strftime('%b'),
-            'impressions': item['impressions'] or 0,
-            'clicks': item['clicks'] or 0,
-            'views': item['views'] or 0,
-            'ctr': float(item['ctr'] or 0),
-            'vtr': float(item['vtr'] or 0)
+            'impressions': item['total_impressions'] or 0,
+            'clicks': item['total_clicks'] or 0,
+            'views': item['total_views'] or 0,
+            'ctr': float(item['ctr_sum'] or 0) / count,
+            'vtr': float(item['vtr_sum'] or 0) / count
         })
 
     return Response(formatted_data)
 
 
-from django.db.models import Sum
+@api_view(['GET'])
+@authentication_classes([TokenUserAuthentication])
+@permission_classes([IsAuthenticated])
+def get_campaign_delivery(request):
+    """Daily delivery for the user's campaigns (all campaigns for PMs), optionally for one campaign."""
+    campaigns = Campaign.objects.all() if is_pm_request(request) else Campaign.objects.filter(user_id=request.user.id)
+
+    campaign_id = request.query_params.get('campaign_id')
+    try:
+        days = min(int(request.query_params.get('days', 30)), 366)
+        if campaign_id:
+            campaigns = campaigns.filter(id=int(campaign_id))
+    except ValueError:
+        return error_response("days and campaign_id must be integers")
+
+    since = (datetime.now() - timedelta(days=days)).date()
+    formatted_data = []
+    for item in delivery_series(campaigns, since):
+        formatted_data.append({
+            'date': item['date'].isoformat(),
+            'impressions': item['total_impressions'] or 0,
+            'clicks': item['total_clicks'] or 0,
+            'views': item['total_views'] or 0,
+            'spend': float(item['total_spend'] or 0)
+        })
+
+    return Response(formatted_data)
+
 
 @api_view(['GET'])
+@authentication_classes([TokenUserAuthentication])
 @permission_classes([IsAuthenticated])   
 def dashboard_tiles(request):
-    user_type_pm_values = UserType.objects.filter(user=request.user).values_list('user_type_pm', flat=True)
-    
-    if user_type_pm_values.first() is True:
-        campaigns = Campaign.objects.all()
-        campaign_count = campaigns.count()
-        total_data = campaigns.aggregate(
-            total_impressions=Sum('impressions'),
-            total_clicks=Sum('clicks'),
-            total_spend=Sum('payment')
-        )
-        total_data['campaign_count'] = campaign_count
-        total_data['total_spend'] = int(total_data['total_spend'])
+    if is_pm_request(request):
+        segments = UserSegmentMetrics.objects.all()
     else:    
-        campaigns = Campaign.objects.filter(user=request.user)
-        campaign_count = campaigns.count()
-        total_data = campaigns.aggregate(
-            total_impressions=Sum('impressions'),
-            total_clicks=Sum('clicks'),
-            total_spend=Sum('payment')
-        )
-        total_data['campaign_count'] = campaign_count
-        total_data['total_spend'] = int(total_data['total_spend'])
+        segments = UserSegmentMetrics.objects.filter(user_id=request.user.id)
+    totals = summarize_segments(segments)['totals']
+    total_data = {
+        'total_impressions': totals['total_impressions'],
+        'total_clicks': totals['total_clicks'],
+        'total_spend': int(totals['total_spend']),
+        'campaign_count': totals['campaign_count'],
+    }
     return Response(
         {"message": "message", "data": total_data, "success": True}, status=status.HTTP_200_OK
     )    
 
 
-from django.db.models import Count, Sum, F, ExpressionWrapper, DecimalField
-from rest_framework.decorators import api_view
-from rest_framework.response import Response
-from .models import Campaign, UserType
-
 @api_view(['GET'])
+@authentication_classes([TokenUserAuthentication])
 def dashboard_data(request):
-    # Check if user is PM
-    user_type_pm_values = UserType.objects.filter(user=request.user).values_list('user_type_pm', flat=True)
-    is_pm = user_type_pm_values.first() is True
+    # Check if user is PM (token claim, see api.tokens)
+    is_pm = is_pm_request(request)
 
-    # Use appropriate queryset
-    campaigns = Campaign.objects.all() if is_pm else Campaign.objects.filter(user=request.user)
+    # Use appropriate rollup rows and campaigns
+    segments = UserSegmentMetrics.objects.all() if is_pm else UserSegmentMetrics.objects.filter(user_id=request.user.id)
+    campaigns = Campaign.objects.all() if is_pm else Campaign.objects.filter(user_id=request.user.id)
 
-    # 1. Campaign Status Distribution
-    campaign_status_distribution = (
-        campaigns.values('status')
-        .annotate(count=Count('id'))
-    )
-
-    # 2. Objective Distribution
-    objective_distribution = (
-        campaigns.values('objective')
-        .annotate(count=Count('id'))
-    )
-
-    # 3. Spend by Buy Type
-    spend_by_buy_type = (
-        campaigns.annotate(
-            spend=ExpressionWrapper(
-                F('unit_rate') * F('impressions'),
-                output_field=DecimalField(max_digits=20, decimal_places=2)
-            )
-        )
-        .values('buy_type')
-        .annotate(total_spend=Sum('spend'))
-    )
-
-    # 4. Campaign Performance Summary
-    total_impressions = campaigns.aggregate(Sum('impressions'))['impressions__sum'] or 0
-    total_clicks = campaigns.aggregate(Sum('clicks'))['clicks__sum'] or 0
+    # 1-4. Distributions and performance summary from one grouped query
+    summary = summarize_segments(segments)
+    totals = summary['totals']
+    total_impressions = totals['total_impressions']
+    total_clicks = totals['total_clicks']
 
     campaign_performance_summary = {
         "total_impressions": total_impressions,
         "total_clicks": total_clicks,
-        "total_views": campaigns.aggregate(Sum('views'))['views__sum'] or 0,
-        "total_spend": campaigns.aggregate(
-            total_spend=Sum(
-                ExpressionWrapper(
-                    F('unit_rate') * F('impressions'),
-                    output_field=DecimalField(max_digits=20, decimal_places=2)
-                )
-            )
-        )['total_spend'] or 0,
+        "total_views": totals['total_views'],
+        "total_spend": totals['total_rate_spend'],
         "average_ctr": round((total_clicks / total_impressions) * 100, 2) if total_impressions > 0 else 0
     }
 
@@ -878,9 +1055,9 @@ def dashboard_data(request):
     )
 
     return Response({"message": "message", "data" : {
-        "campaign_status_distribution": list(campaign_status_distribution),
-        "objective_distribution": list(objective_distribution),
-        "spend_by_buy_type": list(spend_by_buy_type),
+        "campaign_status_distribution": summary['status_distribution'],
+        "objective_distribution": summary['objective_distribution'],
+        "spend_by_buy_type": summary['spend_by_buy_type'],
         "campaign_performance_summary": campaign_performance_summary,
         "top_campaigns_by_ctr": list(top_campaigns_by_ctr),
     },"success": True}, status=status.HTTP_200_OK)
@@ -894,65 +1071,64 @@ def get_user_amount(request):
     ) 
     
 @api_view(['GET'])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsProductManager])
 def get_all_users_with_wallet(request):
-    """Get all users with their wallet information"""
-    user_type_pm_values = UserType.objects.filter(user=request.user).values_list('user_type_pm', flat=True)
-    
-    if user_type_pm_values.first() is False:
-        return Response({"error": "Only admin users can access this endpoint"}, status=403)
+    """
+    Get all users with their wallet information, read in one joined query.
+    Pass ?page= (and optionally ?page_size=) for a paginated response.
+    """
+    users = (
+        User.objects.exclude(usertype__user_type_pm=True)
+        .order_by('id')
+        .values(
+            'id', 'email', 'first_name', 'last_name',
+            company_name=F('profile__company_name'),
+            wallet_amount=F('wallet__amount'),
+        )
+    )
 
-        
-    
-    users = User.objects.exclude(usertype__user_type_pm=True)
-    wallets = UserWallet.objects.filter(user__in=users)
-    
-    # Create a dictionary of user wallets for easy lookup
-    wallet_dict = {wallet.user_id: wallet for wallet in wallets}
-    
-    # Prepare the response data
-    data = []
-    for user in users:
-        wallet = wallet_dict.get(user.id)
-        data.append({
-            'id': user.id,
-            'email': user.email,
-            'first_name': user.first_name,
-            'last_name': user.last_name,
-            'company_name': user.profile.company_name if hasattr(user, 'profile') else None,
-            'wallet_amount': float(wallet.amount) if wallet else 0.00
-        })
-    
+    def row(user):
+        amount = user['wallet_amount']
+        return dict(user, wallet_amount=float(amount) if amount is not None else 0.00)
+
+    if 'page' in request.query_params or 'page_size' in request.query_params:
+        paginator = UserPagination()
+        page = paginator.paginate_queryset(users, request)
+        return paginator.get_paginated_response([row(user) for user in page])
+
+    data = [row(user) for user in users]
     return Response({"data": data})
 
 @api_view(['POST'])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsProductManager])
 def update_user_wallet(request):
     """Update a user's wallet amount"""
-    user_type_pm_values = UserType.objects.filter(user=request.user).values_list('user_type_pm', flat=True)
-    
-    if user_type_pm_values.first() is False:
-        return Response({"error": "Only admin users can access this endpoint"}, status=403)
-    
     serializer = UserWalletUpdateSerializer(data=request.data)
     if not serializer.is_valid():
         return Response(serializer.errors, status=400)
     
     data = serializer.validated_data
-    user = User.objects.get(id=data['user_id'])
-    wallet = UserWallet.objects.get(user=user)
-    
+    apply_change = wallet_credit if data['action'] == 'add' else wallet_debit
+    try:
+        entry = apply_change(
+            data['user_id'],
+            data['amount'],
+            idempotency_key=data.get('idempotency_key') or request.headers.get('Idempotency-Key'),
+            created_by=request.user,
+        )
+    except InsufficientFunds as e:
+        return Response({"error": str(e)}, status=400)
+    except IdempotencyConflict as e:
+        return Response({"error": str(e)}, status=409)
+    except WalletError as e:
+        return Response({"non_field_errors": [str(e)]}, status=400)
     if data['action'] == 'add':
-        wallet.amount += data['amount']
-    else:  # subtract
-        if wallet.amount < data['amount']:
-            return Response({"error": "Insufficient wallet balance"}, status=400)
-        wallet.amount -= data['amount']
-    
-    wallet.save()
-    
+        # Campaigns paused for lack of funds resume as soon as the top-up covers their spend.
+        resume_paused(data['user_id'])
+
+    first_name = User.objects.filter(id=data['user_id']).values_list('first_name', flat=True).first()
     return Response(
-        {"message": f"Successfully {data['action']}ed ₹{data['amount']} to {user.first_name}'s wallet", "data": {"amount" : float(wallet.amount)}, "success": True}, status=status.HTTP_200_OK
+        {"message": f"Successfully {data['action']}ed ₹{data['amount']} to {first_name}'s wallet", "data": {"amount" : float(entry.balance_after), "transaction_id": entry.id}, "success": True}, status=status.HTTP_200_OK
     )
 
     
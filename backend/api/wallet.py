@@ -0,0 +1,164 @@
+"""
+Wallet balance changes.
+
+Every change is a single conditional UPDATE on api_userwallet
+(``amount = amount + delta``, with ``amount >= -delta`` for debits), so
+concurrent top-ups and debits never lose updates and a balance never goes
+negative. The change is recorded in the same transaction as a
+WalletTransaction ledger row. An idempotency key makes a retried request
+return the original transaction instead of applying it twice; reusing a key
+for a different user, kind or amount raises IdempotencyConflict.
+
+apply_batch applies many changes (e.g. campaign spend, see api.pacing)
+with one UPDATE each and one bulk ledger insert.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import UserWallet, WalletTransaction
+
+
+class WalletError(Exception):
+    pass
+
+
+class InsufficientFunds(WalletError):
+    pass
+
+
+class IdempotencyConflict(WalletError):
+    pass
+
+
+def _replay(idempotency_key, user_id, kind, delta):
+    """The transaction recorded under idempotency_key, or None; raises if it was for another change."""
+    existing = WalletTransaction.objects.select_related("wallet").filter(idempotency_key=idempotency_key).first()
+    if existing is None:
+        return None
+    if (existing.wallet.user_id, existing.kind, existing.amount) != (int(user_id), kind, delta):
+        raise IdempotencyConflict("Idempotency key was already used for a different wallet change")
+    return existing
+
+
+def _update_balance(user_id, delta):
+    """One conditional UPDATE; returns the number of rows changed (0 or 1)."""
+    wallets = UserWallet.objects.filter(user_id=user_id)
+    if delta < 0:
+        wallets = wallets.filter(amount__gte=-delta)
+    return wallets.update(amount=F("amount") + delta, updated_at=timezone.now())
+
+
+def _apply(user_id, delta):
+    """Change the balance or raise; returns (wallet id, new balance). Call inside a transaction."""
+    if not _update_balance(user_id, delta):
+        if UserWallet.objects.filter(user_id=user_id).exists():
+            raise InsufficientFunds("Insufficient wallet balance")
+        if not User.objects.filter(pk=user_id).exists():
+            raise WalletError("User does not exist")
+        # Accounts created before wallets existed.
+        UserWallet.objects.get_or_create(user_id=user_id)
+        if not _update_balance(user_id, delta):
+            raise InsufficientFunds("Insufficient wallet balance")
+    return UserWallet.objects.filter(user_id=user_id).values_list("id", "amount").get()
+
+
+def apply(user_id, amount, kind, idempotency_key=None, campaign_id=None, created_by=None, description=""):
+    """
+    Credit (kind CREDIT) or debit (DEBIT, SPEND) amount from a user's wallet
+    and return the ledger row. With an idempotency key that was already
+    used for the same change, returns the earlier row without changing the
+    balance.
+    """
+    amount = Decimal(amount)
+    if amount <= 0:
+        raise WalletError("Amount must be positive")
+    delta = amount if kind == WalletTransaction.Kind.CREDIT else -amount
+
+    if idempotency_key:
+        existing = _replay(idempotency_key, user_id, kind, delta)
+        if existing is not None:
+            return existing
+    try:
+        with transaction.atomic():
+            wallet_id, balance = _apply(user_id, delta)
+            return WalletTransaction.objects.create(
+                wallet_id=wallet_id,
+                kind=kind,
+                amount=delta,
+                balance_after=balance,
+                campaign_id=campaign_id,
+                created_by=created_by,
+                idempotency_key=idempotency_key or None,
+                description=description,
+            )
+    except IntegrityError:
+        # A concurrent request with the same key won; its change stands.
+        if idempotency_key:
+            existing = _replay(idempotency_key, user_id, kind, delta)
+            if existing is not None:
+                return existing
+        raise
+
+
+def credit(user_id, amount, **kwargs):
+    return apply(user_id, amount, WalletTransaction.Kind.CREDIT, **kwargs)
+
+
+def debit(user_id, amount, **kwargs):
+    return apply(user_id, amount, WalletTransaction.Kind.DEBIT, **kwargs)
+
+
+def apply_batch(entries, kind=WalletTransaction.Kind.SPEND):
+    """
+    Debit (or with kind CREDIT, credit) many wallets in one transaction.
+
+    entries are dicts with user_id, amount and optionally campaign_id,
+    idempotency_key and description. Entries whose key was already used are
+    skipped; debits that would overdraw a wallet are rejected and left out.
+    Returns (applied entries, rejected entries).
+    """
+    entries = [entry for entry in entries if Decimal(entry["amount"]) > 0]
+    keys = [entry["idempotency_key"] for entry in entries if entry.get("idempotency_key")]
+    used = set(WalletTransaction.objects.filter(idempotency_key__in=keys).values_list("idempotency_key", flat=True))
+
+    applied, rejected = [], []
+    with transaction.atomic():
+        for entry in entries:
+            key = entry.get("idempotency_key")
+            if key in used:
+                continue
+            if key:
+                used.add(key)
+            amount = Decimal(entry["amount"])
+            delta = amount if kind == WalletTransaction.Kind.CREDIT else -amount
+            if _update_balance(entry["user_id"], delta):
+                applied.append((entry, delta))
+            else:
+                rejected.append(entry)
+
+        # Balances after each entry, walking back from the final balances.
+        wallet_ids, running = {}, defaultdict(Decimal)
+        for user_id, wallet_id, balance in UserWallet.objects.filter(
+            user_id__in={entry["user_id"] for entry, delta in applied}
+        ).values_list("user_id", "id", "amount"):
+            wallet_ids[user_id], running[user_id] = wallet_id, balance
+        rows = []
+        for entry, delta in reversed(applied):
+            rows.append(WalletTransaction(
+                wallet_id=wallet_ids[entry["user_id"]],
+                kind=kind,
+                amount=delta,
+                balance_after=running[entry["user_id"]],
+                campaign_id=entry.get("campaign_id"),
+                idempotency_key=entry.get("idempotency_key") or None,
+                description=entry.get("description", ""),
+            ))
+            running[entry["user_id"]] -= delta
+        rows.reverse()
+        WalletTransaction.objects.bulk_create(rows, batch_size=1000)
+    return [entry for entry, delta in applied], rejected
@@ -0,0 +1,33 @@
+"""
+Index auth_user.email for username-or-email login (api.backends).
+
+auth.User is Django's model, so the index is added with the schema editor
+rather than through its Meta.
+"""
+from django.db import migrations, models
+
+EMAIL_INDEX = models.Index(fields=["email"], name="auth_user_email_idx")
+
+
+def add_email_index(apps, schema_editor):
+    User = apps.get_model("auth", "User")
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, User._meta.db_table)
+    # Databases migrated before this migration existed got the index from a post_migrate hook.
+    if EMAIL_INDEX.name not in constraints:
+        schema_editor.add_index(User, EMAIL_INDEX)
+
+
+def remove_email_index(apps, schema_editor):
+    schema_editor.remove_index(apps.get_model("auth", "User"), EMAIL_INDEX)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+    ]
+
+    operations = [
+        migrations.RunPython(add_email_index, remove_email_index),
+    ]
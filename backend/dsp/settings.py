@@ -1,4 +1,5 @@
 import os
+import sys
 from datetime import timedelta
 from pathlib import Path
 import environ
@@ -93,8 +94,28 @@ DATABASES = {
     }
 }
 
+# `manage.py test` runs on SQLite, so the suite needs no MySQL server. The
+# test database is a file (not :memory:) so threaded tests get their own
+# connections and wait for each other's write locks.
+if 'test' in sys.argv[1:2]:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'OPTIONS': {'timeout': 30},
+            'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+        }
+    }
+
+# Cache shared by all gunicorn workers (taxonomy bundle and version stamp).
+# Point CACHE_URL at redis/memcached in multi-host deployments.
+CACHES = {
+    'default': env.cache('CACHE_URL', default='filecache:///tmp/dsp_cache'),
+}
+
 AUTHENTICATION_BACKENDS = (
-    "django.contrib.auth.backends.ModelBackend",
+    # Username or email login with a single password hash (ModelBackend subclass).
+    "api.backends.EmailOrUsernameBackend",
 )
 
 REST_FRAMEWORK = {
@@ -225,7 +246,8 @@ CORS_ALLOW_METHODS = [
 
 # File Upload Settings
 DATA_UPLOAD_MAX_MEMORY_SIZE = 104857600  # 100MB in bytes
-FILE_UPLOAD_MAX_MEMORY_SIZE = 104857600  # 100MB in bytes
+# Uploads larger than this are spooled to a temporary file instead of worker RAM.
+FILE_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5MB in bytes
 DATA_UPLOAD_MAX_NUMBER_FIELDS = 5000
 
 # AWS S3 Settings
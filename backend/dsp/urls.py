@@ -27,13 +27,15 @@ urlpatterns = [
     path('dashboard/status-distribution/', views.get_campaign_status_distribution, name='campaign-status-distribution'),
     path('dashboard/type-distribution/', views.get_campaign_type_distribution, name='campaign-type-distribution'),
     path('dashboard/metrics/', views.get_campaign_metrics, name='campaign-metrics'),
+    path('dashboard/delivery/', views.get_campaign_delivery, name='campaign-delivery'),
     path('dashboard/tiles/', views.dashboard_tiles, name='campaign-tiles'),
     path('dashboard/charts/', views.dashboard_data, name='campaign-charts'),
     
     path("health/", views.health_check),
     path("creative_list/", views.creative_list_all),
     path('get-csv/<int:campaign_id>', views.FileGetView.as_view(), name='mymodel-csv'),
-    path("login/", views.login_page, name="login"),
+    # Legacy route for the target type upload; prefer api/target_type/import/.
+    path("login/", views.target_type_import, name="login"),
     path('user-amount/', views.get_user_amount, name='user-amount'),
     path('users-wallet/', views.get_all_users_with_wallet, name='get_all_users_with_wallet'),
     path('update-wallet/', views.update_user_wallet, name='update_user_wallet'),
@@ -50,6 +52,11 @@ urlpatterns = [
     path("exchange/", views.Exchange_api, name="Exchange_api"),
     path("language/", views.Language_api, name="Language_api"),
     path("impression/", views.Impression_api, name="Impression_api"),
+    path("taxonomies/", views.taxonomies_api, name="taxonomies_api"),
+    path("reach-estimate/", views.reach_estimate, name="reach_estimate"),
+    path("api/uploads/start/", views.upload_start, name="upload_start"),
+    path("api/uploads/complete/", views.upload_complete, name="upload_complete"),
+    path("api/uploads/abort/", views.upload_abort, name="upload_abort"),
     path("api/register/", auth.RegisterView.as_view(), name="register"),
     path("api/logout/", auth.LogoutView.as_view(), name="logout"),
     path(
@@ -88,7 +95,9 @@ urlpatterns = [
         name="fetch_user_campgain",
     ),
     path("api/location/", views.location, name="location"),
+    path("api/location/tree/", views.location_tree, name="location_tree"),
     path("api/target_type/", views.target_type_view, name="target_type"),
+    path("api/target_type/import/", views.target_type_import, name="target_type_import"),
     path("api/profile/", profile.profile_api, name="profile"),
     path("api/users/", profile.UserAPIView.as_view(), name="user-list"),
     path("api/users/<int:pk>/", profile.UserAPIView.as_view(), name="user-detail"),
@@ -12,11 +12,16 @@ echo "Setting up database directory..."
 echo "Applying database migrations..."
 python manage.py migrate
 
+# Mark spend from before wallet billing as billed (only touches campaigns not yet backfilled)
+python manage.py backfill_billed_spend
+
 # Collect static files
 echo "Collecting static files..."
 python manage.py collectstatic --noinput
 
-python manage.py crontab add
+# Start the background job worker (also runs campaign pacing every 15 minutes)
+echo "Starting job worker..."
+python manage.py run_jobs &
 
 # Start Gunicorn
 echo "Starting Gunicorn..."
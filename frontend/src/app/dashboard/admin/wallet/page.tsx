@@ -25,6 +25,8 @@ export default function AdminWalletPage() {
   const [initialLoading, setInitialLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
   const [success, setSuccess] = useState<string | null>(null);
+  // Idempotency key of the last unconfirmed wallet change; a retry of the same change reuses it.
+  const [pendingChange, setPendingChange] = useState<{ signature: string; key: string } | null>(null);
 
   useEffect(() => {
     const checkAuth = async () => {
@@ -69,7 +71,11 @@ export default function AdminWalletPage() {
     setSuccess(null);
 
     try {
-      const response = await accountClient.updateUserWallet(selectedUser, amountNum, action);
+      const signature = `${selectedUser}:${amountNum}:${action}`;
+      const idempotencyKey = pendingChange?.signature === signature ? pendingChange.key : crypto.randomUUID();
+      setPendingChange({ signature, key: idempotencyKey });
+      const response = await accountClient.updateUserWallet(selectedUser, amountNum, action, idempotencyKey);
+      setPendingChange(null);
       setSuccess(response.message);
       
       // Update the user's wallet amount in the local state
@@ -83,8 +83,17 @@ export default function CreateCampaign(): React.JSX.Element {
         setTargetType(utils.formatTargetIdToSubCategory(selectedTargetType,dataSources.interest));
       }
       
-      if(["location","age"].includes(name) && impressionData && dataSources){
-        setTargetPopulation(utils.calculateTargetPopulation(name,dataSources.location,getValues,impressionData,event))
+      if(["location","age","device","environment","carrier"].includes(name)){
+        updateTargetPopulation(name, event);
+      }
+    };
+
+    const updateTargetPopulation = async (name?: string, event?: SelectChangeEvent<unknown>) => {
+      try {
+        const estimate = await campaignClient.getReachEstimate(utils.getReachSelection(getValues, name, event));
+        setTargetPopulation(estimate.reach);
+      } catch (error) {
+        // Keep the previous estimate; it is informational only.
       }
     };
 
@@ -127,7 +136,7 @@ export default function CreateCampaign(): React.JSX.Element {
 
     React.useEffect(() => {
       if (impressionData && dataSources?.location) {
-        setTargetPopulation(utils.calculateTargetPopulation("ages", dataSources.location, getValues, impressionData, undefined));
+        updateTargetPopulation();
       }
     }, [impressionData, dataSources?.location]);
   
@@ -54,6 +54,7 @@ export function CreativeTable({
         <Table sx={{ minWidth: '800px' }}>
           <TableHead>
             <TableRow>
+              <TableCell sx={tableCellStyles}>Preview</TableCell>
               <TableCell sx={tableCellStyles}>Creative Id</TableCell>
               <TableCell sx={tableCellStyles}>Creative Name</TableCell>
               <TableCell sx={tableCellStyles}>Creative Type</TableCell>
@@ -64,6 +65,11 @@ export function CreativeTable({
           <TableBody>
             {rows.map((row) => (
               <TableRow hover key={row.id}>
+                <TableCell sx={tableCellStyles}>
+                  {row.media?.thumbnails?.['160'] ? (
+                    <img src={row.media.thumbnails['160']} alt={row.name} loading="lazy" style={{ maxWidth: 80, maxHeight: 80 }} />
+                  ) : '-'}
+                </TableCell>
                 <TableCell sx={tableCellStyles}>{row.id}</TableCell>
                 <TableCell sx={tableCellStyles}>{utils.formatProperCase(row.name)}</TableCell>
                 <TableCell sx={tableCellStyles}>{utils.formatProperCase(row.creative_type)}</TableCell>
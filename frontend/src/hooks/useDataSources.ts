@@ -29,41 +29,29 @@ export const useDataSources = (auth: Auth | null) => {
     
     const fetchData = async () => {
         try {
-            const [ageRes, deviceRes, envRes, locRes,exchangeRes,langRes,
-                carrierRes,devicePriceRes, categoryInterestRes,interestRes, impressionRes,buyTypeRes,
-                viewabilityRes,brandSafetyRes,userRes,creativeRes] = await Promise.all([
-                campaignClient.getAge(),
-                campaignClient.getDevice(),
-                campaignClient.getEnv(),
+            const [taxonomies, locRes, interestRes, userRes, creativeRes] = await Promise.all([
+                campaignClient.getTaxonomies(),
                 campaignClient.getLocations(),
-                campaignClient.getExchange(),
-                campaignClient.getLanguage(),
-                campaignClient.getCarrier(),
-                campaignClient.getDevicePrice(),
-                campaignClient.getDistinctInterest(),
                 campaignClient.getInterest(""),
-                campaignClient.getImpressionData(),
-                campaignClient.getBuyType(),
-                campaignClient.getViewability(),
-                campaignClient.getBrandSafety(),
                 campaignClient.getUsers(auth?.usertype === 'admin'),
                 creativeClient.getAllCreatives()
             ]);
+            const impressionRes = taxonomies.impression.data;
             setDataSources({
-                ages: ageRes,
-                devices: deviceRes,
-                environment: envRes,
+                ages: taxonomies.age,
+                devices: taxonomies.device,
+                environment: taxonomies.environment,
                 location: locRes,
-                exchange: exchangeRes,
-                language: langRes,
-                carrier: carrierRes,
-                device_price: devicePriceRes,
-                interest_category: categoryInterestRes,
+                exchange: taxonomies.exchange,
+                language: taxonomies.language,
+                carrier: taxonomies.carrierData,
+                device_price: taxonomies.devicePrice,
+                interest_category: taxonomies.distinctInterest,
                 interest: interestRes,
                 selectedInterest: [],
-                buy_type:buyTypeRes,
-                viewability:viewabilityRes,
-                brand_safety:brandSafetyRes,
+                buy_type: taxonomies.buyType,
+                viewability: taxonomies.viewability,
+                brand_safety: taxonomies.brandSafety,
                 users:userRes,
                 creatives:creativeRes
             });
@@ -62,6 +62,7 @@ interface WalletUpdateResponse {
   message: string;
   data: {
     amount: number;
+    transaction_id: number;
   };
   success: boolean;
 }
@@ -149,12 +150,14 @@ class AccountClient {
       }
     }
 
-    async updateUserWallet(userId: number, amount: number, action: 'add' | 'subtract' = 'add'): Promise<WalletUpdateResponse> {
+    // Pass the same idempotencyKey when retrying so the change is applied once.
+    async updateUserWallet(userId: number, amount: number, action: 'add' | 'subtract' = 'add', idempotencyKey?: string): Promise<WalletUpdateResponse> {
       try {
         const response = await axiosInstance.post('update-wallet/', {
           user_id: userId,
           amount,
-          action
+          action,
+          idempotency_key: idempotencyKey,
         });
         return response.data;
       } catch (error: any) {
@@ -1,8 +1,9 @@
 'use client';
 
-import { Campaign, CampaignFormData, CommonSelectResponse, ImpressionData, Interest, Location } from '@/types/campaign';
+import { Campaign, CampaignFormData, CommonSelectResponse, ImpressionData, Interest, Location, ReachEstimate, TaxonomyBundle } from '@/types/campaign';
 import axiosInstance from './axios-instance';
 import { utils } from './CommonUtils';
+import { UploadTarget, uploadClient } from './UploadClient';
 import { User } from '@/types/auth';
 
 
@@ -64,42 +65,27 @@ class CampaignClient {
 
 
     async uploadFile(file: File,fileType:string,campaignId:number):Promise<number> {
+      // Campaign assets go straight to S3; only delivery reports are parsed by the backend.
+      const directTargets: Record<string, UploadTarget> = {
+        images: 'campaign_image',
+        video: 'campaign_video',
+        tag_tracker: 'tag_tracker',
+        proximity: 'proximity',
+        weather: 'weather',
+        keywords: 'keyword',
+      };
+      if (directTargets[fileType]) {
+        const created = await uploadClient.upload<{ id: number }>(directTargets[fileType], file);
+        return created.id;
+      }
+
       const formData = new FormData();
       try {
-        let uri='';
-        switch(fileType){
-          case 'images':
-            formData.append('image', file);
-            uri="/api/campaign-images/"
-            break;
-          case 'video':
-            formData.append('video', file);
-            uri="/api/campaign-video/"
-            break;
-          case 'tag_tracker':
-            formData.append('file', file);
-            uri="/api/tag_tacker/"
-            break;
-          case 'proximity':
-            formData.append('file', file);
-            uri="/api/proximity/"
-            break;
-          case 'weather':
-            formData.append('file', file);
-            uri="/api/weather/"
-            break;
-          case 'keywords':
-            formData.append('file', file);
-            uri="/api/keywords/"
-            break;
-          case 'report-upload':
-            formData.append('file', file);
-            uri=`/get-csv/${campaignId}`
-            break;
-          default:
-            throw new Error("Invalid File Type")
+        if (fileType !== 'report-upload') {
+          throw new Error("Invalid File Type")
         }
-        const response = await axiosInstance.post(uri, formData, {
+        formData.append('file', file);
+        const response = await axiosInstance.post(`/get-csv/${campaignId}`, formData, {
           headers: { 'Content-Type': 'multipart/form-data' },
         });
         return response.data.id;
@@ -108,6 +94,32 @@ class CampaignClient {
       }
     }
 
+    async getTaxonomies() :Promise<TaxonomyBundle>{
+      try {
+        const response = await axiosInstance.get('/taxonomies/', {
+          headers: { 'Content-Type': 'application/json' },
+        });
+        return response.data.data;
+      } catch (error: any) {
+        throw new Error(utils.handleErrorMessage(error));
+      }
+    }
+
+    async getReachEstimate(selection: Record<string, (string | number)[]>) :Promise<ReachEstimate>{
+      try {
+        const params = new URLSearchParams();
+        Object.entries(selection).forEach(([key, values]) => {
+          if (values.length) params.append(key, values.join(','));
+        });
+        const response = await axiosInstance.get(`/reach-estimate/?${params.toString()}`, {
+          headers: { 'Content-Type': 'application/json' },
+        });
+        return response.data.data;
+      } catch (error: any) {
+        throw new Error(utils.handleErrorMessage(error));
+      }
+    }
+
     async getImpressionData() :Promise<ImpressionData>{
       try {
         const response = await axiosInstance.get('/impression', {
@@ -1,4 +1,4 @@
-import { Campaign, CampaignFormData, ImpressionData, Interest, Location } from "@/types/campaign";
+import { Campaign, CampaignFormData, Interest, Location } from "@/types/campaign";
 import { Creative, CreativeFormData } from "@/types/creative";
 import { SelectChangeEvent } from "@mui/material";
 import { AxiosError } from "axios";
@@ -140,32 +140,19 @@ class Utils {
         return "Not provided";
     };
 
-    calculateTargetPopulation = (name:string,locationList:Location[],
-        getValues:UseFormGetValues<CampaignFormData>,impressionData:ImpressionData,
-        event?: SelectChangeEvent<unknown>):number=>{
-        
-        const selectedValue: string[] = event ? event.target.value as string[]:[];
-        
-        const selectedLocs =getValues("location")? name==="age" ? getValues("location"):  Array.from(
-            new Set([...selectedValue, ...getValues("location") as Number[]])
-            ) as string[] : selectedValue;
-        
-        const selectedAges = getValues("age") ? name==="location"? getValues("age"): Array.from(
-            new Set([...selectedValue, ...getValues("age") as string[]])
-            ) as string[] : selectedValue;
-        
-        const effectivePopulation = selectedLocs ? selectedLocs.reduce((total:number, locationId) => {
-        const location = locationList.find((loc) => loc.id === locationId);
-        return total + (Number(location?.population) || 0);
-        }, 0):0;
-    
-        const effectivePercentage = selectedAges ? selectedAges.reduce((total, label) => {
-        const ageGroup = impressionData?.age?.find(age => age.label === label);
-        return total + (ageGroup?.percentage || 0);
-        }, 0):0;
+    getReachSelection = (getValues:UseFormGetValues<CampaignFormData>,
+        name?:string, event?: SelectChangeEvent<unknown>):Record<string, (string | number)[]>=>{
+        // The changed field's new value is on the event; the rest come from the form.
+        const current = (field: "location" | "age" | "device" | "environment" | "carrier") =>
+            (name === field && event ? event.target.value : getValues(field)) as (string | number)[] || [];
 
-        return effectivePercentage > 0 ? Math.round((effectivePopulation * effectivePercentage) / 100)
-        : effectivePopulation;
+        return {
+            location: current("location"),
+            age: current("age"),
+            device: current("device"),
+            environment: current("environment"),
+            carrier: current("carrier"),
+        };
     }
 
 }
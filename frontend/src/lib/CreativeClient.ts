@@ -3,6 +3,7 @@
 import { Creative, CreativeFormData } from '@/types/creative';
 import axiosInstance from './axios-instance';
 import { utils } from './CommonUtils';
+import { uploadClient } from './UploadClient';
 
 
 class CreativeClient {
@@ -32,18 +33,9 @@ class CreativeClient {
     }
 
     async createCreative(data: CreativeFormData): Promise<boolean> {
-      try {
-        const formData = new FormData();
-        Object.entries(data).forEach(([key, value]) => {
-          formData.append(key, value);
-        });        
-        await axiosInstance.post(`/api/creatives/`, formData,{
-          headers: { 'Content-Type': 'multipart/form-data;' },
-        });
-        return true
-      } catch (error: any) {
-          throw new Error(utils.handleErrorMessage(error));
-      }
+      const { file, ...fields } = data;
+      await uploadClient.upload<Creative>('creative', file, fields);
+      return true
     }
 }
 
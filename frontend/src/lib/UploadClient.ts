@@ -0,0 +1,87 @@
+'use client';
+
+import axios from 'axios';
+import axiosInstance from './axios-instance';
+import { utils } from './CommonUtils';
+
+export type UploadTarget =
+  | 'creative'
+  | 'campaign_image'
+  | 'campaign_video'
+  | 'keyword'
+  | 'tag_tracker'
+  | 'proximity_store'
+  | 'proximity'
+  | 'weather';
+
+interface PresignedPost {
+  url: string;
+  fields: Record<string, string>;
+}
+
+interface UploadStart {
+  token: string;
+  key: string;
+  existing?: boolean;
+  post?: PresignedPost;
+  part_size?: number;
+  parts?: { part_number: number; url: string }[];
+}
+
+// Files up to this size are hashed in the browser so re-uploads of stored content are skipped.
+const HASH_MAX_SIZE = 64 * 1024 * 1024;
+
+async function sha256Hex(file: File): Promise<string | undefined> {
+  if (file.size > HASH_MAX_SIZE || !window.crypto?.subtle) return undefined;
+  const digest = await window.crypto.subtle.digest('SHA-256', await file.arrayBuffer());
+  return Array.from(new Uint8Array(digest)).map((byte) => byte.toString(16).padStart(2, '0')).join('');
+}
+
+class UploadClient {
+
+    // Sends the file straight to S3 and records it on the backend; returns the created object.
+    async upload<T>(target: UploadTarget, file: File, fields: Record<string, unknown> = {}): Promise<T> {
+      let start: UploadStart;
+      try {
+        const response = await axiosInstance.post('/api/uploads/start/', {
+          target,
+          filename: file.name,
+          size: file.size,
+          content_type: file.type,
+          sha256: await sha256Hex(file),
+        });
+        start = response.data.data;
+      } catch (error: any) {
+        throw new Error(utils.handleErrorMessage(error));
+      }
+
+      try {
+        let parts: { part_number: number; etag: string }[] | undefined;
+        if (start.existing) {
+          // Already stored; nothing to send.
+        } else if (start.post) {
+          const formData = new FormData();
+          Object.entries(start.post.fields).forEach(([key, value]) => formData.append(key, value));
+          formData.append('file', file);
+          await axios.post(start.post.url, formData);
+        } else if (start.parts && start.part_size) {
+          const partSize = start.part_size;
+          parts = await Promise.all(start.parts.map(async (part) => {
+            const offset = (part.part_number - 1) * partSize;
+            const response = await axios.put(part.url, file.slice(offset, offset + partSize));
+            return { part_number: part.part_number, etag: response.headers.etag as string };
+          }));
+        }
+
+        const response = await axiosInstance.post('/api/uploads/complete/', { token: start.token, parts, ...fields });
+        return response.data.data;
+      } catch (error: any) {
+        if (start.parts) {
+          axiosInstance.post('/api/uploads/abort/', { token: start.token }).catch(() => undefined);
+        }
+        throw new Error(utils.handleErrorMessage(error));
+      }
+    }
+}
+
+export const uploadClient = new UploadClient();
@@ -60,7 +60,8 @@ export interface Campaign {
     user:User,
     campaign_files:FileUpload[],
     creative:Creative[],
-    payment:number
+    payment:number,
+    file_status?: 'pending' | 'ready' | 'failed' | null
 }
 
 export interface CampaignFormData  {
@@ -99,6 +100,28 @@ export interface ImpressionData{
     carrier?:CommonImpressionDetails[],
 }
 
+export interface ReachEstimate {
+  population: number;
+  reach: number;
+  shares: Record<string, number>;
+  unweighted: string[];
+}
+
+export interface TaxonomyBundle {
+  age: CommonSelectResponse[];
+  brandSafety: CommonSelectResponse[];
+  viewability: CommonSelectResponse[];
+  buyType: CommonSelectResponse[];
+  devicePrice: CommonSelectResponse[];
+  device: CommonSelectResponse[];
+  distinctInterest: CommonSelectResponse[];
+  carrierData: CommonSelectResponse[];
+  environment: CommonSelectResponse[];
+  exchange: CommonSelectResponse[];
+  language: CommonSelectResponse[];
+  impression: { data: ImpressionData };
+}
+
 export interface DataSources {
   ages: CommonSelectResponse[];
   devices: CommonSelectResponse[];
@@ -1,9 +1,20 @@
+export interface CreativeMedia {
+    kind: 'image' | 'video' | 'file';
+    size?: number;
+    width?: number;
+    height?: number;
+    duration?: number;
+    poster?: string;
+    thumbnails?: Record<string, string>;
+}
+
 export interface Creative {
     id: number;
     name: string;
     creative_type: string;
     file?: string;
     description?: string;
+    media?: CreativeMedia | null;
 }
 
 export interface CreativeFormData {